@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+⏱️ NetCafe Client - Keyboard Trace Replay Benchmark
+Replays the recorded key traces in traces/ through the decision step of
+every keyboard blocker (KeyboardBlocker lock/session, AdvancedKeyboardBlocker
+lock/gaming, EnhancedKeyboardBlocker strict/minimal) without Windows, reports events
+per second and per-event latency, and diffs each event's block decision
+against the golden files in traces/golden/.
+
+A non-zero exit means some decision changed. If the change is intended,
+re-run with --update-golden and commit the new golden files.
+
+Record a new trace on Windows with: python test_keyboard_blocking.py --record traces/<name>.trace
+
+Usage: python benchmark_keyboard_replay.py [--traces traces] [--rounds 5] [--update-golden] [--json]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from key_trace import (
+    REPLAY_TARGETS, find_traces, load_trace, replay, blocked_map,
+    load_golden, save_golden, diff_decisions, timer_overhead_ns,
+)
+
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+
+
+def run(trace_dir, rounds, update_golden):
+    """Per-trace results and the golden diffs"""
+    results, diffs = {}, {}
+    for path in find_traces(trace_dir):
+        name = os.path.basename(path)
+        events = load_trace(path)
+        golden = load_golden(path)
+        fresh = {}
+        results[name] = {'events': len(events), 'targets': {}}
+        for target in REPLAY_TARGETS:
+            result = replay(target, events, rounds)
+            fresh[target] = blocked_map(result.decisions)
+            results[name]['targets'][target] = {
+                'events_per_sec': result.events_per_sec,
+                'latency_ns': result.latency_ns,
+                'blocked': len(fresh[target]),
+            }
+            if not update_golden:
+                lines = diff_decisions(events, golden.get(target, {}), result.decisions)
+                if lines:
+                    diffs[f"{name} {target}"] = lines
+        if update_golden:
+            save_golden(path, fresh)
+    return results, diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay key traces through the keyboard blockers')
+    parser.add_argument('--traces', default=TRACE_DIR, help='directory with *.trace files')
+    parser.add_argument('--rounds', type=int, default=5, help='timed passes per trace and blocker')
+    parser.add_argument('--update-golden', action='store_true', help='rewrite the golden files from this run')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    args = parser.parse_args()
+
+    results, diffs = run(args.traces, args.rounds, args.update_golden)
+    overhead = timer_overhead_ns()
+
+    if args.json:
+        print(json.dumps({'traces': results, 'timer_overhead_ns': overhead, 'golden_diffs': diffs}))
+        return 1 if diffs else 0
+
+    print("=" * 70)
+    print("⏱️ NetCafe Client - Keyboard Trace Replay Benchmark")
+    print("=" * 70)
+    for name, trace in results.items():
+        print(f"⌨️  {name}: {trace['events']} events")
+        for target, r in trace['targets'].items():
+            latency = r['latency_ns']
+            print(f"   {target:<34} {r['events_per_sec']:>10,} events/s   p50 {latency['p50']:>5} ns   "
+                  f"p99 {latency['p99']:>6} ns   max {latency['max']:>7} ns   blocked {r['blocked']}")
+    print(f"⏲️  Latencies include ~{overhead} ns of timer overhead per event")
+
+    if args.update_golden:
+        print(f"📝 Golden files rewritten in {os.path.join(args.traces, 'golden')}")
+        return 0
+    if not diffs:
+        print("✅ Every decision matches the golden files")
+        return 0
+    for key, lines in diffs.items():
+        print(f"❌ {key}: {len(lines)} decisions differ")
+        for line in lines[:10]:
+            print(f"   {line}")
+        if len(lines) > 10:
+            print(f"   ... {len(lines) - 10} more")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+⏱️ NetCafe Client - Message Pump Idle Benchmark
+Idle CPU time and wakeups of the keyboard hook's message-pump thread: the
+old PeekMessageW + sleep(10 ms) spin vs. a blocking GetMessageW loop that
+is stopped with a posted WM_QUIT.
+
+On Windows both loops use the real user32 calls. Elsewhere they use
+stand-ins with the same sleeping behaviour (a cheap system call + 10 ms
+sleep vs. a thread blocked in the kernel until a quit message is queued),
+which is what the wakeup count depends on.
+
+Usage: python benchmark_message_pump.py [--seconds 5] [--json]
+"""
+
+import os
+import sys
+import time
+import json
+import queue
+import ctypes
+import argparse
+import threading
+
+import psutil
+
+WM_QUIT = 0x0012
+
+
+class SpinPump:
+    """The old loop: poll for messages, sleep 10 ms, repeat"""
+
+    def __init__(self):
+        self.running = True
+        self.wakeups = 0
+
+    def run(self, ready):
+        peek = ctypes.windll.user32.PeekMessageW if sys.platform == 'win32' else None
+        ready.set()
+        while self.running:
+            if peek:
+                peek(None, 0, 0, 0, 0)
+            else:
+                os.getpid()
+            self.wakeups += 1
+            time.sleep(0.01)
+
+    def stop(self):
+        self.running = False
+
+
+class BlockingPump:
+    """The new loop: sleep in the kernel until a message (or WM_QUIT) arrives"""
+
+    def __init__(self):
+        self.wakeups = 0
+        self.thread_id = None
+        self.messages = queue.Queue()
+
+    def run(self, ready):
+        if sys.platform == 'win32':
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            msg = wintypes.MSG()
+            # Create the thread's message queue before anyone posts to it
+            user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, 0)
+            ready.set()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                self.wakeups += 1
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+            return
+        ready.set()
+        while self.messages.get() != WM_QUIT:
+            self.wakeups += 1
+
+    def stop(self):
+        if sys.platform == 'win32':
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+        else:
+            self.messages.put(WM_QUIT)
+
+
+def context_switches(thread):
+    """Context switches of one thread (Linux), else of the whole process"""
+    try:
+        with open(f'/proc/self/task/{thread.native_id}/status') as f:
+            return sum(int(line.split()[1]) for line in f if 'ctxt_switches' in line)
+    except OSError:
+        switches = psutil.Process().num_ctx_switches()
+        return switches.voluntary + switches.involuntary
+
+
+def measure(pump, seconds):
+    """CPU time, context switches and wakeups of the process while only the pump runs"""
+    process = psutil.Process()
+    ready = threading.Event()
+    thread = threading.Thread(target=pump.run, args=(ready,), daemon=True)
+    thread.start()
+    ready.wait()
+    time.sleep(0.2)  # start-up is not idle time
+
+    cpu_before, switches_before, wakeups_before = sum(process.cpu_times()[:2]), context_switches(thread), pump.wakeups
+    started = time.perf_counter()
+    time.sleep(seconds)
+    elapsed = time.perf_counter() - started
+    cpu_after, switches_after, wakeups_after = sum(process.cpu_times()[:2]), context_switches(thread), pump.wakeups
+
+    stop_started = time.perf_counter()
+    pump.stop()
+    thread.join(timeout=2)
+    stop_ms = (time.perf_counter() - stop_started) * 1000
+    return {
+        'cpu_ms_per_s': round((cpu_after - cpu_before) * 1000 / elapsed, 3),
+        'loop_wakeups_per_s': round((wakeups_after - wakeups_before) / elapsed, 1),
+        'ctx_switches_per_s': round((switches_after - switches_before) / elapsed, 1),
+        'stop_ms': round(stop_ms, 3),
+        'stopped': not thread.is_alive(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Idle cost of the keyboard hook message pump')
+    parser.add_argument('--seconds', type=float, default=5, help='idle time measured per pump')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    args = parser.parse_args()
+
+    results = {
+        'platform': sys.platform,
+        'spin': measure(SpinPump(), args.seconds),
+        'blocking': measure(BlockingPump(), args.seconds),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return 0
+
+    print("=" * 70)
+    print("⏱️ NetCafe Client - Message Pump Idle Benchmark")
+    print("=" * 70)
+    print(f"🖥️  Platform: {results['platform']}")
+    for name in ('spin', 'blocking'):
+        r = results[name]
+        print(f"   {name:<9} cpu {r['cpu_ms_per_s']:7.3f} ms/s   wakeups {r['loop_wakeups_per_s']:6.1f}/s   "
+              f"ctx switches {r['ctx_switches_per_s']:6.1f}/s   stop {r['stop_ms']:7.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+⏱️ NetCafe Client - Process Monitoring Benchmark
+Measures per-sweep cost of the process monitors on a machine with many
+live processes, and the cost of a cold sweep (every process new) reading
+cmdline/exe eagerly vs. only for name matches. Spawns the extra processes
+itself (Linux/Windows).
+
+Usage: python benchmark_process_monitoring.py [--processes 500] [--sweeps 20]
+"""
+
+import sys
+import time
+import json
+import argparse
+import subprocess
+import statistics
+
+import psutil
+
+from process_matcher import NameMatcher
+from process_snapshot import ProcessSnapshot, fetch_attrs
+
+# FolderBlocker's lists - the old code substring-scanned both for every process
+ALLOWED = [
+    'steam.exe', 'steamwebhelper.exe', 'gameoverlayui.exe', 'origin.exe',
+    'originwebhelperservice.exe', 'epicgameslauncher.exe',
+    'epicgameslauncher-win32-shipping.exe', 'battle.net.exe', 'agent.exe',
+    'uplay.exe', 'upc.exe', 'discord.exe', 'discordptb.exe', 'chrome.exe',
+    'firefox.exe', 'msedge.exe', 'csgo.exe', 'dota2.exe',
+    'league of legends.exe', 'valorant.exe',
+]
+BLOCKED = [
+    'explorer.exe', 'cmd.exe', 'powershell.exe', 'winfile.exe', 'regedit.exe',
+    'taskmgr.exe', 'msconfig.exe', 'control.exe', 'mmc.exe',
+]
+
+
+def spawn_processes(count):
+    """Start `count` idle child processes so the process table is large"""
+    if sys.platform == 'win32':
+        cmd = ['ping', '-n', '3600', '127.0.0.1']
+    else:
+        cmd = ['sleep', '3600']
+    return [subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for _ in range(count)]
+
+
+def stop_processes(procs):
+    for proc in procs:
+        proc.kill()
+    for proc in procs:
+        proc.wait()
+
+
+def time_sweeps(sweep, sweeps):
+    """Run sweep() `sweeps` times and return per-sweep durations in ms"""
+    durations = []
+    for _ in range(sweeps):
+        started = time.perf_counter()
+        sweep()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def bench_full_walk(sweeps):
+    """Old behaviour: every sweep reads name, exe and cmdline of every process"""
+    def sweep():
+        for proc in psutil.process_iter(['pid', 'name', 'exe', 'cmdline']):
+            proc.info['name']
+    return time_sweeps(sweep, sweeps)
+
+
+def bench_snapshot(sweeps):
+    """New behaviour: steady-state sweeps only list PIDs and check create_time"""
+    snapshot = ProcessSnapshot(attrs=['name', 'exe', 'cmdline'])
+    snapshot.sweep()  # first sweep classifies everything once
+    return time_sweeps(snapshot.sweep, sweeps)
+
+
+def bench_cold_eager(sweeps):
+    """Before: every new process had name, exe and cmdline read by the sweep"""
+    return time_sweeps(lambda: ProcessSnapshot(attrs=['name', 'exe', 'cmdline']).sweep(), sweeps)
+
+
+def bench_cold_lazy(sweeps):
+    """Now: the sweep reads names; exe/cmdline only for processes a rule matched"""
+    blocked = NameMatcher(BLOCKED)
+
+    def sweep():
+        for entry in ProcessSnapshot(attrs=['name']).sweep().new:
+            if blocked.match(entry.info['name']):
+                try:
+                    fetch_attrs(entry, 'exe', 'cmdline')
+                except psutil.Error:
+                    pass
+    return time_sweeps(sweep, sweeps)
+
+
+def bench_matcher(names, rounds):
+    """Old any(substring) scans vs the compiled NameMatcher, per name lookup"""
+    def old_match(name):
+        if any(allowed in name for allowed in ALLOWED):
+            return None
+        return any(blocked in name for blocked in BLOCKED)
+
+    allowed = NameMatcher(ALLOWED)
+    blocked = NameMatcher(BLOCKED)
+
+    def new_match(name):
+        if allowed.match(name):
+            return None
+        return blocked.match(name)
+
+    results = {}
+    for label, match in (('substring_scan', old_match), ('name_matcher', new_match)):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for name in names:
+                match(name)
+        elapsed = time.perf_counter() - started
+        results[label] = {'ns_per_lookup': round(elapsed / (rounds * len(names)) * 1e9, 1)}
+    return results
+
+
+def summarize(durations):
+    return {
+        'mean_ms': round(statistics.mean(durations), 3),
+        'median_ms': round(statistics.median(durations), 3),
+        'max_ms': round(max(durations), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process monitoring sweep benchmark')
+    parser.add_argument('--processes', type=int, default=500, help='extra live processes to spawn')
+    parser.add_argument('--sweeps', type=int, default=20, help='sweeps to time per variant')
+    parser.add_argument('--matcher-rounds', type=int, default=200, help='passes over the name list in the matcher benchmark')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    args = parser.parse_args()
+
+    names = [name.lower() for name in ALLOWED + BLOCKED] + [f'game{i}.exe' for i in range(200)]
+    matcher_results = bench_matcher(names, args.matcher_rounds)
+
+    procs = spawn_processes(args.processes)
+    try:
+        time.sleep(0.5)
+        results = {
+            'live_processes': len(psutil.pids()),
+            'full_walk': summarize(bench_full_walk(args.sweeps)),
+            'snapshot': summarize(bench_snapshot(args.sweeps)),
+            'cold_eager': summarize(bench_cold_eager(args.sweeps)),
+            'cold_lazy': summarize(bench_cold_lazy(args.sweeps)),
+        }
+    finally:
+        stop_processes(procs)
+
+    results['speedup'] = round(results['full_walk']['mean_ms'] / results['snapshot']['mean_ms'], 2)
+    results['lazy_speedup'] = round(results['cold_eager']['mean_ms'] / results['cold_lazy']['mean_ms'], 2)
+    results['matcher'] = matcher_results
+
+    if args.json:
+        print(json.dumps(results))
+        return 0
+
+    print("=" * 70)
+    print("⏱️ NetCafe Client - Process Monitoring Benchmark")
+    print("=" * 70)
+    print(f"🖥️  Live processes: {results['live_processes']}")
+    for name in ('full_walk', 'snapshot', 'cold_eager', 'cold_lazy'):
+        r = results[name]
+        print(f"   {name:<10} mean {r['mean_ms']:8.2f} ms   median {r['median_ms']:8.2f} ms   max {r['max_ms']:8.2f} ms")
+    print(f"🚀 Snapshot sweep is {results['speedup']}x faster per sweep")
+    print(f"🦥 On-demand exe/cmdline makes a cold sweep {results['lazy_speedup']}x faster")
+    print(f"🔎 Name lookup: substring scan {matcher_results['substring_scan']['ns_per_lookup']} ns, "
+          f"NameMatcher {matcher_results['name_matcher']['ns_per_lookup']} ns")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
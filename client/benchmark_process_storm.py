@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+⏱️ NetCafe Client - Process Storm Benchmark
+Spawns synthetic process storms (N processes per second, configurable
+lifetime, names that do and don't match the block lists) and runs each
+monitor against them:
+
+  - folder_blocker:    FolderBlocker (netcafe_client) on the process event
+                       source (proc connector / WMI / polling)
+  - process_monitor:   ProcessMonitor (enhanced_security) on the shared sweep
+  - anti_task_manager: AntiTaskManagerBlocker (netcafe_client_secure) on the
+                       shared sweep
+
+The blocker modules import pywin32/PySide6/qasync; where those are missing
+they are replaced by inert stand-in modules, so the real classes run on
+Linux too. Each monitor gets fresh shared services: a sweep service at
+--sweep-interval, a window snapshot on the fake window backend (no real
+window is closed), an in-memory identity cache and a termination engine
+that only terminates the storm's own processes. Reports detection latency
+percentiles, missed processes, false positives and the CPU time of every
+thread besides the spawning one.
+
+Usage: python benchmark_process_storm.py [--rate 100] [--duration 5] [--json]
+"""
+
+import os
+import sys
+import time
+import json
+import types
+import logging
+import shutil
+import random
+import argparse
+import importlib
+import tempfile
+import threading
+import subprocess
+
+import psutil
+
+# Needed by the blocker modules at import time; stood in for when not installed
+PLATFORM_MODULES = [
+    'PySide6', 'PySide6.QtWidgets', 'PySide6.QtCore', 'PySide6.QtGui', 'qasync', 'winreg',
+    'win32api', 'win32con', 'win32gui', 'win32process', 'win32security', 'win32com', 'win32com.client',
+]
+
+
+class _StubMeta(type):
+    def __getattr__(cls, name):
+        return _Stub()
+
+
+class _Stub(metaclass=_StubMeta):
+    """Accepts any call, attribute or flag combination - base class, decorator or constant"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+    def __getattr__(self, name):
+        return _Stub()
+
+    def __or__(self, other):
+        return self
+
+    __ror__ = __or__
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        stub = _StubMeta(name, (_Stub,), {})
+        setattr(self, name, stub)
+        return stub
+
+
+def install_platform_stubs():
+    """Put a stand-in module in sys.modules for every platform module that cannot be imported"""
+    stubbed = []
+    for name in PLATFORM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = sys.modules[name] = _StubModule(name)
+            parent, _, child = name.rpartition('.')
+            if parent:
+                setattr(sys.modules[parent], child, module)
+            stubbed.append(name)
+    return stubbed
+
+
+STUBBED_MODULES = install_platform_stubs()
+# Configured first, so the blocker modules' basicConfig neither writes client.log nor logs every block
+logging.basicConfig(level=logging.ERROR, format='%(name)s - %(levelname)s - %(message)s')
+
+import exe_identity
+import process_sweep
+import process_terminator
+import window_snapshot
+from block_stats import LatencyHistogram
+from enhanced_security import ProcessMonitor
+from exe_identity import ExecutableIdentityCache
+from netcafe_client import FolderBlocker
+from netcafe_client_secure import AntiTaskManagerBlocker
+from process_events import create_process_event_source
+from process_sweep import ProcessSweepService
+from process_terminator import TerminationEngine
+from window_snapshot import FakeWindowBackend, WindowSnapshot
+
+MONITORS = ['folder_blocker', 'process_monitor', 'anti_task_manager']
+
+
+def monitor_block_list(monitor):
+    """The monitor's own block list"""
+    if monitor == 'folder_blocker':
+        return FolderBlocker(window_backend=FakeWindowBackend()).blocked_processes
+    if monitor == 'process_monitor':
+        return ProcessMonitor().policy.blocked.patterns
+    return AntiTaskManagerBlocker().blocked_processes
+
+
+class StormShim:
+    """Spawns named short-lived processes from copies of a sleeper binary"""
+
+    def __init__(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='netcafe_storm_')
+        if sys.platform == 'win32':
+            self.sleeper = shutil.which('ping')
+            self.args = lambda seconds: ['-n', str(max(1, int(seconds) + 1)), '127.0.0.1']
+        else:
+            self.sleeper = shutil.which('sleep')
+            self.args = lambda seconds: [str(seconds)]
+        self.binaries = {}
+        self.children = []
+        self._lock = threading.Lock()
+
+    def binary(self, name):
+        path = self.binaries.get(name)
+        if path is None:
+            path = os.path.join(self.tmpdir, name)
+            shutil.copy2(self.sleeper, path)
+            self.binaries[name] = path
+        return path
+
+    def owns(self, pid):
+        """Only processes started from our copies may be killed"""
+        try:
+            return psutil.Process(pid).exe().startswith(self.tmpdir)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def spawn(self, name, lifetime):
+        child = subprocess.Popen([self.binary(name)] + self.args(lifetime),
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with self._lock:
+            self.children.append(child)
+        return child.pid
+
+    def reap(self):
+        with self._lock:
+            self.children = [child for child in self.children if child.poll() is None]
+
+    def cleanup(self):
+        with self._lock:
+            for child in self.children:
+                child.kill()
+            for child in self.children:
+                child.wait()
+            self.children = []
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class StormEngine(TerminationEngine):
+    """The real termination engine, limited to the storm's processes
+
+    Records when a monitor submitted each storm process; anything else a
+    monitor matches (a real taskmgr.exe on this machine) is refused.
+    """
+
+    def __init__(self, shim):
+        super().__init__(grace=0.5, kill_deadline=0.5)
+        self.shim = shim
+        self.detections = {}  # pid -> (monotonic time, rule)
+        self._detections_lock = threading.Lock()
+
+    def submit(self, proc, rule, source, detected_at=None, on_done=None):
+        now = time.monotonic()
+        if not self.shim.owns(proc.pid) or not super().submit(proc, rule, source, detected_at, on_done):
+            return False
+        with self._detections_lock:
+            self.detections.setdefault(proc.pid, (now, rule))
+        return True
+
+
+def install_shared_services(shim, args):
+    """Fresh process-wide services for one monitor run; returns the engine"""
+    engine = StormEngine(shim)
+    process_terminator._shared_engine = engine
+    process_sweep._shared_service = ProcessSweepService(interval=args.sweep_interval)
+    window_snapshot._shared_snapshot = WindowSnapshot(FakeWindowBackend())
+    exe_identity._shared_cache = ExecutableIdentityCache(path=None)  # keep the client's cache file clean
+    return engine
+
+
+def start_monitor(monitor, args):
+    """Start the real blocker; returns (backend description, stop)"""
+    if monitor == 'folder_blocker':
+        source = create_process_event_source(args.backend, poll_interval=args.sweep_interval)
+        blocker = FolderBlocker(event_source=source, window_backend=FakeWindowBackend())
+        blocker.install()
+        return source.name, blocker.uninstall
+    blocker = ProcessMonitor() if monitor == 'process_monitor' else AntiTaskManagerBlocker()
+    blocker.start_monitoring()
+    return f'sweep/{args.sweep_interval}s', blocker.stop_monitoring
+
+
+def thread_cpu_ms(exclude):
+    """CPU time of this process's threads other than the native id exclude"""
+    total = 0.0
+    for thread in psutil.Process().threads():
+        if thread.id != exclude:
+            total += thread.user_time + thread.system_time
+    return total * 1000
+
+
+def run_storm(monitor, args):
+    # explorer.exe and globs get special handling in the blockers; storm with plain names only
+    blocked_names = [name for name in monitor_block_list(monitor)
+                     if name != 'explorer.exe' and '*' not in name and '?' not in name]
+    shim = StormShim()
+    engine = install_shared_services(shim, args)
+    rng = random.Random(args.seed)
+    spawner = threading.get_native_id()
+
+    backend, stop = start_monitor(monitor, args)
+    spawned = {}  # pid -> (spawn time, name, should be blocked)
+    try:
+        time.sleep(0.5)  # let the monitor settle (first sweep / netlink subscription)
+        cpu_before = thread_cpu_ms(spawner)
+
+        period = 1.0 / args.rate
+        started = next_spawn = time.monotonic()
+        while time.monotonic() - started < args.duration:
+            should_block = rng.random() < args.match_ratio
+            name = rng.choice(blocked_names) if should_block else f'game{rng.randrange(1000)}.exe'
+            spawn_time = time.monotonic()
+            pid = shim.spawn(name, args.lifetime)
+            spawned[pid] = (spawn_time, name, should_block)
+            shim.reap()
+            next_spawn += period
+            delay = next_spawn - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Give the slowest path one more sweep to catch up with the last spawns
+        time.sleep(max(args.lifetime, args.sweep_interval) + 0.2)
+        cpu_ms = thread_cpu_ms(spawner) - cpu_before
+    finally:
+        stop()
+        process_sweep._shared_service.stop()
+        shim.cleanup()
+
+    histogram = LatencyHistogram()
+    missed = false_positives = 0
+    for pid, (spawn_time, name, should_block) in spawned.items():
+        detection = engine.detections.get(pid)
+        if should_block and detection:
+            histogram.record((detection[0] - spawn_time) * 1000)
+        elif should_block:
+            missed += 1
+        elif detection:
+            false_positives += 1
+
+    blocked_spawned = sum(1 for _, _, should_block in spawned.values() if should_block)
+    return {
+        'backend': backend,
+        'spawned': len(spawned),
+        'blocked_spawned': blocked_spawned,
+        'detected': histogram.total,
+        'missed': missed,
+        'false_positives': false_positives,
+        'detect_latency': histogram.summary(),
+        'monitor_cpu_ms': round(cpu_ms, 3),
+        'monitor_cpu_ms_per_spawn': round(cpu_ms / len(spawned), 4) if spawned else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process storm benchmark for the NetCafe monitors')
+    parser.add_argument('--rate', type=float, default=100, help='processes spawned per second')
+    parser.add_argument('--duration', type=float, default=5, help='seconds of spawning per monitor')
+    parser.add_argument('--lifetime', type=float, default=3, help='seconds each spawned process lives')
+    parser.add_argument('--match-ratio', type=float, default=0.2, help='share of spawns with a blocked name')
+    parser.add_argument('--sweep-interval', type=float, default=2.0, help='interval of the sweep-based monitors')
+    parser.add_argument('--backend', default=None, help="process event backend for folder_blocker ('polling' to force)")
+    parser.add_argument('--monitors', default=','.join(MONITORS), help='comma-separated monitors to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    args = parser.parse_args()
+
+    results = {
+        'config': {key: value for key, value in vars(args).items() if key != 'json'},
+        'stubbed_modules': STUBBED_MODULES,
+        'monitors': {},
+    }
+    for monitor in args.monitors.split(','):
+        results['monitors'][monitor] = run_storm(monitor, args)
+
+    if args.json:
+        print(json.dumps(results))
+        return 0
+
+    print("=" * 70)
+    print("⏱️ NetCafe Client - Process Storm Benchmark")
+    print("=" * 70)
+    print(f"🌩️  {args.rate:g} processes/s for {args.duration:g}s, lifetime {args.lifetime:g}s, "
+          f"{args.match_ratio:.0%} blocked names")
+    if STUBBED_MODULES:
+        print(f"🧩 Stand-ins for {', '.join(STUBBED_MODULES)}")
+    for monitor, r in results['monitors'].items():
+        latency = r['detect_latency']
+        print(f"\n🛡️  {monitor} ({r['backend']})")
+        print(f"   spawned {r['spawned']}, blocked names {r['blocked_spawned']}, detected {r['detected']}, "
+              f"missed {r['missed']}, false positives {r['false_positives']}")
+        if latency['count']:
+            print(f"   detect p50 {latency['p50_ms']:.1f} ms   p90 {latency['p90_ms']:.1f} ms   "
+                  f"p99 {latency['p99_ms']:.1f} ms   max {latency['max_ms']:.1f} ms")
+        print(f"   monitor CPU {r['monitor_cpu_ms']:.1f} ms ({r['monitor_cpu_ms_per_spawn']:.3f} ms/spawn)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+⏱️ NetCafe Client - Window Monitoring Benchmark
+Measures how long a File Explorer window / file dialog stays open before the
+blocker closes it: the old 1 s EnumWindows polling loop vs the event-driven
+WindowWatcher. Runs against the fake window backend on any platform.
+
+Usage: python benchmark_window_monitoring.py [--windows 100] [--background-windows 300]
+"""
+
+import sys
+import time
+import json
+import random
+import argparse
+import threading
+import statistics
+
+from window_events import FakeWindowEventSource, WindowWatcher, classify_window
+from window_snapshot import FakeWindowBackend, WindowSnapshot
+
+BLOCKED_WINDOWS = [('Documents', 'CabinetWClass'), ('This PC', 'ExploreWClass'), ('Save As', '#32770')]
+
+
+def make_desktop(background_windows):
+    backend = FakeWindowBackend()
+    for i in range(background_windows):
+        backend.add_window(1000 + i, f'Window {i}', 'UnityWndClass')
+    return backend
+
+
+def show_windows(source, count, spacing, shown_at):
+    """Open `count` blocked windows `spacing` seconds apart (jittered)"""
+    for i in range(count):
+        title, class_name = BLOCKED_WINDOWS[i % len(BLOCKED_WINDOWS)]
+        shown = time.monotonic()
+        window = source.show_window(5000 + i, title, class_name)
+        shown_at[window.hwnd] = shown
+        time.sleep(spacing * random.uniform(0.5, 1.5))
+
+
+def bench_polling(args):
+    """Old behaviour: enumerate all windows every poll interval and close matches"""
+    backend = make_desktop(args.background_windows)
+    source = FakeWindowEventSource(backend)  # not started - only adds windows
+    snapshot = WindowSnapshot(backend)
+    shown_at, latencies = {}, []
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            snapshot.refresh()
+            for window in snapshot.windows:
+                if classify_window(window):
+                    snapshot.close(window)
+                    latencies.append(time.monotonic() - shown_at[window.hwnd])
+            stop.wait(args.poll_interval)
+
+    poller = threading.Thread(target=poll, daemon=True)
+    poller.start()
+    show_windows(source, args.windows, args.spacing, shown_at)
+    deadline = time.monotonic() + args.poll_interval * 2
+    while len(latencies) < args.windows and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    poller.join()
+    return latencies, backend.enum_count
+
+
+def bench_events(args):
+    """New behaviour: WinEvent-style notifications feed the classification queue"""
+    backend = make_desktop(args.background_windows)
+    source = FakeWindowEventSource(backend)
+    shown_at, latencies = {}, []
+
+    def on_close(window, reason, latency):
+        latencies.append(time.monotonic() - shown_at[window.hwnd])
+
+    watcher = WindowWatcher(source, backend, on_close=on_close)
+    watcher.start()
+    try:
+        show_windows(source, args.windows, args.spacing, shown_at)
+        deadline = time.monotonic() + 1
+        while len(latencies) < args.windows and time.monotonic() < deadline:
+            time.sleep(0.001)
+    finally:
+        watcher.stop()
+    return latencies, backend.enum_count
+
+
+def summarize(latencies, enumerations, expected):
+    ms = sorted(latency * 1000 for latency in latencies) or [float('nan')]
+    return {
+        'closed': len(latencies),
+        'missed': expected - len(latencies),
+        'enumerations': enumerations,
+        'mean_ms': round(statistics.mean(ms), 3),
+        'p50_ms': round(ms[len(ms) // 2], 3),
+        'p99_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 3),
+        'max_ms': round(ms[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Window blocking latency benchmark')
+    parser.add_argument('--windows', type=int, default=100, help='blocked windows to open')
+    parser.add_argument('--background-windows', type=int, default=300, help='unrelated windows on the desktop')
+    parser.add_argument('--spacing', type=float, default=0.02, help='mean seconds between opened windows')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='interval of the polling loop')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results only')
+    args = parser.parse_args()
+
+    results = {
+        'polling': summarize(*bench_polling(args), args.windows),
+        'events': summarize(*bench_events(args), args.windows),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return 0
+
+    print("=" * 70)
+    print("⏱️ NetCafe Client - Window Monitoring Benchmark")
+    print("=" * 70)
+    print(f"🪟 {args.windows} blocked windows among {args.background_windows} others")
+    for name, r in results.items():
+        print(f"   {name:<8} p50 {r['p50_ms']:9.3f} ms   p99 {r['p99_ms']:9.3f} ms   "
+              f"max {r['max_ms']:9.3f} ms   missed {r['missed']}   enumerations {r['enumerations']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
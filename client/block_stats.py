@@ -0,0 +1,264 @@
+"""
+Block-event statistics for the NetCafe blockers.
+
+Every enforcement action (process killed, window closed) is recorded into
+a fixed-size ring buffer: timestamp, pid, process, rule, which blocker did
+it, detect latency (process start -> detection) and kill latency
+(detection -> terminate/close issued). The slots are preallocated arrays,
+so recording does not allocate. Counters and log-linear (HDR style) latency
+histograms sit on top; the tray menu shows a summary and the client
+uploads the events that have not been sent yet to the server.
+"""
+
+import math
+import time
+import logging
+import threading
+from array import array
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# timestamp is time.time() of the detection; latencies are ms or None
+BlockEvent = namedtuple('BlockEvent', ['seq', 'timestamp', 'source', 'pid', 'process', 'rule', 'detect_ms', 'kill_ms'])
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies with a fixed number of counters
+
+    Values are stored in microseconds with 16 linear sub-buckets per power
+    of two (like HdrHistogram with ~1.5 significant digits), so every
+    percentile is within ~6% of the true value, from 1 us up to ~25 days.
+    """
+
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # values below this are exact
+    HALF = SUB_BUCKETS // 2
+    MAX_SHIFT = 36
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (self.SUB_BUCKETS + self.MAX_SHIFT * self.HALF)))
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def _index(self, us):
+        if us < self.SUB_BUCKETS:
+            return us
+        shift = min(us.bit_length() - self.SUB_BUCKET_BITS, self.MAX_SHIFT)
+        top = min(us >> shift, self.SUB_BUCKETS - 1)
+        return self.SUB_BUCKETS + (shift - 1) * self.HALF + (top - self.HALF)
+
+    def _value(self, index):
+        """Midpoint of a bucket in microseconds"""
+        if index < self.SUB_BUCKETS:
+            return index
+        shift = (index - self.SUB_BUCKETS) // self.HALF + 1
+        top = (index - self.SUB_BUCKETS) % self.HALF + self.HALF
+        return (top << shift) + (1 << shift) // 2
+
+    def record(self, ms):
+        us = max(0, int(ms * 1000))
+        self.counts[self._index(us)] += 1
+        self.total += 1
+        self.sum_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile(self, p):
+        """Latency in ms below which p percent of the values fall (None if empty)"""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self):
+        if not self.total:
+            return {'count': 0}
+        return {
+            'count': self.total,
+            'mean_ms': round(self.sum_us / self.total / 1000, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_us / 1000, 3),
+        }
+
+
+class BlockEventLog:
+    """Fixed-capacity ring buffer of block events in preallocated slots"""
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.detect_ms = array('d', [math.nan]) * capacity
+        self.kill_ms = array('d', [math.nan]) * capacity
+        self.pids = array('q', bytes(8 * capacity))
+        self.sources = [None] * capacity
+        self.processes = [None] * capacity
+        self.rules = [None] * capacity
+        self.written = 0  # sequence number of the next event
+
+    def append(self, timestamp, source, pid, process, rule, detect_ms, kill_ms):
+        slot = self.written % self.capacity
+        self.timestamps[slot] = timestamp
+        self.sources[slot] = source
+        self.pids[slot] = pid
+        self.processes[slot] = process
+        self.rules[slot] = rule
+        self.detect_ms[slot] = math.nan if detect_ms is None else detect_ms
+        self.kill_ms[slot] = math.nan if kill_ms is None else kill_ms
+        self.written += 1
+
+    def events(self, since=0):
+        """BlockEvents with seq >= since that are still in the buffer, oldest first"""
+        start = max(since, self.written - self.capacity)
+        events = []
+        for seq in range(start, self.written):
+            slot = seq % self.capacity
+            detect_ms, kill_ms = self.detect_ms[slot], self.kill_ms[slot]
+            events.append(BlockEvent(
+                seq, self.timestamps[slot], self.sources[slot], self.pids[slot],
+                self.processes[slot], self.rules[slot],
+                None if math.isnan(detect_ms) else round(detect_ms, 3),
+                None if math.isnan(kill_ms) else round(kill_ms, 3),
+            ))
+        return events
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+
+class BlockStats:
+    """Block counters, latency histograms and the event ring buffer"""
+
+    def __init__(self, capacity=1024):
+        self.log = BlockEventLog(capacity)
+        self.detect_latency = LatencyHistogram()
+        self.kill_latency = LatencyHistogram()
+        self.by_rule = {}
+        self.by_source = {}
+        self.uploaded_seq = 0  # events below this seq reached the server
+        self._lock = threading.Lock()
+
+    def record(self, source, rule, pid=0, process=None, started_at=None, detected_at=None,
+               killed_at=None, detect_ms=None, kill_ms=None):
+        """Record one block
+
+        started_at/detected_at/killed_at are time.time() values (process start,
+        when the blocker noticed it, when the process was gone - or the close
+        was issued, for windows);
+        detect_ms/kill_ms may be passed directly instead.
+        """
+        now = time.time()
+        detected_at = detected_at or now
+        if detect_ms is None and started_at:
+            detect_ms = max(0.0, (detected_at - started_at) * 1000)
+        if kill_ms is None and killed_at:
+            kill_ms = max(0.0, (killed_at - detected_at) * 1000)
+
+        with self._lock:
+            self.log.append(detected_at, source, pid or 0, process, rule, detect_ms, kill_ms)
+            self.by_rule[rule] = self.by_rule.get(rule, 0) + 1
+            self.by_source[source] = self.by_source.get(source, 0) + 1
+            if detect_ms is not None:
+                self.detect_latency.record(detect_ms)
+            if kill_ms is not None:
+                self.kill_latency.record(kill_ms)
+
+    @property
+    def total(self):
+        return self.log.written
+
+    def summary(self):
+        with self._lock:
+            return {
+                'total': self.log.written,
+                'by_rule': dict(self.by_rule),
+                'by_source': dict(self.by_source),
+                'detect_latency': self.detect_latency.summary(),
+                'kill_latency': self.kill_latency.summary(),
+            }
+
+    def events(self, since=0):
+        """BlockEvents with seq >= since that are still in the ring buffer"""
+        with self._lock:
+            return self.log.events(since)
+
+    def recent(self, count=10):
+        with self._lock:
+            return self.log.events(max(0, self.log.written - count))
+
+    def upload_payload(self):
+        """Events not yet acknowledged by the server plus the summary
+
+        Call mark_uploaded(payload['next_seq']) once the server accepted it;
+        events overwritten before they were sent are reported as 'lost'.
+        """
+        with self._lock:
+            events = self.log.events(self.uploaded_seq)
+            next_seq = self.log.written
+            lost = (events[0].seq if events else next_seq) - self.uploaded_seq
+        return {
+            'events': [event._asdict() for event in events],
+            'lost': lost,
+            'next_seq': next_seq,
+            'summary': self.summary(),
+        }
+
+    def mark_uploaded(self, seq):
+        with self._lock:
+            self.uploaded_seq = max(self.uploaded_seq, seq)
+
+    def format_summary(self):
+        """Short multi-line text for a tray message"""
+        summary = self.summary()
+        lines = [f"🛡️ {summary['total']} blocks"]
+        top = sorted(summary['by_rule'].items(), key=lambda item: -item[1])[:3]
+        if top:
+            lines.append(', '.join(f"{rule} ×{count}" for rule, count in top))
+        for label, key in (('Detect', 'detect_latency'), ('Kill', 'kill_latency')):
+            hist = summary[key]
+            if hist['count']:
+                lines.append(f"{label}: p50 {hist['p50_ms']:.1f} ms, p99 {hist['p99_ms']:.1f} ms")
+        return '\n'.join(lines)
+
+
+async def upload_block_stats(session, server_url, computer_id, stats, extra=None):
+    """POST pending block events to the server; returns True when accepted
+
+    extra is merged into the payload (e.g. keyboard hook health) and makes
+    the upload happen even when there are no new events.
+    """
+    payload = stats.upload_payload()
+    if not payload['events'] and not payload['lost'] and not extra:
+        return True
+    payload.update(extra or {})
+    payload['computer_id'] = computer_id
+    try:
+        async with session.post(f"{server_url}/api/security_stats", json=payload) as response:
+            if response.status == 200:
+                stats.mark_uploaded(payload['next_seq'])
+                return True
+            logger.warning(f"⚠️ Block stats upload failed: {response.status}")
+    except Exception as e:
+        logger.warning(f"⚠️ Block stats upload error: {e}")
+    return False
+
+
+_shared_stats = None
+_shared_lock = threading.Lock()
+
+
+def get_block_stats():
+    """Return the process-wide BlockStats"""
+    global _shared_stats
+    with _shared_lock:
+        if _shared_stats is None:
+            _shared_stats = BlockStats()
+        return _shared_stats
@@ -26,6 +26,13 @@ import win32api
 import win32gui
 import win32process
 
+# hook_log, keyboard_decision and http_session are shared with the main client in the
+# directory above - appended, so this directory's own modules still come first
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_log import get_hook_log
+from keyboard_decision import EnhancedKeyDecision
+from http_session import HttpSessionManager
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -57,79 +64,42 @@ class EnhancedKeyboardBlocker:
         }
         self.message_pump_thread = None
         self.stop_pump = False
+        self.strict_mode = True  # read by the hook on every key - switching it needs no reinstall
+        
+        # Tracks Alt/Ctrl/Windows from the hook's own messages; the rules live in
+        # keyboard_decision.py so key_trace.py can replay them without Windows
+        self.decision = EnhancedKeyDecision()
         
-        # Track modifier states
-        self.alt_pressed = False
-        self.ctrl_pressed = False
-        self.windows_pressed = False
+        # Blocked keys are counted here and logged by a background drainer - never from the hook
+        self.events = get_hook_log().channel('enhanced_keyboard', "🚫 Enhanced keyboard blocker")
         
     def install(self, strict_mode=True):
-        """Install enhanced keyboard blocker"""
+        """Install enhanced keyboard blocker
+        
+        The hook is installed once; if it is already in place this only
+        switches the mode (see set_mode), leaving no moment without a hook.
+        """
+        if self.hook:
+            self.set_mode(strict_mode)
+            return True
+        self.strict_mode = strict_mode
         try:
             if not ctypes.windll.shell32.IsUserAnAdmin():
                 logger.warning("⚠️  Administrator privileges required for keyboard blocking!")
                 return False
             
+            events = self.events
+            decision = self.decision
+            
             # Define the hook procedure
             def enhanced_keyboard_proc(nCode, wParam, lParam):
                 if nCode >= 0:
                     # Get virtual key code
                     vk_code = ctypes.c_int(lParam.contents.vkCode).value
                     
-                    # Track modifier keys
-                    if wParam in [win32con.WM_KEYDOWN, win32con.WM_SYSKEYDOWN]:
-                        if vk_code in [win32con.VK_LMENU, win32con.VK_RMENU]:
-                            self.alt_pressed = True
-                        elif vk_code in [win32con.VK_LCONTROL, win32con.VK_RCONTROL]:
-                            self.ctrl_pressed = True  
-                        elif vk_code in [win32con.VK_LWIN, win32con.VK_RWIN]:
-                            self.windows_pressed = True
-                    
-                    elif wParam in [win32con.WM_KEYUP, win32con.WM_SYSKEYUP]:
-                        if vk_code in [win32con.VK_LMENU, win32con.VK_RMENU]:
-                            self.alt_pressed = False
-                        elif vk_code in [win32con.VK_LCONTROL, win32con.VK_RCONTROL]:
-                            self.ctrl_pressed = False
-                        elif vk_code in [win32con.VK_LWIN, win32con.VK_RWIN]:
-                            self.windows_pressed = False
-                    
-                    # Block dangerous combinations
-                    should_block = False
-                    
-                    if strict_mode:
-                        # STRICT MODE - Block almost everything dangerous
-                        
-                        # Block Alt + F4 (close application)
-                        if self.alt_pressed and vk_code == win32con.VK_F4:
-                            should_block = True
-                            logger.info("🚫 Blocked Alt+F4")
-                        
-                        # Block Alt + Tab (task switcher)
-                        elif self.alt_pressed and vk_code == win32con.VK_TAB:
-                            should_block = True
-                            logger.info("🚫 Blocked Alt+Tab")
-                        
-                        # Block Windows key combinations
-                        elif self.windows_pressed or vk_code in [win32con.VK_LWIN, win32con.VK_RWIN]:
-                            should_block = True
-                            logger.info("🚫 Blocked Windows key")
-                        
-                        # Block Ctrl + Shift + Esc (Task Manager)
-                        elif self.ctrl_pressed and win32api.GetAsyncKeyState(win32con.VK_SHIFT) and vk_code == win32con.VK_ESCAPE:
-                            should_block = True
-                            logger.info("🚫 Blocked Ctrl+Shift+Esc")
-                        
-                        # Block Ctrl + Alt + Del attempt (partial)
-                        elif self.ctrl_pressed and self.alt_pressed and vk_code == win32con.VK_DELETE:
-                            should_block = True
-                            logger.info("🚫 Blocked Ctrl+Alt+Del attempt")
-                        
-                        # Block F11 (fullscreen toggle)
-                        elif vk_code == win32con.VK_F11:
-                            should_block = True
-                            logger.info("🚫 Blocked F11")
-                    
-                    if should_block:
+                    blocked = decision.on_message(wParam, vk_code, self.strict_mode, win32api.GetAsyncKeyState)
+                    if blocked:
+                        events.record(blocked)
                         return 1  # Block the key
                 
                 # Call next hook
@@ -165,6 +135,11 @@ class EnhancedKeyboardBlocker:
             logger.error(f"Failed to install enhanced keyboard blocker: {e}")
             return False
     
+    def set_mode(self, strict_mode):
+        """Switch STRICT/MINIMAL on the running hook - one attribute store"""
+        self.strict_mode = strict_mode
+        logger.info(f"🔐 Enhanced keyboard blocker switched to {'STRICT' if strict_mode else 'MINIMAL'} mode")
+    
     def _message_pump(self):
         """Enhanced message pump"""
         try:
@@ -192,6 +167,7 @@ class EnhancedKeyboardBlocker:
             if self.hook:
                 ctypes.windll.user32.UnhookWindowsHookExW(self.hook)
                 self.hook = None
+                get_hook_log().flush()  # log the blocks of the last interval now
                 logger.info("🔓 Enhanced keyboard blocker uninstalled")
             
             if self.message_pump_thread and self.message_pump_thread.is_alive():
@@ -388,8 +364,8 @@ class EnhancedNetCafeClient:
         self.server_port = self.config['server']['port']
         self.current_host_index = 0
         
-        # Network
-        self.session = None
+        # Network - one pooled HTTP session for login and logout
+        self.http = HttpSessionManager(self.config['server'].get('http'))
         self.ws = None
         self.ws_task = None
         self.reconnect_attempts = 0
@@ -486,10 +462,7 @@ class EnhancedNetCafeClient:
                 'computer_id': self.computer_id
             }
             
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
-            async with self.session.post(f'{server_url}/api/login', json=login_data) as response:
+            async with self.http.post(f'{server_url}/api/login', json=login_data) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get('success'):
@@ -509,9 +482,7 @@ class EnhancedNetCafeClient:
         self.session_active = True
         self.remaining_time = minutes * 60  # Convert to seconds
         
-        # Switch to minimal security mode during gaming
-        self.keyboard_blocker.uninstall()
-        await asyncio.sleep(0.5)  # Brief pause
+        # Switch to minimal security mode during gaming (same hook, no unprotected pause)
         self.keyboard_blocker.install(strict_mode=False)  # Minimal blocking
         
         logger.info(f"🎮 Gaming session started: {minutes} minutes")
@@ -546,15 +517,13 @@ class EnhancedNetCafeClient:
                     'session_id': self.session_id,
                     'minutes_used': 0  # Calculate actual usage
                 }
-                async with self.session.post(f'{server_url}/api/logout', json=logout_data) as response:
+                async with self.http.post(f'{server_url}/api/logout', json=logout_data) as response:
                     if response.status == 200:
                         logger.info("✅ Logout successful")
             except Exception as e:
                 logger.error(f"Logout error: {e}")
         
-        # Return to strict security mode
-        self.keyboard_blocker.uninstall()
-        await asyncio.sleep(0.5)
+        # Return to strict security mode (same hook, no unprotected pause)
         self.keyboard_blocker.install(strict_mode=True)
         
         logger.info("🔐 Session ended - Computer locked")
@@ -574,8 +543,8 @@ class EnhancedNetCafeClient:
         try:
             self.keyboard_blocker.uninstall()
             
-            if self.session and not self.session.closed:
-                asyncio.create_task(self.session.close())
+            if not self.http.closed:
+                asyncio.create_task(self.http.close())
                 
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
@@ -588,7 +557,11 @@ class EnhancedNetCafeClient:
             with self.loop:
                 # Start the secure login loop
                 self.loop.create_task(self.secure_login_loop())
-                self.loop.run_forever()
+                try:
+                    self.loop.run_forever()
+                finally:
+                    # Close pooled connections while the loop can still run it
+                    self.loop.run_until_complete(self.http.close())
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
         except Exception as e:
@@ -0,0 +1,335 @@
+"""
+Out-of-process enforcement for the NetCafe clients.
+
+The process and window monitors (FolderBlocker, AntiTaskManagerBlocker,
+ProcessMonitor) spend their time in psutil/win32 calls that hold the GIL.
+In the UI process that delays the Qt loop and the low-level keyboard hook
+callback, which Windows silently unhooks once it times out. With
+`performance.enforcement_worker` enabled the monitors run in a separate
+process instead:
+
+  UI process                                 enforcement worker
+  EnforcementSupervisor  -- pipe commands -> worker_main()
+    RemoteMonitor stand-ins                    real blocker instances
+    NotificationQueue / BlockStats  <- notices, block events, heartbeats
+
+The supervisor restarts the worker (with exponential backoff) when it
+exits or stops sending heartbeats, and replays the configuration, lock
+state, policies and running monitors into the new worker.
+"""
+
+import os
+import time
+import logging
+import importlib
+import threading
+import multiprocessing
+
+from block_stats import get_block_stats
+from security_notifications import get_notification_queue
+
+logger = logging.getLogger(__name__)
+
+# name -> (module, class, start method, stop method)
+MONITORS = {
+    'folder_blocker': ('netcafe_client', 'FolderBlocker', 'install', 'uninstall'),
+    'anti_task_manager': ('netcafe_client_secure', 'AntiTaskManagerBlocker', 'start_monitoring', 'stop_monitoring'),
+    'process_monitor': ('enhanced_security', 'ProcessMonitor', 'start_monitoring', 'stop_monitoring'),
+}
+
+FORWARD_INTERVAL = 0.1  # how often the worker forwards notices/blocks (and polls for commands)
+
+
+def worker_main(conn, heartbeat_interval=1.0, log_file='client.log'):
+    """Entry point of the enforcement process; runs until 'shutdown' or the UI process is gone"""
+    from process_sweep import get_sweep_service
+    from process_policy import compile_process_policy
+
+    # Same log as the UI process (a spawned process starts without handlers)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+    parent_pid = os.getppid()
+    notifications = get_notification_queue()
+    notifications.configure(min_interval=0, coalesce_window=0)  # rate limiting happens in the UI
+    stats = get_block_stats()
+    sent_seq = 0
+    monitors = {}  # name -> (instance, stop method)
+    policies = {}  # name -> last `security` section sent for it (may come before its 'start')
+    last_heartbeat = 0.0
+
+    def start(name, spec):
+        if name in monitors:
+            return
+        module_name, class_name, start_method, stop_method = spec
+        monitor = getattr(importlib.import_module(module_name), class_name)()
+        if name in policies and hasattr(monitor, 'set_policy'):
+            monitor.set_policy(compile_process_policy(policies[name]))
+        getattr(monitor, start_method)()
+        monitors[name] = (monitor, stop_method)
+        logger.info(f"🛡️ Enforcement worker started {name}")
+
+    def stop(name):
+        entry = monitors.pop(name, None)
+        if entry:
+            monitor, stop_method = entry
+            getattr(monitor, stop_method)()
+
+    def handle(message):
+        kind = message[0]
+        if kind == 'start':
+            start(message[1], message[2])
+        elif kind == 'stop':
+            stop(message[1])
+        elif kind == 'configure':
+            get_sweep_service().configure(message[1])
+        elif kind == 'set_locked':
+            get_sweep_service().set_locked(message[1])
+        elif kind == 'policy':
+            policies[message[1]] = message[2]
+            entry = monitors.get(message[1])
+            if entry and hasattr(entry[0], 'set_policy'):
+                entry[0].set_policy(compile_process_policy(message[2]))
+        elif kind == 'shutdown':
+            return False
+        return True
+
+    running = True
+    while running:
+        try:
+            if conn.poll(FORWARD_INTERVAL):
+                running = handle(conn.recv())
+        except (EOFError, OSError):
+            break  # UI process closed the pipe
+        except Exception as e:
+            logger.error(f"Enforcement worker command error: {e}")
+
+        try:
+            while True:
+                notice = notifications.next_notice()
+                if notice is None:
+                    break
+                conn.send(('notice', notice.title, notice.text, notice.key))
+
+            events = stats.events(sent_seq)
+            if events:
+                conn.send(('blocks', [event._asdict() for event in events]))
+                sent_seq = events[-1].seq + 1
+
+            now = time.monotonic()
+            if now - last_heartbeat >= heartbeat_interval:
+                conn.send(('heartbeat', os.getpid(), sorted(monitors), get_sweep_service().stats()))
+                last_heartbeat = now
+        except (BrokenPipeError, EOFError, OSError):
+            break
+
+        if os.getppid() != parent_pid:
+            break  # orphaned - the UI process died without closing the pipe
+
+    for name in list(monitors):
+        try:
+            stop(name)
+        except Exception as e:
+            logger.error(f"Error stopping {name}: {e}")
+
+
+class RemoteMonitor:
+    """Stand-in for a blocker whose work runs in the enforcement worker
+
+    Has the start/stop methods of all the blockers, so the clients call it
+    exactly like the local FolderBlocker/AntiTaskManagerBlocker/ProcessMonitor.
+    """
+
+    def __init__(self, supervisor, name, spec):
+        self.supervisor = supervisor
+        self.name = name
+        self.spec = spec
+
+    @property
+    def running(self):
+        return self.name in self.supervisor.active
+
+    enabled = monitoring = running
+
+    def start(self, *args, **kwargs):
+        self.supervisor.start_monitor(self.name, self.spec)
+
+    def stop(self):
+        self.supervisor.stop_monitor(self.name)
+
+    install = start_monitoring = start
+    uninstall = stop_monitoring = stop
+
+    def set_policy(self, policy):
+        """Recompiled from the same config section inside the worker"""
+        self.supervisor.apply_policy(self.name, policy.source)
+
+
+class EnforcementSupervisor:
+    """Runs the enforcement worker process and restarts it when it dies or hangs"""
+
+    def __init__(self, heartbeat_interval=1.0, heartbeat_timeout=5.0, restart_backoff=1.0, max_backoff=30.0,
+                 log_file='client.log'):
+        self.heartbeat_interval = heartbeat_interval
+        self.log_file = log_file  # the worker's log; the UI process's client.log by default
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.process = None
+        self.conn = None
+        self.active = {}  # name -> spec of the monitors that should be running
+        self.state = {}  # key -> last configure/set_locked/policy message, replayed after a restart
+        self.restarts = 0
+        self.started_at = None
+        self.last_heartbeat = None
+        self.worker_monitors = []
+        self.worker_sweep = {}
+        self._send_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.thread = None
+
+    def monitor(self, name, spec=None):
+        """RemoteMonitor for one of MONITORS (or a custom (module, class, start, stop) spec)"""
+        return RemoteMonitor(self, name, spec or MONITORS[name])
+
+    def start(self):
+        if self.thread:
+            return
+        self._stop_event.clear()
+        self._spawn()
+        self.thread = threading.Thread(target=self._run, daemon=True, name='enforcement-supervisor')
+        self.thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        self._send(('shutdown',))
+        self._kill(timeout=2)
+        logger.info("🛡️ Enforcement worker stopped")
+
+    def start_monitor(self, name, spec):
+        self.active[name] = spec
+        self._send(('start', name, spec))
+
+    def stop_monitor(self, name):
+        if self.active.pop(name, None) is not None:
+            self._send(('stop', name))
+
+    def configure(self, performance):
+        self._remember('configure', ('configure', performance))
+
+    def set_locked(self, locked):
+        self._remember('set_locked', ('set_locked', locked))
+
+    def apply_policy(self, name, security):
+        self._remember(('policy', name), ('policy', name, security))
+
+    def stats(self):
+        return {
+            'pid': self.process.pid if self.process else None,
+            'alive': bool(self.process and self.process.is_alive()),
+            'restarts': self.restarts,
+            'heartbeat_age': round(time.monotonic() - self.last_heartbeat, 3) if self.last_heartbeat else None,
+            'monitors': list(self.worker_monitors),
+            'sweep': dict(self.worker_sweep),
+        }
+
+    def _remember(self, key, message):
+        self.state[key] = message
+        self._send(message)
+
+    def _send(self, message):
+        with self._send_lock:
+            if self.conn is None:
+                return
+            try:
+                self.conn.send(message)
+            except (BrokenPipeError, EOFError, OSError):
+                pass  # the supervisor thread notices the dead worker and restarts it
+
+    def _spawn(self):
+        ctx = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=worker_main, args=(child_conn, self.heartbeat_interval, self.log_file),
+                              daemon=True, name='netcafe-enforcement')
+        process.start()
+        child_conn.close()
+        with self._send_lock:
+            self.process, self.conn = process, parent_conn
+        self.started_at = self.last_heartbeat = time.monotonic()
+        for message in list(self.state.values()):
+            self._send(message)
+        for name, spec in list(self.active.items()):
+            self._send(('start', name, spec))
+        logger.info(f"🛡️ Enforcement worker running (PID {process.pid})")
+
+    def _kill(self, timeout=1.0):
+        with self._send_lock:
+            process, conn = self.process, self.conn
+            self.conn = None
+        if process:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+                process.join(timeout)
+        if conn:
+            conn.close()
+
+    def _run(self):
+        backoff = self.restart_backoff
+        while not self._stop_event.is_set():
+            dead = False
+            try:
+                if self.conn.poll(0.25):
+                    self._handle(self.conn.recv())
+            except (EOFError, OSError):
+                dead = True
+            except Exception as e:
+                logger.error(f"Enforcement message error: {e}")
+
+            now = time.monotonic()
+            if self._stop_event.is_set():
+                break
+            if dead or not self.process.is_alive() or now - self.last_heartbeat > self.heartbeat_timeout:
+                logger.warning(f"⚠️ Enforcement worker {'exited' if dead or not self.process.is_alive() else 'hung'}"
+                               f" - restarting in {backoff:.1f}s")
+                self._kill(timeout=0.5)
+                if self._stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, self.max_backoff)
+                self.restarts += 1
+                self._spawn()
+            elif now - self.started_at > 60:
+                backoff = self.restart_backoff  # stable again - next crash restarts quickly
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == 'heartbeat':
+            self.last_heartbeat = time.monotonic()
+            self.worker_monitors, self.worker_sweep = message[2], message[3]
+        elif kind == 'notice':
+            get_notification_queue().post(message[1], message[2], key=message[3])
+        elif kind == 'blocks':
+            stats = get_block_stats()
+            for event in message[1]:
+                stats.record(event['source'], event['rule'], event['pid'], event['process'],
+                             detected_at=event['timestamp'], detect_ms=event['detect_ms'], kill_ms=event['kill_ms'])
+
+
+def create_enforcement_supervisor(performance):
+    """A started EnforcementSupervisor if `performance.enforcement_worker` is on, else None"""
+    if not performance.get('enforcement_worker', False):
+        return None
+    supervisor = EnforcementSupervisor(
+        heartbeat_timeout=performance.get('enforcement_heartbeat_timeout', 5.0),
+    )
+    supervisor.configure(performance)
+    supervisor.start()
+    return supervisor
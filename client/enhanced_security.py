@@ -2,8 +2,6 @@ import ctypes
 import ctypes.wintypes
 import winreg
 import psutil
-import win32api
-import win32con
 import win32process
 import win32security
 import win32gui
@@ -16,43 +14,36 @@ import os
 import sys
 from typing import List, Dict, Optional
 
+from process_policy import compile_process_policy
+from process_sweep import get_sweep_service
+from process_snapshot import SweepResult, fetch_attrs
+from exe_identity import HashBlocklist, get_identity_cache
+from security_notifications import get_notification_queue
+from block_stats import get_block_stats
+from process_terminator import get_termination_engine
+from hook_log import get_hook_log
+from keyboard_decision import KeyDecisionEngine
+from keyboard_policy import compile_keyboard_policy
+
 logger = logging.getLogger(__name__)
 
+WM_QUIT = 0x0012
+
 class AdvancedKeyboardBlocker:
     """Разширен блокер на клавиатурни комбинации за NetCafe"""
     
-    def __init__(self):
+    def __init__(self, policy=None):
         self.hooked = None
         self.enabled = False
-        self.blocked_keys = {
-            # Windows клавиши
-            0x5B: "Left Windows Key",
-            0x5C: "Right Windows Key",
-            
-            # Системни комбинации
-            0x1B: "Escape (за блокиране Ctrl+Esc)",
-            0x09: "Tab (за блокиране Alt+Tab)",
-            0x73: "F4 (за блокиране Alt+F4)",
-            0x7A: "F11 (за блокиране Fullscreen toggle)",
-            0x7B: "F12 (за блокиране DevTools)",
-            
-            # Системни функции
-            0x70: "F1 (Help)",
-            0x71: "F2 (Rename)",
-            0x72: "F3 (Search)",
-            0x74: "F5 (Refresh)",
-            0x75: "F6 (Address bar)",
-            0x76: "F7",
-            0x77: "F8",
-            0x78: "F9",
-            0x79: "F10 (Menu)",
-            
-            # Специални клавиши
-            0x2C: "Print Screen",
-            0x91: "Scroll Lock",
-            0x13: "Pause/Break",
-            0x5D: "Menu Key",
-        }
+        self.pointer = None
+        self.thread = None
+        self.thread_id = None  # нишката на hook-а - само тя получава WM_QUIT
+        # Таблици от security.keyboard_blocking (SecurityManager.apply_policies);
+        # по подразбиране - стандартните флагове. Режимът започва от заключения екран
+        self.policy = policy or compile_keyboard_policy()
+        self.engine = KeyDecisionEngine(self.policy.tables, mode='lock')
+        # Блокираните клавиши се броят тук и се логват от фонова нишка - никога от самия hook
+        self.events = get_hook_log().channel('advanced_keyboard', "⌨️ Advanced keyboard blocker", logging.DEBUG)
     
     def install(self):
         """Инсталира разширения клавиатурен блокер"""
@@ -67,54 +58,35 @@ class AdvancedKeyboardBlocker:
                 ctypes.POINTER(ctypes.c_void_p)
             )
             
+            events = self.events
+            engine = self.engine
+            engine.reset()  # клавишите, натиснати преди hook-а, не са проследени
+            
             def advanced_keyboard_proc(nCode, wParam, lParam):
                 if nCode == 0:
                     vk_code = ctypes.cast(lParam, ctypes.POINTER(ctypes.c_ulong * 6))[0][0]
                     
-                    # Блокиране на основни клавиши
-                    if vk_code in self.blocked_keys:
-                        logger.debug(f"Blocked key: {self.blocked_keys[vk_code]} (0x{vk_code:02X})")
-                        return 1
-                    
-                    # Блокиране на Alt+Tab
-                    if vk_code == 0x09 and (win32api.GetAsyncKeyState(win32con.VK_MENU) & 0x8000):
-                        logger.debug("Blocked Alt+Tab")
-                        return 1
-                    
-                    # Блокиране на Alt+F4
-                    if vk_code == 0x73 and (win32api.GetAsyncKeyState(win32con.VK_MENU) & 0x8000):
-                        logger.debug("Blocked Alt+F4")
-                        return 1
-                    
-                    # Блокиране на Ctrl+Shift+Esc (Task Manager)
-                    if vk_code == 0x1B and (
-                        (win32api.GetAsyncKeyState(win32con.VK_CONTROL) & 0x8000) and
-                        (win32api.GetAsyncKeyState(win32con.VK_SHIFT) & 0x8000)
-                    ):
-                        logger.debug("Blocked Ctrl+Shift+Esc")
-                        return 1
-                    
-                    # Блокиране на Ctrl+Alt+Del защита
-                    if vk_code == 0x2E and (
-                        (win32api.GetAsyncKeyState(win32con.VK_CONTROL) & 0x8000) and
-                        (win32api.GetAsyncKeyState(win32con.VK_MENU) & 0x8000)
-                    ):
-                        logger.debug("Blocked Ctrl+Alt+Del")
+                    # Един индекс в таблицата на текущия режим - модификаторите идват
+                    # от събитията на самия hook, без GetAsyncKeyState
+                    blocked = engine.on_message(wParam, vk_code)
+                    if blocked:
+                        events.record(blocked)
                         return 1
                 
                 return ctypes.windll.user32.CallNextHookEx(self.hooked, nCode, wParam, lParam)
             
             self.pointer = CMPFUNC(advanced_keyboard_proc)
-            self.hooked = ctypes.windll.user32.SetWindowsHookExA(
-                13,  # WH_KEYBOARD_LL
-                self.pointer,
-                ctypes.windll.kernel32.GetModuleHandleW(None),
-                0
-            )
+            
+            # Hook-ът се инсталира от нишката, която ще го обслужва - Windows доставя
+            # събитията му само докато точно тази нишка чака в GetMessage
+            ready = threading.Event()
+            self.thread = threading.Thread(target=self._message_loop, args=(ready,), daemon=True,
+                                           name='advanced-keyboard-hook')
+            self.thread.start()
+            ready.wait(timeout=2)
             
             if self.hooked:
                 self.enabled = True
-                self._start_message_loop()
                 logger.info("Advanced keyboard blocker installed successfully")
             else:
                 logger.error("Failed to install keyboard hook")
@@ -122,27 +94,67 @@ class AdvancedKeyboardBlocker:
         except Exception as e:
             logger.error(f"Failed to install advanced keyboard blocker: {e}")
     
-    def _start_message_loop(self):
-        """Стартира message loop в отделен thread"""
-        def msg_loop():
-            while self.enabled:
-                try:
-                    ctypes.windll.user32.PeekMessageW(None, 0, 0, 0, 0)
-                    time.sleep(0.01)  # Малко забавяне за да не натоварва CPU
-                except Exception as e:
-                    logger.error(f"Message loop error: {e}")
-                    break
+    def set_policy(self, policy):
+        """Подменя таблиците в движение - hook-ът остава инсталиран"""
+        self.engine.set_tables(policy.tables)
+        self.policy = policy
+        logger.info(f"⌨️ Keyboard policy v{policy.version} applied: {policy.stats()['modes']} blocked slots per mode")
+    
+    def set_mode(self, mode):
+        """Сменя профила ('lock', 'gaming', 'admin', ...) - една подмяна на референция"""
+        if mode == self.engine.mode:
+            return
+        self.engine.set_mode(mode)
+        logger.info(f"⌨️ Keyboard blocking switched to the {mode} profile")
+    
+    def _message_loop(self, ready):
+        """Инсталира hook-а и обслужва съобщенията му до WM_QUIT
+        
+        GetMessageW спи в ядрото, докато няма събитие - без периодично събуждане
+        и без GIL. uninstall() пуска WM_QUIT с PostThreadMessageW.
+        """
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        try:
+            self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            self.hooked = user32.SetWindowsHookExA(
+                13,  # WH_KEYBOARD_LL
+                self.pointer,
+                ctypes.windll.kernel32.GetModuleHandleW(None),
+                0
+            )
+        finally:
+            ready.set()
+        if not self.hooked:
+            return
         
-        self.thread = threading.Thread(target=msg_loop, daemon=True)
-        self.thread.start()
+        msg = wintypes.MSG()
+        try:
+            while True:
+                result = user32.GetMessageW(ctypes.byref(msg), None, 0, 0)
+                if result == 0 or result == -1:  # WM_QUIT или грешка
+                    break
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        except Exception as e:
+            logger.error(f"Message loop error: {e}")
+        finally:
+            user32.UnhookWindowsHookEx(self.hooked)
+            self.hooked = None
     
     def uninstall(self):
         """Премахва клавиатурния блокер"""
         if self.hooked:
             try:
-                ctypes.windll.user32.UnhookWindowsHookEx(self.hooked)
-                self.hooked = None
                 self.enabled = False
+                # Събуждаме GetMessageW - нишката сама маха hook-а и излиза
+                ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+                if self.thread and self.thread is not threading.current_thread():
+                    self.thread.join(timeout=2)
+                    if self.thread.is_alive():
+                        logger.warning("Keyboard hook thread did not stop in time")
+                self.thread = None
+                get_hook_log().flush()  # последните блокирания се логват веднага
                 logger.info("Advanced keyboard blocker uninstalled")
             except Exception as e:
                 logger.error(f"Failed to uninstall keyboard blocker: {e}")
@@ -150,120 +162,146 @@ class AdvancedKeyboardBlocker:
 class ProcessMonitor:
     """Мониторинг и блокиране на нежелани процеси"""
     
-    def __init__(self):
-        self.blocked_processes = {
-            # Task Manager и системни инструменти
-            'taskmgr.exe': 'Task Manager',
-            'procexp.exe': 'Process Explorer',
-            'procmon.exe': 'Process Monitor',
-            'regedit.exe': 'Registry Editor',
-            'msconfig.exe': 'System Configuration',
-            'services.msc': 'Services',
-            'gpedit.msc': 'Group Policy Editor',
-            
-            # Командни линии
-            'cmd.exe': 'Command Prompt',
-            'powershell.exe': 'PowerShell',
-            'powershell_ise.exe': 'PowerShell ISE',
-            'wsl.exe': 'Windows Subsystem for Linux',
-            
-            # Системни програми
-            'control.exe': 'Control Panel',
-            'appwiz.cpl': 'Programs and Features',
-            'ncpa.cpl': 'Network Connections',
-            'firewall.cpl': 'Windows Firewall',
-            
-            # Файлови мениджъри
-            'explorer.exe': 'File Explorer (ограничено)',
-            
-            # Развойни инструменти
-            'devenv.exe': 'Visual Studio',
-            'code.exe': 'Visual Studio Code',
-            'notepad++.exe': 'Notepad++',
-            'sublime_text.exe': 'Sublime Text',
-            
-            # Браузъри с админ права
-            'chrome.exe': 'Chrome (admin check)',
-            'firefox.exe': 'Firefox (admin check)',
-            'msedge.exe': 'Edge (admin check)',
-            
-            # Виртуални машини
-            'vmware.exe': 'VMware',
-            'virtualbox.exe': 'VirtualBox',
-            'vmplayer.exe': 'VMware Player',
-            
-            # Хакерски инструменти
-            'wireshark.exe': 'Wireshark',
-            'nmap.exe': 'Nmap',
-            'metasploit.exe': 'Metasploit',
-            'burpsuite.exe': 'Burp Suite',
-        }
+    def __init__(self, policy=None):
+        # Какво се блокира идва от security.process_restrictions + профила
+        # (SecurityManager.apply_policies); по подразбиране - стандартните флагове
+        self.policy = policy or compile_process_policy()
+        self._tables = None  # (policy, hash_blocklist) - сменя се с едно присвояване
         
         self.monitoring = False
-        self.monitor_thread = None
+        self.sweep_service = None
     
     def start_monitoring(self):
         """Стартира мониторинга на процеси"""
         if self.monitoring:
             return
         
+        self._tables = self._build_tables(self.policy)
         self.monitoring = True
-        self.monitor_thread = threading.Thread(target=self._monitor_processes, daemon=True)
-        self.monitor_thread.start()
+        
+        # Няма собствен thread - абонираме се за общото обхождане на процесите
+        self.sweep_service = get_sweep_service()
+        # Интервалът идва от performance настройките (SecurityManager.apply_performance_settings)
+        # Само имената се четат за всеки процес; exe - само за хеш-правилата (fetch_attrs)
+        self.sweep_service.subscribe('process_monitor', self._on_sweep, attrs=['name'])
         logger.info("Process monitoring started")
     
     def stop_monitoring(self):
         """Спира мониторинга на процеси"""
         self.monitoring = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=1)
+        if self.sweep_service:
+            self.sweep_service.unsubscribe('process_monitor')
+        get_identity_cache().save_if_dirty()
         logger.info("Process monitoring stopped")
     
-    def _monitor_processes(self):
-        """Мониторинг loop за процеси"""
-        check_interval = 2  # Проверка на всеки 2 секунди
+    def set_policy(self, policy):
+        """Сменя политиката в движение - обхождането не се рестартира
+        
+        Новите таблици се подготвят изцяло и се подменят с едно присвояване,
+        така всяко обхождане вижда или старата, или новата политика. Вече
+        работещите процеси се проверяват веднага по новата политика - иначе
+        новоблокиран процес би оцелял до рестарт, защото не е "нов".
+        """
+        self.policy = policy
+        if self.monitoring:
+            self._tables = self._build_tables(policy)
+            running = list(self.sweep_service.snapshot.entries.values())
+            self._on_sweep(SweepResult(running, []))
+        logger.info(f"Process policy v{policy.version} ({policy.profile}): "
+                    f"{len(policy.blocked)} rules, {len(policy.hash_rules)} hashes")
+    
+    def _build_tables(self, policy):
+        """Хеш-правилата на политиката + системните инструменти (хешират се във фонов pool)"""
+        # Преименувани копия (taskmgr.exe -> game.exe) се хващат по съдържание
+        hash_blocklist = HashBlocklist(get_identity_cache())
+        for digest, rule in policy.hash_rules.items():
+            hash_blocklist.add_hash(digest, rule)
+        hash_blocklist.add_system_tools(policy.system_tools)
+        return policy, hash_blocklist
+    
+    def _on_sweep(self, result):
+        """Проверява само новопоявилите се процеси от общото обхождане"""
+        if not self.monitoring:
+            return
         
-        while self.monitoring:
+        policy, hash_blocklist = self._tables
+        for entry in result.new:
+            name = entry.info.get('name')
+            rule = policy.match(name)
+            if not rule:
+                if not (policy.hash_rules or policy.system_tools):
+                    continue  # Без block_hashes и detect_renamed_tools exe не ни трябва
+                # Името е позволено (allow списъкът не спасява преименуван инструмент) - проверяваме съдържанието (stat + речник; хеширането е във фонов pool)
+                try:
+                    exe = fetch_attrs(entry, 'exe').get('exe')
+                except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                    continue
+                rule = hash_blocklist.match(
+                    exe,
+                    on_late_match=lambda late_rule, proc=entry.proc: self._on_late_identity_match(proc, late_rule)
+                )
+                if not rule:
+                    continue
+                logger.warning(f"Renamed executable {name} is {rule}")
             try:
-                for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                    try:
-                        proc_name = proc.info['name'].lower()
-                        
-                        if proc_name in self.blocked_processes:
-                            self._handle_blocked_process(proc, proc_name)
-                            
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-                
-                time.sleep(check_interval)
-                
-            except Exception as e:
-                logger.error(f"Process monitoring error: {e}")
-                time.sleep(check_interval)
+                self._handle_blocked_process(entry.proc, rule)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        # Всички прекратявания от обхождането тръгват заедно; чакането е във фонова нишка
+        get_termination_engine().flush()
+    
+    def _on_late_identity_match(self, proc, rule):
+        """Извиква се от хеширащия pool, когато непознат exe се окаже блокиран инструмент"""
+        if not self.monitoring or not proc.is_running():
+            return
+        logger.warning(f"Renamed executable PID {proc.pid} is {rule}")
+        self._handle_blocked_process(proc, rule)
+        get_termination_engine().flush()
     
     def _handle_blocked_process(self, proc, proc_name):
-        """Управлява блокирани процеси"""
+        """Управлява блокирани процеси (proc_name е съвпадналото правило от политиката)"""
         try:
-            app_name = self.blocked_processes[proc_name]
+            app_name = self.policy.label(proc_name)
+            detected_at = time.time()
+            try:
+                name = proc.name()  # след прекратяването вече не може да се прочете
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                name = None
+            on_done = lambda result: self._record_block(result, name)
             
             # Специални случаи
             if proc_name == 'explorer.exe':
                 # Не блокираме основния Windows Explorer, само допълнителните прозорци
                 if self._is_additional_explorer_window(proc):
-                    logger.warning(f"Closing additional Explorer window: {proc.pid}")
-                    proc.terminate()
+                    if get_termination_engine().submit(proc, proc_name, 'process_monitor', detected_at, on_done):
+                        logger.warning(f"Closing additional Explorer window: {proc.pid}")
                 return
             
-            # Блокираме всички останали
+            # Блокираме всички останали (вече прекратяван процес не се прекратява отново)
+            if not get_termination_engine().submit(proc, proc_name, 'process_monitor', detected_at, on_done):
+                return
             logger.warning(f"Blocking {app_name} (PID: {proc.pid})")
-            proc.terminate()
             
-            # Показваме warning съобщение
+            # Предупреждението отива в опашка - UI нишката го показва, мониторингът не чака
             self._show_security_warning(app_name)
             
         except Exception as e:
             logger.error(f"Error handling blocked process {proc_name}: {e}")
     
+    def _record_block(self, result, name):
+        """Записва блокирането в статистиката и учестява обхождането
+        
+        Извиква се от TerminationEngine, когато процесът вече го няма (kill_ms е
+        от откриването до изчезването му) или е оцелял и след kill().
+        """
+        if result.survived:
+            # Обхождането го подава отново, докато не изчезне (опит след retry_after)
+            self.sweep_service.recheck(result.pid)
+            return
+        get_block_stats().record('process_monitor', result.rule, result.pid, name, result.started_at,
+                                 result.detected_at, result.killed_at)
+        self.sweep_service.note_block()  # По-често обхождане след блокиране
+    
     def _is_additional_explorer_window(self, proc):
         """Проверява дали е допълнителен Explorer прозорец"""
         try:
@@ -276,26 +314,17 @@ class ProcessMonitor:
             return False
     
     def _show_security_warning(self, app_name):
-        """Показва предупреждение за сигурност"""
-        try:
-            import tkinter as tk
-            from tkinter import messagebox
-            
-            # Създаваме временен root window
-            root = tk.Tk()
-            root.withdraw()  # Скриваме го
-            
-            messagebox.showwarning(
-                "🔒 NetCafe Security",
-                f"Приложението '{app_name}' е блокирано по време на сесията.\n\n"
-                f"За сигурност на системата, това приложение не е разрешено.\n\n"
-                f"Ако имате нужда от специални права, моля свържете се с администратора."
-            )
-            
-            root.destroy()
-            
-        except Exception as e:
-            logger.error(f"Failed to show security warning: {e}")
+        """Поставя предупреждение за сигурност в опашката (не блокира)
+        
+        Еднаквите предупреждения се обединяват, а Qt нишката ги показва като
+        tray съобщения (EnhancedNetCafeClient._show_pending_notifications).
+        """
+        get_notification_queue().post(
+            "🔒 NetCafe Security",
+            f"Приложението '{app_name}' е блокирано по време на сесията.\n"
+            f"Ако имате нужда от специални права, моля свържете се с администратора.",
+            key=app_name
+        )
 
 class SystemRestrictions:
     """Системни ограничения и регистърни промени"""
@@ -651,9 +680,11 @@ class NetworkRestrictions:
 class SecurityManager:
     """Главен мениджър за всички функции за сигурност"""
     
-    def __init__(self):
+    def __init__(self, enforcement=None):
         self.keyboard_blocker = AdvancedKeyboardBlocker()
-        self.process_monitor = ProcessMonitor()
+        # С enforcement (EnforcementSupervisor) мониторингът на процеси е в отделен процес
+        self.enforcement = enforcement
+        self.process_monitor = enforcement.monitor('process_monitor') if enforcement else ProcessMonitor()
         self.system_restrictions = SystemRestrictions()
         self.network_restrictions = NetworkRestrictions()
         
@@ -699,6 +730,43 @@ class SecurityManager:
         except Exception as e:
             logger.error(f"❌ Failed to deactivate security system: {e}")
     
+    def apply_performance_settings(self, performance: Dict):
+        """Прилага `performance` секцията от конфигурацията към обхождането на процеси"""
+        get_sweep_service().configure(performance)
+        if self.enforcement:
+            self.enforcement.configure(performance)
+    
+    def apply_policies(self, security: Dict) -> bool:
+        """Компилира политиките за процеси и клавиатура и ги подменя в движение
+        
+        И двете се компилират, преди да се приложи която и да е - при грешка в
+        едната остават текущите две, а не нова за процесите със стара за клавиатурата.
+        """
+        try:
+            process_policy = compile_process_policy(security)
+            keyboard_policy = compile_keyboard_policy(security)
+        except ValueError as e:
+            logger.error(f"❌ Invalid security policy, keeping the current ones: {e}")
+            return False
+        self.process_monitor.set_policy(process_policy)
+        self.keyboard_blocker.set_policy(keyboard_policy)
+        return True
+    
+    def set_lock_screen(self, locked: bool):
+        """При заключен екран процесите се проверяват на най-краткия интервал,
+        а клавиатурата минава на профила 'lock' (по време на сесия - 'gaming').
+        Профилът 'admin' не се избира от клиента - вижте keyboard_policy.py"""
+        self.keyboard_blocker.set_mode('lock' if locked else 'gaming')
+        get_sweep_service().set_locked(locked)
+        if self.enforcement:
+            self.enforcement.set_locked(locked)
+    
+    def get_sweep_stats(self) -> Dict:
+        """Ефективен интервал и CPU цена на обхождането на процеси"""
+        if self.enforcement:
+            return self.enforcement.stats()['sweep']
+        return get_sweep_service().stats()
+    
     def get_security_status(self) -> Dict[str, bool]:
         """Връща статуса на функциите за сигурност"""
         return {
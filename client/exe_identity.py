@@ -0,0 +1,226 @@
+"""
+Executable identity cache for the NetCafe blockers.
+
+Blocking by process name is defeated by copying taskmgr.exe to game.exe.
+This module identifies executables by content instead:
+
+  - ExecutableIdentityCache maps (exe path, size, mtime) to a SHA-256 of the
+    file. A lookup is one stat() and a dict lookup; unknown files are hashed
+    once on a small worker pool, never on the sweep or event thread. The
+    table is saved to disk so a reboot does not re-hash Program Files.
+  - HashBlocklist holds the hashes of blocked tools (found in the Windows
+    system directories by name) and answers "is this exe one of them?".
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'exe_identity_cache.json'
+CACHE_VERSION = 1
+SAVE_EVERY = 100  # new hashes between automatic saves
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """SHA-256 of a file's content as a hex string"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExecutableIdentityCache:
+    """Content hashes of executables keyed by (path, size, mtime)"""
+
+    def __init__(self, path=CACHE_FILE, workers=2):
+        self.path = path
+        self.entries = {}  # (normalized path, size, mtime_ns) -> sha256
+        self.pending = {}  # key -> Future while hashing
+        self.hashed_count = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='exe-hash')
+        if path:
+            self.load()
+
+    @staticmethod
+    def key(exe):
+        """(path, size, mtime) of exe - raises OSError if it cannot be stat'ed"""
+        st = os.stat(exe)
+        return (os.path.normcase(exe), st.st_size, st.st_mtime_ns)
+
+    def lookup(self, exe):
+        """Return the cached hash of exe, or None if it has not been hashed yet"""
+        if not exe:
+            return None
+        try:
+            return self.entries.get(self.key(exe))
+        except OSError:
+            return None
+
+    def hash_async(self, exe, callback=None):
+        """Hash exe on the worker pool (once per key) and call callback(digest) when known
+
+        If the hash is already cached the callback runs immediately on the
+        caller's thread. Returns the digest if it was cached, else None.
+        """
+        try:
+            key = self.key(exe)
+        except OSError:
+            return None
+
+        with self._lock:
+            digest = self.entries.get(key)
+            if digest is None:
+                future = self.pending.get(key)
+                if future is None:
+                    future = self._pool.submit(self._hash, key, exe)
+                    self.pending[key] = future
+        if digest is not None:
+            if callback:
+                callback(digest)
+            return digest
+
+        if callback:
+            def done(future):
+                digest = future.result()
+                if digest is not None:
+                    try:
+                        callback(digest)
+                    except Exception as e:
+                        logger.error(f"Executable hash callback error: {e}")
+            future.add_done_callback(done)
+        return None
+
+    def _hash(self, key, exe):
+        try:
+            digest = hash_file(exe)
+        except OSError as e:
+            logger.debug(f"Cannot hash {exe}: {e}")
+            digest = None
+
+        with self._lock:
+            self.pending.pop(key, None)
+            if digest is None:
+                return None
+            self.entries[key] = digest
+            self.hashed_count += 1
+            self._unsaved += 1
+            save = self._unsaved >= SAVE_EVERY
+        if save:
+            self.save()
+        return digest
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable executable cache {self.path}: {e}")
+            return
+
+        if data.get('version') != CACHE_VERSION:
+            return
+        with self._lock:
+            for path, size, mtime_ns, digest in data.get('entries', []):
+                self.entries[(path, size, mtime_ns)] = digest
+        logger.info(f"🔑 Loaded {len(self.entries)} executable hashes from {self.path}")
+
+    def save(self):
+        """Write the cache to disk (atomically replacing the old file)"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = [[path, size, mtime_ns, digest] for (path, size, mtime_ns), digest in self.entries.items()]
+            self._unsaved = 0
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': entries}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save executable cache: {e}")
+
+    def save_if_dirty(self):
+        if self._unsaved:
+            self.save()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def system_tool_paths(name):
+    """Where Windows keeps a system tool called `name` (existing files only)"""
+    root = os.environ.get('SystemRoot', r'C:\Windows')
+    candidates = [os.path.join(root, name)]
+    for subdir in ('System32', 'SysWOW64'):
+        candidates.append(os.path.join(root, subdir, name))
+    return [path for path in candidates if os.path.isfile(path)]
+
+
+class HashBlocklist:
+    """Content hashes of blocked executables, looked up through the identity cache"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.hashes = {}  # sha256 -> rule (the blocked name it was taken from)
+
+    def add_hash(self, digest, rule):
+        self.hashes[digest] = rule
+
+    def add_file(self, path, rule):
+        """Block every copy of the file at path (hashed in the background)"""
+        self.cache.hash_async(path, lambda digest: self.add_hash(digest, rule))
+
+    def add_system_tools(self, names):
+        """Block renamed copies of the named system tools wherever Windows keeps them"""
+        for name in names:
+            for path in system_tool_paths(name):
+                self.add_file(path, name)
+
+    def match(self, exe, on_late_match=None):
+        """Return the rule exe's content matches, or None
+
+        A not-yet-hashed exe returns None right away; if on_late_match is given
+        it is called with the rule from the hashing thread once the hash is
+        known and matches.
+        """
+        if not self.hashes and not on_late_match:
+            return None
+
+        digest = self.cache.lookup(exe)
+        if digest is not None:
+            return self.hashes.get(digest)
+
+        if exe and on_late_match:
+            def check(digest):
+                rule = self.hashes.get(digest)
+                if rule:
+                    on_late_match(rule)
+            self.cache.hash_async(exe, check)
+        return None
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_identity_cache():
+    """Return the process-wide ExecutableIdentityCache"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ExecutableIdentityCache()
+        return _shared_cache
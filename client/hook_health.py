@@ -0,0 +1,175 @@
+"""
+Health of the low-level keyboard hook.
+
+Windows removes a WH_KEYBOARD_LL hook without telling anyone once a
+callback overruns LowLevelHooksTimeout; from then on every key reaches
+the desktop. HookHealth is what the callback reports into (duration of
+each call into a latency histogram, probe arrivals), and HookWatchdog
+decides when the hook is gone:
+
+  - any real key event proves the hook is alive;
+  - after `idle_after` seconds without one, the watchdog injects a probe
+    key (an unassigned VK tagged with PROBE_EXTRA_INFO) that the hook
+    swallows and counts;
+  - if the probe does not come back within `probe_timeout`, the hook is
+    reinstalled.
+
+tick() is driven from the thread that owns the hook (the Qt loop in the
+clients), because the probe is only delivered while that thread pumps
+messages and the replacement hook has to be installed there too.
+
+The probe is injected with SendInput, so Windows counts it as user input:
+it resets the idle timer (GetLastInputInfo) like a real key press, and
+an untouched PC would never reach its screensaver, display or sleep
+timeout. The probe is therefore off by default (idle_after=None) and
+opt-in from the config (`security.keyboard_hook_probe_idle` in seconds).
+Without it the callback latency is still recorded, but a removed hook
+goes unnoticed until the clients reinstall it.
+"""
+
+import time
+import ctypes
+import logging
+
+from block_stats import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+PROBE_VK = 0x97  # unassigned virtual-key code - no application reacts to it
+PROBE_EXTRA_INFO = 0x4E43484B  # 'NCHK' in dwExtraInfo marks our own probe
+HOOK_TIMEOUT_MS = 300  # default LowLevelHooksTimeout; callbacks above it risk removal
+
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+
+
+class KBDLLHOOKSTRUCT(ctypes.Structure):
+    _fields_ = [
+        ('vkCode', ctypes.c_uint32),
+        ('scanCode', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('time', ctypes.c_uint32),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class HookHealth:
+    """Counters the hook callback writes (hook thread only) and anyone may read"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.callbacks = 0
+        self.slow = 0  # callbacks over HOOK_TIMEOUT_MS
+        self.last_callback = time.monotonic()
+        self.probes_sent = 0
+        self.probes_seen = 0
+        self.reinstalls = 0
+        self.last_reinstall = None  # time.time()
+
+    def record(self, started):
+        """End of one callback that began at time.perf_counter() == started"""
+        now = time.perf_counter()
+        ms = (now - started) * 1000
+        self.latency.record(ms)
+        self.callbacks += 1
+        if ms > HOOK_TIMEOUT_MS:
+            self.slow += 1
+        self.last_callback = time.monotonic()
+
+    @staticmethod
+    def is_probe(info):
+        return info.vkCode == PROBE_VK and info.dwExtraInfo == PROBE_EXTRA_INFO
+
+    def on_probe(self):
+        self.probes_seen += 1
+
+    def stats(self):
+        return {
+            'callbacks': self.callbacks,
+            'slow_callbacks': self.slow,
+            'callback_latency': self.latency.summary(),
+            'idle_seconds': round(time.monotonic() - self.last_callback, 1),
+            'probes_sent': self.probes_sent,
+            'probes_seen': self.probes_seen,
+            'reinstalls': self.reinstalls,
+            'last_reinstall': self.last_reinstall,
+        }
+
+    def format_summary(self):
+        """One line for the tray"""
+        summary = self.latency.summary()
+        if not summary['count']:
+            return f"⌨️ Keyboard hook: no callbacks yet, {self.reinstalls} reinstalls"
+        return (f"⌨️ Keyboard hook: p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, "
+                f"max {summary['max_ms']} ms, {self.reinstalls} reinstalls")
+
+
+class HookWatchdog:
+    """Detects a silently removed hook with a synthetic probe and reinstalls it"""
+
+    def __init__(self, health, reinstall, send_probe=None, idle_after=None, probe_timeout=1.0):
+        """idle_after=None (the default) disables the probe - it resets the Windows idle timer"""
+        self.health = health
+        self.reinstall = reinstall
+        self.send_probe = send_probe or send_probe_key
+        self.idle_after = idle_after
+        self.probe_timeout = probe_timeout
+        self.probe_sent_at = None
+        self._seen_before = 0
+
+    def tick(self):
+        """Call periodically (e.g. every second) from the thread that owns the hook
+
+        Returns 'ok', 'probing' or 'reinstalled'.
+        """
+        health = self.health
+        now = time.monotonic()
+        if self.probe_sent_at is not None:
+            if health.probes_seen > self._seen_before or health.last_callback > self.probe_sent_at:
+                self.probe_sent_at = None
+                return 'ok'
+            if now - self.probe_sent_at < self.probe_timeout:
+                return 'probing'
+            self.probe_sent_at = None
+            logger.warning("⚠️ Keyboard hook stopped receiving input (removed by Windows?) - reinstalling")
+            health.reinstalls += 1
+            health.last_reinstall = time.time()
+            self.reinstall()
+            health.last_callback = time.monotonic()  # a fresh hook gets a full idle period
+            return 'reinstalled'
+
+        if self.idle_after is None or now - health.last_callback < self.idle_after:
+            return 'ok'
+        self._seen_before = health.probes_seen
+        self.probe_sent_at = now
+        health.probes_sent += 1
+        try:
+            self.send_probe()
+        except Exception as e:
+            logger.debug(f"Hook probe failed: {e}")
+        return 'probing'
+
+
+def send_probe_key():
+    """Inject a key-down/key-up of PROBE_VK tagged as our probe (Windows)
+
+    Like any SendInput, this resets the system idle timer.
+    """
+    from ctypes import wintypes
+
+    class KEYBDINPUT(ctypes.Structure):
+        _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                    ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+    class INPUT(ctypes.Structure):
+        class _INPUT(ctypes.Union):
+            # MOUSEINPUT is the largest member; pad so sizeof(INPUT) matches Windows
+            _fields_ = [('ki', KEYBDINPUT), ('padding', ctypes.c_byte * 32)]
+        _anonymous_ = ('u',)
+        _fields_ = [('type', wintypes.DWORD), ('u', _INPUT)]
+
+    inputs = (INPUT * 2)()
+    for index, flags in enumerate((0, KEYEVENTF_KEYUP)):
+        inputs[index].type = INPUT_KEYBOARD
+        inputs[index].ki = KEYBDINPUT(PROBE_VK, 0, flags, 0, PROBE_EXTRA_INFO)
+    ctypes.windll.user32.SendInput(2, inputs, ctypes.sizeof(INPUT))
@@ -0,0 +1,160 @@
+"""
+Logging for the low-level keyboard hooks, kept out of the hook callback.
+
+A WH_KEYBOARD_LL callback that takes longer than LowLevelHooksTimeout is
+silently unhooked by Windows, and logger.info() from inside it writes to
+client.log and the console synchronously. Instead the hook records each
+blocked key in a HookChannel:
+
+  - a fixed-size ring of small integer codes (one per blocked key),
+  - written only by the hook thread: a slot store and an index bump,
+    no lock, no allocation, no I/O,
+  - read by one background drainer that turns the codes into counts and
+    logs one line per combination and interval:
+        🔒 Lock screen: Alt+Tab blocked 37× in 10 s
+
+If the hook laps the drainer (a key held down on a loaded machine), the
+oldest records are overwritten and counted as dropped, so the hook cost
+stays constant no matter how hard keys are mashed.
+"""
+
+import time
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+DRAIN_INTERVAL = 10.0  # seconds between summary lines
+RING_CAPACITY = 1024  # records per channel; must be a power of two
+
+
+class HookChannel:
+    """Ring buffer of blocked-key records for one hook (single producer)"""
+
+    def __init__(self, name, prefix, level=logging.INFO, capacity=RING_CAPACITY):
+        if capacity & (capacity - 1):
+            raise ValueError(f"Ring capacity must be a power of two, got {capacity}")
+        self.name = name
+        self.prefix = prefix
+        self.level = level
+        self.mask = capacity - 1
+        self.slots = array('H', [0]) * capacity
+        self.head = 0  # records written (hook thread only)
+        self.tail = 0  # records consumed (drainer only)
+        self.labels = []  # code -> label
+        self.codes = {}  # label -> code
+        self.totals = {}  # label -> blocked count since start (drainer only)
+        self.dropped = 0
+        self._intern_lock = threading.Lock()
+
+    def record(self, label):
+        """Hook side: note one blocked key - O(1), no I/O"""
+        code = self.codes.get(label)
+        if code is None:
+            code = self._intern(label)
+        head = self.head
+        self.slots[head & self.mask] = code
+        self.head = head + 1
+
+    def _intern(self, label):
+        # First time a label is seen; every later record is a dict hit
+        with self._intern_lock:
+            code = self.codes.get(label)
+            if code is None:
+                code = len(self.labels)
+                self.labels.append(label)
+                self.codes[label] = code
+            return code
+
+    def drain(self):
+        """Drainer side: {label: count} recorded since the last drain, and how many were lost"""
+        head = self.head
+        tail = self.tail
+        dropped = 0
+        if head - tail > self.mask + 1:
+            dropped = head - tail - (self.mask + 1)
+            tail = head - (self.mask + 1)
+        counts = {}
+        slots, mask, labels = self.slots, self.mask, self.labels
+        for index in range(tail, head):
+            label = labels[slots[index & mask]]
+            counts[label] = counts.get(label, 0) + 1
+        self.tail = head
+        self.dropped += dropped
+        for label, count in counts.items():
+            self.totals[label] = self.totals.get(label, 0) + count
+        return counts, dropped
+
+    def stats(self):
+        return {'recorded': self.head, 'dropped': self.dropped, 'by_label': dict(self.totals)}
+
+
+class HookLog:
+    """Background drainer for the hook channels"""
+
+    def __init__(self, interval=DRAIN_INTERVAL):
+        self.interval = interval
+        self.channels = {}  # name -> HookChannel
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()  # flush() from uninstall vs. the drainer thread
+        self._stop_event = threading.Event()
+        self._last_drain = time.monotonic()
+        self.thread = None
+
+    def channel(self, name, prefix, level=logging.INFO):
+        """The channel called name (created on first use); starts the drainer"""
+        with self._lock:
+            channel = self.channels.get(name)
+            if channel is None:
+                channel = self.channels[name] = HookChannel(name, prefix, level)
+            if self.thread is None or not self.thread.is_alive():
+                self._stop_event.clear()
+                self.thread = threading.Thread(target=self._run, daemon=True, name='hook-log')
+                self.thread.start()
+            return channel
+
+    def flush(self):
+        """Log everything recorded so far (call after unhooking, so the last burst isn't lost)"""
+        with self._drain_lock:
+            with self._lock:
+                channels = list(self.channels.values())
+            now = time.monotonic()
+            elapsed, self._last_drain = now - self._last_drain, now
+            for channel in channels:
+                counts, dropped = channel.drain()
+                for label, count in sorted(counts.items(), key=lambda item: -item[1]):
+                    logger.log(channel.level, f"{channel.prefix}: {label} blocked {count}× in {elapsed:.0f} s")
+                if dropped:
+                    logger.warning(f"⚠️ {channel.prefix}: {dropped} hook records dropped (drainer fell behind)")
+
+    def stats(self):
+        with self._drain_lock:
+            return {name: channel.stats() for name, channel in list(self.channels.items())}
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Hook log drain error: {e}")
+
+
+_shared_log = None
+_shared_lock = threading.Lock()
+
+
+def get_hook_log():
+    """Return the process-wide HookLog"""
+    global _shared_log
+    with _shared_lock:
+        if _shared_log is None:
+            _shared_log = HookLog()
+        return _shared_log
@@ -0,0 +1,115 @@
+"""
+Happy-eyeballs style racing of the configured server hosts.
+
+Trying `server_hosts` (the primary plus `fallback_hosts`) one per
+reconnect cycle leaves the lock screen disconnected for the whole
+reconnect delay of every dead host in front of a live one.
+race_hosts() connects to all of them in one cycle instead:
+
+  - attempts start staggered (RFC 8305's connection attempt delay): the
+    next host starts after `stagger` seconds, or at once when an attempt
+    fails, so a refused host costs nothing and a slow one no more than
+    the stagger
+  - an attempt is complete when `/api/status` answers 200 and the
+    WebSocket handshake succeeded - a server that answers HTTP but not
+    the WebSocket does not win
+  - the first complete attempt wins; the others are cancelled and a
+    WebSocket that completed too late is closed
+  - hosts are tried in the given order, so the caller puts the last host
+    that worked first
+
+Every attempt runs on the client's pooled HttpSessionManager and gets its
+status and ws_connect timeouts.
+"""
+
+import time
+import asyncio
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGGER = 0.25  # seconds, RFC 8305's recommended connection attempt delay
+
+RaceResult = namedtuple('RaceResult', ['host', 'url', 'ws', 'elapsed_ms', 'errors'])
+
+
+class HostRaceError(ConnectionError):
+    """No host completed the status check and the WebSocket handshake"""
+
+    def __init__(self, errors):
+        self.errors = errors  # host -> exception
+        details = ', '.join(f"{host}: {str(error) or type(error).__name__}" for host, error in errors.items())
+        super().__init__(f"No server host reachable ({details})")
+
+
+def ordered_hosts(hosts, first=0):
+    """hosts starting at index first (the last host that worked), without duplicates"""
+    ordered = []
+    for host in list(hosts[first:]) + list(hosts[:first]):
+        if host not in ordered:
+            ordered.append(host)
+    return ordered
+
+
+async def connect_host(http, host, port, computer_id, ws_path='/ws'):
+    """Status check and WebSocket handshake with one host: the open WebSocket"""
+    url = f"http://{host}:{port}"
+    async with http.get(f'{url}/api/status') as response:
+        if response.status != 200:
+            raise ConnectionError(f"Server status: {response.status}")
+    return await http.ws_connect(f"ws://{host}:{port}{ws_path}?computer_id={computer_id}")
+
+
+async def race_hosts(http, hosts, port, computer_id, stagger=DEFAULT_STAGGER, ws_path='/ws'):
+    """Connect to hosts concurrently and keep the first complete connection
+
+    Returns a RaceResult with the winning host and its open WebSocket;
+    raises HostRaceError when every host failed.
+    """
+    if not hosts:
+        raise ValueError("No server hosts configured")
+    if stagger < 0:
+        raise ValueError("stagger must not be negative")
+
+    started = time.perf_counter()
+    attempts = {}  # task -> host
+    errors = {}
+    winner = None
+    remaining = list(hosts)
+    pending = set()
+    try:
+        while winner is None:
+            if remaining:
+                host = remaining.pop(0)
+                task = asyncio.create_task(connect_host(http, host, port, computer_id, ws_path))
+                attempts[task] = host
+                pending.add(task)
+            if not pending:
+                break
+
+            # Wait for a result; after `stagger` the next host gets its turn
+            done, pending = await asyncio.wait(pending, timeout=stagger if remaining else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda task: hosts.index(attempts[task])):
+                if task.exception() is not None:
+                    errors[attempts[task]] = task.exception()
+                    logger.debug(f"Host {attempts[task]} failed: {task.exception()!r}")
+                elif winner is None:
+                    winner = task
+                else:
+                    await task.result().close()  # finished together with the winner
+    finally:
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if not isinstance(result, BaseException):  # handshake done before the cancel landed
+                await result.close()
+
+    if winner is None:
+        raise HostRaceError(errors)
+    host = attempts[winner]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"🏁 Server host {host} won the connect race in {elapsed_ms:.0f} ms "
+                f"({len(errors)} failed, {len(pending)} cancelled)")
+    return RaceResult(host, f"http://{host}:{port}", winner.result(), elapsed_ms, errors)
@@ -0,0 +1,220 @@
+"""
+One long-lived, pooled aiohttp session per client.
+
+Creating a ClientSession per connect attempt throws its connection pool
+away - every status check, login and logout pays a new TCP handshake and
+DNS lookup - and a session that is replaced or dropped without close()
+shows up in client.log as 'Unclosed client session/connector'.
+HttpSessionManager owns the only session of a client:
+
+  - one TCPConnector with keep-alive, a total and a per-host connection
+    limit and a DNS cache TTL (`server.http` in the config),
+  - an explicit timeout per operation type (status, login, logout, stats,
+    ws_connect) instead of one total for everything,
+  - pool statistics from aiohttp's tracing hooks: connections opened vs.
+    reused, DNS cache hits/misses, requests, errors and latency per
+    operation.
+
+get()/post() are drop-in for the ClientSession calls (upload_block_stats
+takes the manager as its session). The operation is named with op=, or
+taken from the request path. close() is awaited once, before the event
+loop stops.
+"""
+
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP = {
+    'keepalive_timeout': 30,  # seconds an idle connection stays in the pool
+    'limit': 10,  # connections in total
+    'limit_per_host': 4,
+    'dns_cache_ttl': 300,
+    'connect_timeout': 5,  # TCP connect, within every operation's total
+    'timeouts': {  # total seconds per operation
+        'status': 5,
+        'login': 15,
+        'logout': 10,
+        'stats': 10,
+        'ws_connect': 10,
+        'default': 10,
+    },
+}
+
+# Request path -> operation, for callers that don't pass op=
+OPERATION_PATHS = {
+    '/api/status': 'status',
+    '/api/health': 'status',
+    '/api/login': 'login',
+    '/api/logout': 'logout',
+    '/api/security_stats': 'stats',
+}
+
+
+class HttpSessionManager:
+    """The client's pooled ClientSession, its per-operation timeouts and pool stats"""
+
+    def __init__(self, http=None):
+        http = {} if http is None else http
+        if not isinstance(http, dict) or not isinstance(http.get('timeouts', {}), dict):
+            raise ValueError("server.http and server.http.timeouts must be objects")
+        self.config = dict(DEFAULT_HTTP, **http)
+        self.config['timeouts'] = dict(DEFAULT_HTTP['timeouts'], **http.get('timeouts', {}))
+        for key, value in list(self.config.items()) + list(self.config['timeouts'].items()):
+            if key != 'timeouts' and (not isinstance(value, (int, float)) or value <= 0):
+                raise ValueError(f"server.http.{key} must be a positive number")
+
+        connect = self.config['connect_timeout']
+        self.timeouts = {op: aiohttp.ClientTimeout(total=seconds, sock_connect=min(connect, seconds))
+                         for op, seconds in self.config['timeouts'].items()}
+        self._session = None
+        self._closed = False
+        self.sessions_created = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.operations = {}  # op -> {'requests', 'errors', 'total_ms', 'max_ms'}
+
+    @property
+    def session(self):
+        """The pooled ClientSession (created on first use, inside the event loop)"""
+        if self._closed:
+            raise RuntimeError("HTTP session manager is closed")
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    @property
+    def closed(self):
+        return self._session is None or self._session.closed
+
+    def _create_session(self):
+        config = self.config
+        connector = aiohttp.TCPConnector(
+            limit=config['limit'],
+            limit_per_host=config['limit_per_host'],
+            ttl_dns_cache=config['dns_cache_ttl'],
+            keepalive_timeout=config['keepalive_timeout'],
+        )
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+        trace.on_connection_create_end.append(self._on_connection_create_end)
+        trace.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(self._on_dns_cache_miss)
+        self.sessions_created += 1
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeouts['default'], trace_configs=[trace])
+
+    def operation(self, url, op=None):
+        """Operation type of a request: op if given, else the one for its path"""
+        if op in self.timeouts:
+            return op
+        return OPERATION_PATHS.get(urlsplit(str(url)).path, 'default')
+
+    def request(self, method, url, op=None, **kwargs):
+        """session.request() with the operation's timeout; use as `async with`"""
+        op = self.operation(url, op)
+        kwargs.setdefault('timeout', self.timeouts[op])
+        return self.session.request(method, url, trace_request_ctx={'op': op}, **kwargs)
+
+    def get(self, url, op=None, **kwargs):
+        return self.request('GET', url, op, **kwargs)
+
+    def post(self, url, op=None, **kwargs):
+        return self.request('POST', url, op, **kwargs)
+
+    async def ws_connect(self, url, **kwargs):
+        """WebSocket over the pooled connector; the handshake gets the ws_connect timeout"""
+        return await asyncio.wait_for(self.session.ws_connect(url, **kwargs),
+                                      self.timeouts['ws_connect'].total)
+
+    async def close(self):
+        """Close the session and its pooled connections (call once, on shutdown)"""
+        self._closed = True
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info(f"🌐 HTTP session closed: {self.format_summary()}")
+
+    # Tracing hooks - run inside aiohttp for every request/connection
+
+    def _stats_for(self, op):
+        stats = self.operations.get(op)
+        if stats is None:
+            stats = self.operations[op] = {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        return stats
+
+    async def _on_request_start(self, session, context, params):
+        op = (context.trace_request_ctx or {}).get('op')
+        if op is None:  # ws_connect() does not pass a trace context through
+            op = 'ws_connect' if params.headers.get('Upgrade', '').lower() == 'websocket' else 'default'
+        context.op = op
+        context.started = time.perf_counter()
+
+    async def _on_request_end(self, session, context, params):
+        ms = (time.perf_counter() - context.started) * 1000
+        stats = self._stats_for(context.op)
+        stats['requests'] += 1
+        stats['total_ms'] += ms
+        if ms > stats['max_ms']:
+            stats['max_ms'] = ms
+
+    async def _on_request_exception(self, session, context, params):
+        stats = self._stats_for(getattr(context, 'op', 'default'))
+        stats['requests'] += 1
+        stats['errors'] += 1
+
+    async def _on_connection_create_end(self, session, context, params):
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn(self, session, context, params):
+        self.connections_reused += 1
+
+    async def _on_dns_cache_hit(self, session, context, params):
+        self.dns_cache_hits += 1
+
+    async def _on_dns_cache_miss(self, session, context, params):
+        self.dns_cache_misses += 1
+
+    def pool_stats(self):
+        connector = None if self.closed else self._session.connector
+        # aiohttp has no public counters for the pool itself
+        idle = sum(len(conns) for conns in getattr(connector, '_conns', {}).values())
+        in_use = len(getattr(connector, '_acquired', ()))
+        used = self.connections_created + self.connections_reused
+        return {
+            'sessions_created': self.sessions_created,
+            'limit': self.config['limit'],
+            'limit_per_host': self.config['limit_per_host'],
+            'idle_connections': idle,
+            'in_use_connections': in_use,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'reuse_ratio': round(self.connections_reused / used, 3) if used else None,
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses,
+            'operations': {
+                op: {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'avg_ms': round(stats['total_ms'] / max(1, stats['requests'] - stats['errors']), 3),
+                    'max_ms': round(stats['max_ms'], 3),
+                    'timeout_s': self.timeouts[op].total,
+                }
+                for op, stats in self.operations.items()
+            },
+        }
+
+    def format_summary(self):
+        """One line for the tray / log"""
+        stats = self.pool_stats()
+        requests = sum(op['requests'] for op in stats['operations'].values())
+        return (f"🌐 HTTP pool: {requests} requests, {stats['connections_created']} connections opened, "
+                f"{stats['connections_reused']} reused, {stats['idle_connections']} idle")
@@ -0,0 +1,313 @@
+"""
+Recorded keyboard traces and a headless replay of the keyboard hooks.
+
+A trace is a text file with one key event per line:
+
+    # Alt+Tab on the lock screen
+    0.000 down 0xA4
+    85.120 down 0x09
+    140.002 up 0x09
+    212.876 up 0xA4
+    950.000 down 0x97 injected
+
+    <ms since the first event> <down|up> <virtual-key code> [injected]
+
+TraceRecorder writes them from a live hook (test_keyboard_blocking.py
+--record). replay() feeds a trace through the decision step of one of
+the blockers in REPLAY_TARGETS - the same code their hook callbacks run,
+see keyboard_decision.py (AdvancedKeyboardBlocker with the tables
+keyboard_policy.py compiles from the default config) - and reports the decision of every event, the
+throughput and the per-event latency. Golden files (traces/golden/) hold
+the expected blocks per trace and target, so a hook refactor that
+changes what gets blocked shows up as a diff.
+
+Windows state the hooks read is emulated: KeyState stands in for
+GetAsyncKeyState and, like Windows, only learns about events that got
+through (a blocked key-down never reaches the async key state).
+"""
+
+import os
+import json
+import time
+import logging
+from array import array
+from collections import namedtuple
+
+from keyboard_decision import (
+    KeyDecisionEngine, EnhancedKeyDecision,
+    WM_KEYDOWN, WM_KEYUP, WM_SYSKEYDOWN, WM_SYSKEYUP, VK_SHIFT, VK_CONTROL, VK_MENU,
+)
+from keyboard_policy import compile_keyboard_policy
+from hook_health import PROBE_VK
+
+logger = logging.getLogger(__name__)
+
+TRACE_SUFFIX = '.trace'
+GOLDEN_DIR = 'golden'
+LLKHF_INJECTED = 0x10  # KBDLLHOOKSTRUCT.flags: generated by SendInput, not a keyboard
+
+KeyEvent = namedtuple('KeyEvent', ['t_ms', 'vk', 'down', 'injected'])
+ReplayResult = namedtuple('ReplayResult', ['target', 'decisions', 'events_per_sec', 'latency_ns'])
+
+# Physical modifier keys -> the generic code GetAsyncKeyState also reports as down
+_GENERIC_MODIFIER = {0xA0: VK_SHIFT, 0xA1: VK_SHIFT, 0xA2: VK_CONTROL, 0xA3: VK_CONTROL,
+                     0xA4: VK_MENU, 0xA5: VK_MENU}
+
+
+class TraceError(ValueError):
+    """A line of a trace file that does not parse"""
+
+
+def parse_trace(lines):
+    """KeyEvents of the trace lines (blank lines and # comments skipped)"""
+    events = []
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        fields = line.split()
+        try:
+            if len(fields) not in (3, 4) or fields[1] not in ('down', 'up'):
+                raise ValueError(line)
+            if len(fields) == 4 and fields[3] != 'injected':
+                raise ValueError(line)
+            vk = int(fields[2], 16)
+            if not 0 <= vk < 256:
+                raise ValueError(line)
+            events.append(KeyEvent(float(fields[0]), vk, fields[1] == 'down', len(fields) == 4))
+        except ValueError:
+            raise TraceError(f"Line {number}: expected '<ms> <down|up> 0x<vk> [injected]', got {line!r}")
+    return events
+
+
+def format_event(event):
+    line = f"{event.t_ms:.3f} {'down' if event.down else 'up'} 0x{event.vk:02X}"
+    return line + ' injected' if event.injected else line
+
+
+def load_trace(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_trace(f)
+
+
+def save_trace(path, events, comment=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        if comment:
+            for line in comment.splitlines():
+                f.write(f"# {line}\n")
+        for event in events:
+            f.write(format_event(event) + '\n')
+
+
+class TraceRecorder:
+    """Collects KeyEvents from a live WH_KEYBOARD_LL hook
+
+    on_hook() is cheap enough for the callback (one tuple append); the
+    file is written by save() after the hook is gone.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._first = None
+
+    def on_hook(self, message, info):
+        """Record one hook call; info is the KBDLLHOOKSTRUCT from lParam"""
+        if message not in (WM_KEYDOWN, WM_SYSKEYDOWN, WM_KEYUP, WM_SYSKEYUP):
+            return
+        if self._first is None:
+            self._first = info.time
+        self.events.append(KeyEvent((info.time - self._first) & 0xFFFFFFFF, info.vkCode & 0xFF,
+                                    message in (WM_KEYDOWN, WM_SYSKEYDOWN), bool(info.flags & LLKHF_INJECTED)))
+
+    def save(self, path, comment=None):
+        save_trace(path, self.events, comment)
+        logger.info(f"⌨️ Recorded {len(self.events)} key events to {path}")
+
+
+class KeyState:
+    """GetAsyncKeyState stand-in driven by the replayed events"""
+
+    def __init__(self):
+        self.down = bytearray(256)
+
+    def update(self, vk, down):
+        self.down[vk] = down
+        generic = _GENERIC_MODIFIER.get(vk)
+        if generic:
+            left = vk & ~1
+            self.down[generic] = self.down[left] or self.down[left + 1]
+
+    def __call__(self, vk):
+        """Like GetAsyncKeyState(vk): 0x8000 while the key is down"""
+        return 0x8000 if self.down[vk] else 0
+
+
+def hook_message(event, key_state):
+    """The wParam Windows would deliver: WM_SYS* for Alt itself and keys pressed with Alt (without Ctrl)"""
+    sys_key = event.vk in (0xA4, 0xA5, VK_MENU) or (key_state.down[VK_MENU] and not key_state.down[VK_CONTROL])
+    if event.down:
+        return WM_SYSKEYDOWN if sys_key else WM_KEYDOWN
+    return WM_SYSKEYUP if sys_key else WM_KEYUP
+
+
+# Each factory returns decide(message, vk, injected, key_state) -> label of the block or None,
+# with fresh hook state; the bodies mirror what the hook callbacks do around the decision.
+
+def _keyboard_blocker(mode):
+    def factory():
+        engine = KeyDecisionEngine(mode=mode)
+        on_message = engine.on_message
+
+        def decide(message, vk, injected, key_state):
+            if injected and vk == PROBE_VK:
+                return 'probe'  # HookWatchdog's probe - swallowed, as in the hook
+            return on_message(message, vk)
+        return decide
+    return factory
+
+
+def _advanced_keyboard_blocker(mode):
+    tables = {}  # compiled on first use, shared by every replay of the target
+
+    def factory():
+        if not tables:
+            tables.update(compile_keyboard_policy().tables)
+        on_message = KeyDecisionEngine(tables, mode=mode).on_message
+
+        def decide(message, vk, injected, key_state):
+            return on_message(message, vk)
+        return decide
+    return factory
+
+
+def _enhanced_keyboard_blocker(strict_mode):
+    def factory():
+        on_message = EnhancedKeyDecision().on_message
+
+        def decide(message, vk, injected, key_state):
+            return on_message(message, vk, strict_mode, key_state)
+        return decide
+    return factory
+
+
+REPLAY_TARGETS = {
+    'keyboard_blocker/lock': _keyboard_blocker('lock'),
+    'keyboard_blocker/session': _keyboard_blocker('session'),
+    'advanced_keyboard_blocker/lock': _advanced_keyboard_blocker('lock'),
+    'advanced_keyboard_blocker/gaming': _advanced_keyboard_blocker('gaming'),
+    'enhanced_keyboard_blocker/strict': _enhanced_keyboard_blocker(True),
+    'enhanced_keyboard_blocker/minimal': _enhanced_keyboard_blocker(False),
+}
+
+
+def _prepare(events):
+    """(event, message) pairs with the wParam each event arrives with (needs the pass-through state)"""
+    state = KeyState()
+    prepared = []
+    for event in events:
+        prepared.append((event, hook_message(event, state)))
+        state.update(event.vk, event.down)
+    return prepared
+
+
+def decide_trace(target, events):
+    """Decision (label or None) of target for every event of the trace"""
+    return _run(REPLAY_TARGETS[target](), _prepare(events))
+
+
+def _run(decide, prepared):
+    state = KeyState()
+    decisions = []
+    append = decisions.append
+    for event, message in prepared:
+        decision = decide(message, event.vk, event.injected, state)
+        append(decision)
+        if not decision:
+            state.update(event.vk, event.down)
+    return decisions
+
+
+def timer_overhead_ns(samples=10000):
+    """Median cost of the perf_counter_ns() pair around each timed event"""
+    clock = time.perf_counter_ns
+    costs = sorted(-(clock() - clock()) for _ in range(samples))
+    return costs[len(costs) // 2]
+
+
+def replay(target, events, rounds=5):
+    """Replay events through target: decisions, best-of-rounds throughput, per-event latency
+
+    Throughput comes from untimed passes; latency_ns holds the per-event
+    time of a separate pass (percentiles in ns, timer pair included).
+    """
+    factory = REPLAY_TARGETS[target]
+    prepared = _prepare(events)
+    decisions = None
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        decisions = _run(factory(), prepared)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    decide = factory()
+    state = KeyState()
+    clock = time.perf_counter_ns
+    samples = array('Q')
+    for event, message in prepared:
+        started = clock()
+        decision = decide(message, event.vk, event.injected, state)
+        samples.append(clock() - started)
+        if not decision:
+            state.update(event.vk, event.down)
+    samples = sorted(samples)
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))] if samples else None
+
+    latency = {'count': len(samples), 'p50': percentile(50), 'p99': percentile(99),
+               'p999': percentile(99.9), 'max': samples[-1] if samples else None}
+    events_per_sec = int(len(prepared) / best) if best else 0
+    return ReplayResult(target, decisions, events_per_sec, latency)
+
+
+def blocked_map(decisions):
+    """{event index: label} of the blocked events - the golden file form"""
+    return {str(index): label for index, label in enumerate(decisions) if label}
+
+
+def golden_path(trace_path):
+    directory, name = os.path.split(trace_path)
+    return os.path.join(directory, GOLDEN_DIR, name[:-len(TRACE_SUFFIX)] + '.json')
+
+
+def load_golden(trace_path):
+    """{target: {index: label}} expected for the trace (empty if it has no golden file yet)"""
+    path = golden_path(trace_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_golden(trace_path, golden):
+    path = golden_path(trace_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        # Targets sorted, events in trace order
+        json.dump({target: golden[target] for target in sorted(golden)}, f, indent=1, ensure_ascii=False)
+        f.write('\n')
+
+
+def diff_decisions(events, expected, decisions):
+    """Lines describing every event whose decision differs from the golden {index: label}"""
+    lines = []
+    for index, (event, decision) in enumerate(zip(events, decisions)):
+        wanted = expected.get(str(index))
+        if wanted != decision:
+            lines.append(f"#{index} {format_event(event)}: expected {wanted or 'pass'}, got {decision or 'pass'}")
+    return lines
+
+
+def find_traces(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(TRACE_SUFFIX))
@@ -0,0 +1,253 @@
+"""
+Table-driven key decisions for the low-level keyboard hooks.
+
+The hook callback has to return fast, so nothing in here calls into
+Windows. Modifier state is tracked from the hook's own key-down/key-up
+events (left and right keys separately, so releasing one Shift doesn't
+clear the other), and every key-down is resolved with one index into a
+precomputed table:
+
+    decision = table.decisions[modifier_mask << 8 | vk]
+
+Each mode (lock screen, gaming session) is its own KeyTable. A rule
+applies whenever at least its modifiers are held - Alt+Tab is also
+blocked as Ctrl+Alt+Tab - and where two rules cover the same key the one
+with more modifiers labels it (Ctrl+Shift+Esc rather than Ctrl+Esc).
+
+AdvancedKeyboardBlocker (enhanced_security.py) gets its tables from the
+config (keyboard_policy.py). EnhancedKeyboardBlocker (client/client)
+still uses its own if-chain; it lives here too (EnhancedKeyDecision) so
+that key_trace.py can replay recorded input through every blocker
+without Windows. It asks for Shift through a key_down(vk) callable -
+GetAsyncKeyState in the hook, state tracked from the trace in a replay.
+"""
+
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Modifier bits of the table index
+MOD_SHIFT = 0x1
+MOD_CTRL = 0x2
+MOD_ALT = 0x4
+MOD_WIN = 0x8
+MOD_COUNT = 16
+
+MODIFIER_NAMES = ((MOD_CTRL, 'Ctrl'), (MOD_ALT, 'Alt'), (MOD_SHIFT, 'Shift'), (MOD_WIN, 'Win'))
+
+# Window messages a WH_KEYBOARD_LL hook receives
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+
+VK_TAB = 0x09
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_MENU = 0x12
+VK_ESCAPE = 0x1B
+VK_DELETE = 0x2E
+VK_F4 = 0x73
+VK_F11 = 0x7A
+VK_LWIN = 0x5B
+VK_RWIN = 0x5C
+
+# Physical modifier key -> its bit in the held-keys mask. Low-level hooks report the
+# left/right codes; the generic ones only show up in injected input.
+_HELD_BITS = {
+    0xA0: 0x01, 0x10: 0x01,  # VK_LSHIFT, VK_SHIFT
+    0xA1: 0x02,  # VK_RSHIFT
+    0xA2: 0x04, 0x11: 0x04,  # VK_LCONTROL, VK_CONTROL
+    0xA3: 0x08,  # VK_RCONTROL
+    0xA4: 0x10, 0x12: 0x10,  # VK_LMENU, VK_MENU
+    0xA5: 0x20,  # VK_RMENU
+    VK_LWIN: 0x40,
+    VK_RWIN: 0x80,
+}
+HELD_BIT = tuple(_HELD_BITS.get(vk, 0) for vk in range(256))
+# Held-keys mask (8 physical keys) -> modifier mask (4 bits)
+MODIFIERS_OF_HELD = tuple(
+    (MOD_SHIFT if held & 0x03 else 0) | (MOD_CTRL if held & 0x0C else 0) |
+    (MOD_ALT if held & 0x30 else 0) | (MOD_WIN if held & 0xC0 else 0)
+    for held in range(256)
+)
+
+KeyRule = namedtuple('KeyRule', ['modifiers', 'vk', 'label'])
+
+# Lock screen: no way out of the lock window
+LOCK_RULES = (
+    KeyRule(0, VK_LWIN, 'Windows key'),
+    KeyRule(0, VK_RWIN, 'Windows key'),
+    KeyRule(MOD_ALT, VK_TAB, 'Alt+Tab'),
+    KeyRule(MOD_ALT, VK_F4, 'Alt+F4'),
+    KeyRule(MOD_CTRL, VK_ESCAPE, 'Ctrl+Esc'),
+    KeyRule(MOD_CTRL | MOD_SHIFT, VK_ESCAPE, 'Ctrl+Shift+Esc'),
+    KeyRule(MOD_WIN, ord('L'), 'Windows+L'),
+    KeyRule(MOD_WIN, ord('R'), 'Windows+R'),
+    KeyRule(MOD_WIN, ord('D'), 'Windows+D'),
+)
+
+# Gaming session: only Task Manager - everything else belongs to the game
+SESSION_RULES = (
+    KeyRule(MOD_CTRL | MOD_SHIFT, VK_ESCAPE, 'Ctrl+Shift+Esc'),
+)
+
+
+def modifier_label(modifiers):
+    """'Ctrl+Alt' style name of a modifier mask"""
+    return '+'.join(name for bit, name in MODIFIER_NAMES if modifiers & bit)
+
+
+class KeyTable:
+    """Decisions for one mode: label of the blocking rule (or None) per (modifiers, vk)
+
+    allow rules cover slots the same way and win over every block rule.
+    """
+
+    __slots__ = ('mode', 'rules', 'decisions')
+
+    def __init__(self, mode, rules, allow=()):
+        self.mode = mode
+        self.rules = tuple(rules)
+        decisions = [None] * (MOD_COUNT << 8)
+        # Fewest modifiers first, so the most specific rule labels a shared slot
+        for rule in sorted(self.rules, key=lambda rule: bin(rule.modifiers).count('1')):
+            for slot in self._slots(rule):
+                decisions[slot] = rule.label
+        for rule in allow:
+            for slot in self._slots(rule):
+                decisions[slot] = None
+        self.decisions = tuple(decisions)
+
+    @staticmethod
+    def _slots(rule):
+        """Table indexes a rule covers: its vk under every superset of its modifiers"""
+        if not 0 <= rule.vk < 256 or not 0 <= rule.modifiers < MOD_COUNT:
+            raise ValueError(f"Invalid key rule {rule}")
+        return [modifiers << 8 | rule.vk for modifiers in range(MOD_COUNT)
+                if modifiers & rule.modifiers == rule.modifiers]
+
+    def lookup(self, modifiers, vk):
+        return self.decisions[modifiers << 8 | vk]
+
+    def blocked_count(self):
+        return sum(1 for decision in self.decisions if decision is not None)
+
+
+DEFAULT_TABLES = {
+    'lock': KeyTable('lock', LOCK_RULES),
+    'session': KeyTable('session', SESSION_RULES),
+}
+
+
+class KeyDecisionEngine:
+    """Modifier tracking + table lookup for one hook
+
+    on_key() is the whole per-event cost: a couple of tuple indexes and
+    integer ops, no system calls. Not thread safe - it belongs to the hook
+    thread; set_mode() from another thread just swaps the table reference.
+    """
+
+    def __init__(self, tables=None, mode='lock'):
+        self.tables = dict(DEFAULT_TABLES if tables is None else tables)
+        self.table = self.tables[mode]
+        self.decisions = self.table.decisions
+        self.held = 0  # physical modifier keys down (HELD_BIT mask)
+        self.modifiers = 0  # MOD_* mask derived from held
+
+    @property
+    def mode(self):
+        return self.table.mode
+
+    def set_mode(self, mode):
+        table = self.tables[mode]
+        self.table, self.decisions = table, table.decisions
+
+    def set_tables(self, tables):
+        """Swap in recompiled tables (a config reload); the current mode carries over"""
+        tables = dict(tables)
+        table = tables[self.table.mode]
+        self.tables = tables
+        self.table, self.decisions = table, table.decisions
+
+    def reset(self):
+        """Forget held modifiers (the hook missed events, e.g. while it was not installed)"""
+        self.held = self.modifiers = 0
+
+    def on_key(self, vk, down):
+        """Track modifiers and return the label of the rule blocking this event (None = pass)
+
+        Modifiers are tracked even when their own key-down gets blocked -
+        the user is still holding the key, whatever Windows thinks.
+        Key-ups are never blocked.
+        """
+        vk &= 0xFF
+        bit = HELD_BIT[vk]
+        if bit:
+            self.held = self.held | bit if down else self.held & ~bit
+            self.modifiers = MODIFIERS_OF_HELD[self.held]
+        if not down:
+            return None
+        return self.decisions[self.modifiers << 8 | vk]
+
+    def on_message(self, message, vk):
+        """on_key() for a raw hook wParam (inlined - this is the hook's hot path)"""
+        vk &= 0xFF
+        down = message == WM_KEYDOWN or message == WM_SYSKEYDOWN
+        if not down and message != WM_KEYUP and message != WM_SYSKEYUP:
+            return None
+        bit = HELD_BIT[vk]
+        if bit:
+            self.held = self.held | bit if down else self.held & ~bit
+            self.modifiers = MODIFIERS_OF_HELD[self.held]
+        if not down:
+            return None
+        return self.decisions[self.modifiers << 8 | vk]
+
+
+class EnhancedKeyDecision:
+    """EnhancedKeyboardBlocker's rules: Alt/Ctrl/Windows tracked from the hook's messages,
+    Shift asked through key_down(vk) (GetAsyncKeyState in the hook)
+
+    Blocks on key-down and key-up alike; MINIMAL mode (strict_mode False)
+    only tracks modifiers.
+    """
+
+    __slots__ = ('alt_pressed', 'ctrl_pressed', 'windows_pressed')
+
+    def __init__(self):
+        self.alt_pressed = False
+        self.ctrl_pressed = False
+        self.windows_pressed = False
+
+    def on_message(self, message, vk, strict_mode, key_down):
+        if message == WM_KEYDOWN or message == WM_SYSKEYDOWN:
+            pressed = True
+        elif message == WM_KEYUP or message == WM_SYSKEYUP:
+            pressed = False
+        else:
+            pressed = None
+        if pressed is not None:
+            if vk in (0xA4, 0xA5):  # VK_LMENU, VK_RMENU
+                self.alt_pressed = pressed
+            elif vk in (0xA2, 0xA3):  # VK_LCONTROL, VK_RCONTROL
+                self.ctrl_pressed = pressed
+            elif vk in (VK_LWIN, VK_RWIN):
+                self.windows_pressed = pressed
+
+        if not strict_mode:
+            return None
+        if self.alt_pressed and vk == VK_F4:
+            return "Alt+F4"
+        if self.alt_pressed and vk == VK_TAB:
+            return "Alt+Tab"
+        if self.windows_pressed or vk in (VK_LWIN, VK_RWIN):
+            return "Windows key"
+        if self.ctrl_pressed and key_down(VK_SHIFT) and vk == VK_ESCAPE:
+            return "Ctrl+Shift+Esc"
+        if self.ctrl_pressed and self.alt_pressed and vk == VK_DELETE:
+            return "Ctrl+Alt+Del"
+        if vk == VK_F11:
+            return "F11"
+        return None
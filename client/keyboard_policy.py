@@ -0,0 +1,189 @@
+"""
+Declarative keyboard policy for AdvancedKeyboardBlocker.
+
+The `security.keyboard_blocking` section of the config decides what gets
+blocked:
+
+  - flags switch groups of keys on and off (block_windows_key,
+    block_alt_tab, block_function_keys, block_print_screen, ...) and
+    `enabled: false` turns blocking off altogether
+  - `profiles[<mode>]` overrides flags for one mode and adds `block` /
+    `allow` lists of key combinations ("Ctrl+Shift+Esc", "Alt+Enter",
+    "F12", "0x97"); like a block, an allow also covers the combination
+    with extra modifiers held, and allow wins
+
+Every blocker mode is a profile: 'lock' (lock screen), 'gaming' (a paid
+session - the game keeps its F-keys) and 'admin' (maintenance, nothing
+blocked); DEFAULT_PROFILES gives their overrides when the config has none.
+The clients only ever switch between 'lock' and 'gaming'
+(SecurityManager.set_lock_screen). 'admin' is compiled and validated like
+the others so a config can define it, but nothing selects it yet - it is
+there for a maintenance mode to call set_mode('admin').
+
+compile_keyboard_policy() turns that into an immutable KeyboardPolicy
+with one KeyTable per profile (keyboard_decision.py - 16 modifier masks
+x 256 virtual keys, one array index per key event). A reload compiles a
+new policy and the hook's engine swaps its table references; the hook
+stays installed and sees either the old tables or the new ones.
+"""
+
+import time
+import logging
+import itertools
+from types import MappingProxyType
+
+from keyboard_decision import KeyRule, KeyTable, MOD_SHIFT, MOD_CTRL, MOD_ALT, MOD_WIN, VK_LWIN, VK_RWIN
+
+logger = logging.getLogger(__name__)
+
+MODIFIER_KEYS = {'ctrl': MOD_CTRL, 'control': MOD_CTRL, 'alt': MOD_ALT, 'shift': MOD_SHIFT,
+                 'win': MOD_WIN, 'windows': MOD_WIN}
+
+KEY_NAMES = {
+    'backspace': 0x08, 'tab': 0x09, 'enter': 0x0D, 'pause': 0x13, 'esc': 0x1B, 'escape': 0x1B,
+    'space': 0x20, 'end': 0x23, 'home': 0x24, 'printscreen': 0x2C, 'prtsc': 0x2C, 'insert': 0x2D,
+    'del': 0x2E, 'delete': 0x2E, 'menu': 0x5D, 'apps': 0x5D, 'scrolllock': 0x91,
+}
+KEY_NAMES.update({f'f{number}': 0x6F + number for number in range(1, 25)})
+
+# flag -> (default, key combinations)
+KEY_GROUPS = {
+    'block_windows_key': (True, ('Windows', 'Windows+L', 'Windows+R', 'Windows+D')),
+    'block_ctrl_esc': (True, ('Ctrl+Esc',)),
+    'block_alt_f4': (True, ('Alt+F4',)),
+    'block_alt_tab': (True, ('Alt+Tab',)),
+    'block_ctrl_shift_esc': (True, ('Ctrl+Shift+Esc',)),
+    'block_ctrl_alt_del': (True, ('Ctrl+Alt+Del',)),
+    'block_function_keys': (True, tuple(f'F{number}' for number in range(1, 13))),
+    'block_print_screen': (True, ('PrintScreen',)),
+    'block_special_keys': (True, ('Menu', 'ScrollLock', 'Pause')),
+}
+
+DEFAULT_PROFILES = {
+    'lock': {},
+    'gaming': {'block_function_keys': False, 'block_print_screen': False, 'block_special_keys': False},
+    'admin': {'enabled': False},
+}
+
+_versions = itertools.count(1)
+
+
+def parse_combo(text):
+    """KeyRules for a combination like 'Ctrl+Shift+Esc' (two for a bare 'Windows' key)
+
+    Raises ValueError for an unknown modifier or key name.
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError(f"Key combination must be a non-empty string, got {text!r}")
+    *modifier_names, key = [part.strip().lower() for part in text.split('+')]
+    modifiers = 0
+    for name in modifier_names:
+        if name not in MODIFIER_KEYS:
+            raise ValueError(f"Unknown modifier {name!r} in {text!r}")
+        modifiers |= MODIFIER_KEYS[name]
+
+    if key in ('win', 'windows'):
+        vks = (VK_LWIN, VK_RWIN)
+    elif key in KEY_NAMES:
+        vks = (KEY_NAMES[key],)
+    elif len(key) == 1 and key.isalnum() and key.isascii():
+        vks = (ord(key.upper()),)
+    elif key.startswith('0x'):
+        try:
+            vks = (int(key, 16),)
+        except ValueError:
+            raise ValueError(f"Bad virtual-key code in {text!r}")
+        if not 0 < vks[0] < 256:
+            raise ValueError(f"Virtual-key code out of range in {text!r}")
+    else:
+        raise ValueError(f"Unknown key {key!r} in {text!r}")
+    return tuple(KeyRule(modifiers, vk, text) for vk in vks)
+
+
+class KeyboardPolicy:
+    """Compiled, read-only key tables per mode; never modified after compile"""
+
+    __slots__ = ('version', 'tables', 'flags', 'compile_ms')
+
+    def __init__(self, version, tables, flags, compile_ms):
+        self.version = version
+        self.tables = tables  # mode -> KeyTable
+        self.flags = flags  # mode -> effective flags
+        self.compile_ms = compile_ms
+
+    def lookup(self, mode, modifiers, vk):
+        """Label of the rule blocking vk under modifiers in mode, or None"""
+        return self.tables[mode].lookup(modifiers, vk)
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'modes': {mode: table.blocked_count() for mode, table in self.tables.items()},
+            'compile_ms': round(self.compile_ms, 3),
+        }
+
+
+def _flag(where, flag, value):
+    if not isinstance(value, bool):
+        raise ValueError(f"{where}.{flag} must be true or false")
+    return value
+
+
+def _combo_list(where, profile, key):
+    combos = profile.get(key, [])
+    if not isinstance(combos, list):
+        raise ValueError(f"{where}.{key} must be a list of key combinations")
+    rules = []
+    for combo in combos:
+        rules.extend(parse_combo(combo))
+    return rules
+
+
+def compile_keyboard_policy(security=None):
+    """Compile `security.keyboard_blocking` into a KeyboardPolicy
+
+    Raises ValueError on a malformed section, so a bad reload can keep the
+    current policy instead of blocking nothing.
+    """
+    started = time.perf_counter()
+    section = (security or {}).get('keyboard_blocking', {})
+    if not isinstance(section, dict):
+        raise ValueError("keyboard_blocking must be an object")
+    profiles = section.get('profiles', {})
+    if not isinstance(profiles, dict) or not all(isinstance(p, dict) for p in profiles.values()):
+        raise ValueError("keyboard_blocking.profiles must map mode -> object")
+
+    base = {'enabled': _flag('keyboard_blocking', 'enabled', section.get('enabled', True))}
+    for flag, (default, _) in KEY_GROUPS.items():
+        base[flag] = _flag('keyboard_blocking', flag, section.get(flag, default))
+    for flag in section:
+        if flag not in base and flag != 'profiles':
+            logger.warning(f"⚠️ Unknown keyboard_blocking option ignored: {flag}")
+
+    tables, flags = {}, {}
+    for mode in list(DEFAULT_PROFILES) + [mode for mode in profiles if mode not in DEFAULT_PROFILES]:
+        where = f"keyboard_blocking.profiles.{mode}"
+        profile = dict(DEFAULT_PROFILES.get(mode, {}), **profiles.get(mode, {}))
+        effective = dict(base)
+        for flag, value in profile.items():
+            if flag in effective:
+                effective[flag] = _flag(where, flag, value)
+            elif flag not in ('block', 'allow'):
+                logger.warning(f"⚠️ Unknown option ignored: {where}.{flag}")
+
+        rules = []
+        if effective['enabled']:
+            for flag, (_, combos) in KEY_GROUPS.items():
+                if effective[flag]:
+                    for combo in combos:
+                        rules.extend(parse_combo(combo))
+            rules.extend(_combo_list(where, profile, 'block'))
+        tables[mode] = KeyTable(mode, rules, allow=_combo_list(where, profile, 'allow'))
+        flags[mode] = MappingProxyType(effective)
+
+    return KeyboardPolicy(
+        version=next(_versions),
+        tables=MappingProxyType(tables),
+        flags=MappingProxyType(flags),
+        compile_ms=(time.perf_counter() - started) * 1000,
+    )
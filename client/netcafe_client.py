@@ -9,6 +9,7 @@ import uuid
 import traceback
 import ctypes
 import threading
+import time
 import psutil
 import subprocess
 
@@ -20,10 +21,23 @@ from PySide6.QtCore import Qt, QTimer, Signal, Slot
 from PySide6.QtGui import QIcon, QAction, QPixmap, QPainter
 import qasync
 import aiohttp
-import win32con
 import win32api
-import win32gui
-import win32process
+
+from process_events import create_process_event_source, PollingProcessSource
+from process_matcher import NameMatcher
+from process_policy import compile_process_policy
+from process_tree import ProcessTree
+from process_sweep import get_sweep_service
+from window_snapshot import WindowSnapshot, get_window_snapshot
+from exe_identity import HashBlocklist, get_identity_cache
+from enforcement_worker import create_enforcement_supervisor
+from block_stats import get_block_stats, upload_block_stats
+from http_session import HttpSessionManager
+from host_racing import race_hosts, ordered_hosts
+from process_terminator import get_termination_engine
+from keyboard_decision import KeyDecisionEngine
+from hook_log import get_hook_log
+from hook_health import HookHealth, HookWatchdog, KBDLLHOOKSTRUCT
 
 # Configure logging
 logging.basicConfig(
@@ -336,22 +350,40 @@ class LoginDialog(QDialog):
         return self.username_input.text().strip(), self.password_input.text().strip()
 
 class KeyboardBlocker:
-    def __init__(self):
+    def __init__(self, probe_idle=None):
         self.hooked = None
         self.enabled = False
         self.lock_mode = False  # True = lock screen (strict), False = session mode (minimal)
         self.pointer = None
-        self.thread = None
+        self.engine = KeyDecisionEngine()  # lock/session key tables
+        # Blocked keys are counted here and logged by a background drainer - never from the hook
+        self.lock_events = get_hook_log().channel('keyboard_lock', "🔒 Lock screen")
+        self.session_events = get_hook_log().channel('keyboard_session', "🎮 Gaming session")
+        # Callback latency + probe-based detection of a hook Windows removed silently; the probe
+        # resets the Windows idle timer, so it only runs when the config sets probe_idle (seconds)
+        self.health = HookHealth()
+        self.watchdog = HookWatchdog(self.health, self._reinstall, idle_after=probe_idle)
     
     def install(self, lock_mode=True):
         """Install keyboard blocker
         lock_mode=True: Lock screen mode (blocks Alt+Tab, Alt+F4, Windows keys)
         lock_mode=False: Session mode (minimal blocking, let users game freely)
+        
+        The hook is installed once and stays; when it is already installed this
+        only switches the decision table (see set_mode), so a mode change never
+        leaves the keyboard unprotected.
         """
+        mode = 'lock' if lock_mode else 'session'
         if self.hooked:
-            self.uninstall()  # Uninstall previous hook first
+            self.set_mode(mode)
+            return
         
         self.lock_mode = lock_mode
+        engine = self.engine
+        engine.set_mode(mode)
+        engine.reset()  # key-ups were not seen while unhooked
+        channels = {'lock': self.lock_events, 'session': self.session_events}
+        health = self.health
         
         try:
             # Import required Windows APIs
@@ -366,80 +398,29 @@ class KeyboardBlocker:
             
             # Constants for low-level keyboard hook
             WH_KEYBOARD_LL = 13
-            WM_KEYDOWN = 0x0100
-            WM_SYSKEYDOWN = 0x0104
             
             def low_level_keyboard_proc(nCode, wParam, lParam):
-                if not self.enabled:
-                    return user32.CallNextHookExW(self.hooked, nCode, wParam, lParam)
-                
-                if nCode == 0:  # HC_ACTION
-                    # Get virtual key code from lParam structure
-                    vk_code = ctypes.cast(lParam, ctypes.POINTER(wintypes.DWORD))[0]
+                started = time.perf_counter()
+                try:
+                    if not self.enabled:
+                        return user32.CallNextHookExW(self.hooked, nCode, wParam, lParam)
                     
-                    # Only process key down events
-                    if wParam in (WM_KEYDOWN, WM_SYSKEYDOWN):
-                        
-                        # Lock mode: Strict blocking when computer is locked
-                        if self.lock_mode:
-                            # Block Windows keys (Left: 0x5B, Right: 0x5C)
-                            if vk_code in (0x5B, 0x5C):
-                                logger.info(f"🔒 BLOCKED Windows key on lock screen (VK: {vk_code})")
-                                return 1
-                            
-                            # Block Alt+Tab (Tab: 0x09 with Alt modifier)
-                            if vk_code == 0x09 and user32.GetAsyncKeyState(0x12) & 0x8000:  # Alt key
-                                logger.info("🔒 BLOCKED Alt+Tab on lock screen")
-                                return 1
-                            
-                            # Block Alt+F4 (F4: 0x73 with Alt modifier)
-                            if vk_code == 0x73 and user32.GetAsyncKeyState(0x12) & 0x8000:  # Alt key
-                                logger.info("🔒 BLOCKED Alt+F4 on lock screen")
-                                return 1
-                            
-                            # Block Ctrl+Esc (Esc: 0x1B with Ctrl modifier)
-                            if vk_code == 0x1B and user32.GetAsyncKeyState(0x11) & 0x8000:  # Ctrl key
-                                logger.info("🔒 BLOCKED Ctrl+Esc on lock screen")
-                                return 1
-                            
-                            # Block Ctrl+Shift+Esc (Task Manager)
-                            if (vk_code == 0x1B and 
-                                user32.GetAsyncKeyState(0x11) & 0x8000 and  # Ctrl
-                                user32.GetAsyncKeyState(0x10) & 0x8000):    # Shift
-                                logger.info("🔒 BLOCKED Ctrl+Shift+Esc on lock screen")
-                                return 1
-                            
-                            # Block Windows+L (Lock computer: L with Windows key)
-                            if (vk_code == 0x4C and 
-                                (user32.GetAsyncKeyState(0x5B) & 0x8000 or 
-                                 user32.GetAsyncKeyState(0x5C) & 0x8000)):
-                                logger.info("🔒 BLOCKED Windows+L on lock screen")
-                                return 1
-                            
-                            # Block Windows+R (Run dialog: R with Windows key)
-                            if (vk_code == 0x52 and 
-                                (user32.GetAsyncKeyState(0x5B) & 0x8000 or 
-                                 user32.GetAsyncKeyState(0x5C) & 0x8000)):
-                                logger.info("🔒 BLOCKED Windows+R on lock screen")
-                                return 1
-                            
-                            # Block Windows+D (Show desktop)
-                            if (vk_code == 0x44 and 
-                                (user32.GetAsyncKeyState(0x5B) & 0x8000 or 
-                                 user32.GetAsyncKeyState(0x5C) & 0x8000)):
-                                logger.info("🔒 BLOCKED Windows+D on lock screen")  
-                                return 1
+                    if nCode == 0:  # HC_ACTION
+                        info = ctypes.cast(lParam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents
+                        if health.is_probe(info):
+                            health.on_probe()
+                            return 1  # the watchdog's own probe - no application gets it
                         
-                        # Session mode: Minimal blocking - let users game normally
-                        else:
-                            # Only block Ctrl+Shift+Esc (Task Manager) during gaming
-                            if (vk_code == 0x1B and 
-                                user32.GetAsyncKeyState(0x11) & 0x8000 and  # Ctrl
-                                user32.GetAsyncKeyState(0x10) & 0x8000):    # Shift
-                                logger.info("🎮 BLOCKED Ctrl+Shift+Esc during gaming session")
-                                return 1
-                
-                return user32.CallNextHookExW(self.hooked, nCode, wParam, lParam)
+                        # One table lookup - modifier state comes from the hook's own key events,
+                        # not from GetAsyncKeyState calls inside the callback
+                        blocked = engine.on_message(wParam, info.vkCode)
+                        if blocked:
+                            channels[engine.table.mode].record(blocked)
+                            return 1
+                    
+                    return user32.CallNextHookExW(self.hooked, nCode, wParam, lParam)
+                finally:
+                    health.record(started)
             
             # Create hook function
             self.pointer = HOOKPROC(low_level_keyboard_proc)
@@ -455,35 +436,11 @@ class KeyboardBlocker:
             if not self.hooked:
                 raise Exception(f"SetWindowsHookEx failed: {ctypes.get_last_error()}")
             
+            # No message pump of our own: Windows calls a low-level hook on the thread that
+            # installed it, and that is the Qt thread, whose event loop already pumps messages
             self.enabled = True
             
-            # Start message pump in separate thread
-            def message_pump():
-                msg = wintypes.MSG()
-                bRet = wintypes.BOOL()
-                
-                while self.enabled and self.hooked:
-                    try:
-                        bRet = user32.GetMessageW(ctypes.byref(msg), None, 0, 0)
-                        if bRet == 0 or bRet == -1:  # WM_QUIT or error
-                            break
-                        user32.TranslateMessage(ctypes.byref(msg))
-                        user32.DispatchMessageW(ctypes.byref(msg))
-                    except Exception as e:
-                        logger.error(f"Message pump error: {e}")
-                        break
-            
-            self.thread = threading.Thread(target=message_pump, daemon=True)
-            self.thread.start()
-            
-            mode_str = "Lock mode (strict blocking)" if lock_mode else "Gaming mode (minimal blocking)"
-            logger.info(f"🔐 Keyboard blocker installed successfully ({mode_str})")
-            
-            # Test that blocking is working
-            if lock_mode:
-                logger.info("🔒 LOCK SCREEN PROTECTION ACTIVE - Alt+Tab, Alt+F4, Windows keys BLOCKED")
-            else:
-                logger.info("🎮 GAMING PROTECTION ACTIVE - Only Task Manager blocked")
+            logger.info(f"🔐 Keyboard blocker installed successfully ({mode} table)")
                 
         except Exception as e:
             logger.error(f"❌ Failed to install keyboard blocker: {e}")
@@ -499,20 +456,73 @@ class KeyboardBlocker:
                 self.hooked = None
                 self.pointer = None
                 
-                # Stop message pump thread
-                if self.thread and self.thread.is_alive():
-                    self.thread.join(timeout=1)
-                    
+                get_hook_log().flush()  # log the blocks of the last interval now
                 logger.info("🔐 Keyboard blocker uninstalled successfully")
             except Exception as e:
                 logger.error(f"Failed to uninstall keyboard blocker: {e}")
+    
+    def set_mode(self, mode):
+        """Switch between the 'lock' and 'session' tables while the hook keeps running
+        
+        One reference swap - the next key event already uses the new table,
+        and modifiers held across the switch stay tracked.
+        """
+        started = time.perf_counter()
+        self.lock_mode = mode == 'lock'
+        self.engine.set_mode(mode)
+        switch_us = (time.perf_counter() - started) * 1e6
+        if self.lock_mode:
+            logger.info(f"🔒 LOCK SCREEN PROTECTION ACTIVE - Alt+Tab, Alt+F4, Windows keys BLOCKED ({switch_us:.0f} us switch)")
+        else:
+            logger.info(f"🎮 GAMING PROTECTION ACTIVE - Only Task Manager blocked ({switch_us:.0f} us switch)")
+    
+    def check_health(self):
+        """Watchdog tick - call every second from the thread that installed the hook"""
+        if self.hooked and self.enabled:
+            return self.watchdog.tick()
+        return None
+    
+    def _reinstall(self):
+        """Replace a hook Windows removed - the new hook is in place before the old one is released
+        
+        Unhooking first would let keys through until the new hook is installed.
+        """
+        old_hook, old_pointer = self.hooked, self.pointer
+        self.hooked = None
+        self.install(lock_mode=self.lock_mode)
+        if not self.hooked:
+            # Keep whatever the old hook still does rather than nothing
+            self.hooked, self.pointer, self.enabled = old_hook, old_pointer, True
+            return
+        try:
+            ctypes.windll.user32.UnhookWindowsHookEx(old_hook)  # old_pointer keeps its callback alive until here
+        except Exception as e:
+            logger.error(f"Failed to release the old keyboard hook: {e}")
+
+# Block events are sent to the server this often (ms)
+BLOCK_STATS_UPLOAD_INTERVAL = 60000
+# Keyboard hook watchdog tick (ms)
+HOOK_HEALTH_INTERVAL = 1000
+
+# Window checks within this many seconds reuse the same EnumWindows pass
+WINDOW_SNAPSHOT_MAX_AGE = 0.5
+# Seconds between re-checks of the process tree against the live PIDs
+PROCESS_TREE_PRUNE_INTERVAL = 60
 
 class FolderBlocker:
     """Blocks access to file manager and folders during gaming sessions"""
     
-    def __init__(self):
+    def __init__(self, event_source=None, window_backend=None):
         self.enabled = False
         self.monitor_thread = None
+        self.event_source = event_source  # None = pick the best backend on install
+        # One window enumeration per sweep, shared with the other blockers
+        self.window_snapshot = WindowSnapshot(window_backend) if window_backend else get_window_snapshot()
+        self.explorer_pids = set()  # Running explorer.exe processes to watch for folder windows
+        self.survivors = {}  # pid -> (create time, name, rule, message, new_process) of processes that survived kill()
+        self.blocked_count = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
         self.blocked_processes = [
             'explorer.exe',      # Windows Explorer
             'cmd.exe',          # Command Prompt  
@@ -537,6 +547,34 @@ class FolderBlocker:
             # Common games (can be expanded)
             'csgo.exe', 'dota2.exe', 'league of legends.exe', 'valorant.exe'
         ]
+        # Anything started (directly or further down) by a launcher is a game or its installer
+        self.allowed_launchers = [
+            'steam.exe', 'epicgameslauncher.exe', 'battle.net.exe',
+            'origin.exe', 'upc.exe', 'uplay.exe'
+        ]
+        # Blocked tools that installers legitimately run - allowed only under a launcher
+        self.launcher_tools = ['cmd.exe', 'powershell.exe']
+        self.process_tree = ProcessTree()
+        # Hashing every unmatched exe is opt-in: process_profiles.<profile>.detect_renamed_tools (set_policy)
+        self.detect_renamed_tools = False
+        self._compile_matchers()
+    
+    def set_policy(self, policy):
+        """Take detect_renamed_tools from the compiled process policy; the name lists stay FolderBlocker's own"""
+        self.detect_renamed_tools = policy.detect_renamed_tools
+        self._compile_matchers()
+    
+    def _compile_matchers(self):
+        """Compile the name lists (exact names, '*suffix' or globs) into matchers"""
+        self.allowed_matcher = NameMatcher(self.allowed_games)
+        self.blocked_matcher = NameMatcher(self.blocked_processes)
+        self.launcher_matcher = NameMatcher(self.allowed_launchers)
+        self.launcher_tools_matcher = NameMatcher(self.launcher_tools)
+        # Renamed copies of the blocked tools are recognised by content hash
+        self.hash_blocklist = None
+        if self.detect_renamed_tools:
+            self.hash_blocklist = HashBlocklist(get_identity_cache())
+            self.hash_blocklist.add_system_tools(self.blocked_processes)
     
     def install(self):
         """Start monitoring and blocking folder access"""
@@ -544,92 +582,239 @@ class FolderBlocker:
             return
             
         self.enabled = True
-        self.monitor_thread = threading.Thread(target=self._monitor_processes, daemon=True)
+        self._compile_matchers()  # Pick up any edits to the lists
+        self._stop_event.clear()
+        
+        if self.event_source is None:
+            self.event_source = create_process_event_source()
+        
+        # Parent/child links come from the same events from here on
+        self.process_tree.seed()
+        
+        # Process starts are handled as soon as the OS reports them
+        self.event_source.start(self._on_process_event)
+        if not isinstance(self.event_source, PollingProcessSource):
+            # Native sources only report new processes - check the ones already running
+            self._check_running_processes()
+        
+        # Folder windows open inside existing explorer.exe processes, so they still need a periodic check
+        self.monitor_thread = threading.Thread(target=self._monitor_windows, daemon=True)
         self.monitor_thread.start()
-        logger.info("🛡️  Folder blocker installed - File system access restricted")
+        logger.info(f"🛡️  Folder blocker installed - File system access restricted ({self.event_source.name} events)")
     
     def uninstall(self):
         """Stop monitoring"""
         self.enabled = False
+        self._stop_event.set()
+        if self.event_source:
+            self.event_source.stop()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=1)
             self.monitor_thread = None
+        self.explorer_pids.clear()
+        with self._lock:
+            self.survivors.clear()
+        self.process_tree = ProcessTree()
+        get_identity_cache().save_if_dirty()
         logger.info("🛡️  Folder blocker uninstalled - File system access restored")
     
-    def _monitor_processes(self):
-        """Monitor running processes and terminate blocked ones"""
-        blocked_count = 0
+    def _check_running_processes(self):
+        """One full sweep of the processes that were running before we subscribed"""
+        for proc in psutil.process_iter(['pid', 'name']):
+            if not self.enabled:
+                break
+            try:
+                self._handle_process(proc, (proc.info['name'] or '').lower())
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        get_termination_engine().flush()
+    
+    def _on_process_event(self, event):
+        """Called by the process event source for every process start/exit"""
+        if not self.enabled:
+            return
+        
+        if event.kind == 'exit':
+            self.explorer_pids.discard(event.pid)
+            self.process_tree.remove(event.pid)
+            return
+        
+        try:
+            proc = psutil.Process(event.pid)
+            proc_name = (event.name or proc.name()).lower()
+            self.process_tree.add(event.pid, event.ppid, proc_name)
+            self._handle_process(proc, proc_name)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+        get_termination_engine().flush()
+    
+    def _handle_process(self, proc, proc_name):
+        """Terminate the process if it is a blocked system tool"""
+        detected_at = time.time()
+        
+        # Skip allowed processes before anything costs an exe() lookup
+        if self.allowed_matcher.match(proc_name):
+            return
+        
+        # Check if process should be blocked
+        rule = self.blocked_matcher.match(proc_name)
+        if not rule:
+            # A blocked tool copied under another name is caught by content (if detect_renamed_tools)
+            self._is_renamed_blocked_tool(proc, proc_name)
+            return
+        if self.launcher_tools_matcher.match(proc_name):
+            # An installer's cmd.exe under Steam & co. is fine; the same shell elsewhere is not
+            launcher = self.process_tree.find_ancestor(proc.pid, self.launcher_matcher)
+            if launcher:
+                # ...unless it is another blocked tool renamed to the shell's name
+                if not self._is_renamed_blocked_tool(proc, proc_name):
+                    logger.debug(f"Allowed {proc_name} (PID: {proc.pid}) under {launcher[0].name} (PID: {launcher[0].pid})")
+                return
+        
+        # Don't kill the main Windows explorer (shell)
+        if proc_name == 'explorer.exe':
+            self.explorer_pids.add(proc.pid)
+            # Check if it's a folder window (not the desktop shell)
+            if self._is_folder_explorer_window(proc.pid):
+                self._block(proc, proc_name, rule, detected_at,
+                            f"🚫 Blocked folder access: {proc_name} (PID: {proc.pid})")
+        else:
+            self._block(proc, proc_name, rule, detected_at,
+                        f"🚫 Blocked system tool: {proc_name} (PID: {proc.pid})")
+    
+    def _is_renamed_blocked_tool(self, proc, proc_name):
+        """Terminate proc if its exe is a blocked tool under a different name
+        
+        Already-hashed executables are answered with a dict lookup; unknown ones
+        are hashed in the background and blocked when the hash comes back.
+        Without detect_renamed_tools nothing is looked up.
+        """
+        hash_blocklist = self.hash_blocklist
+        if hash_blocklist is None:
+            return False
+        try:
+            exe = proc.exe()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+        
+        def block(rule):
+            if rule == proc_name:
+                return False  # the genuine tool - the name rules handle it
+            self._block(proc, proc_name, rule, time.time(),
+                        f"🚫 Blocked renamed system tool: {proc_name} is {rule} (PID: {proc.pid})")
+            return True
+        
+        def on_late_match(rule):
+            if self.enabled and proc.is_running():
+                try:
+                    block(rule)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+                get_termination_engine().flush()  # runs on the hashing pool, outside any event
+        
+        rule = hash_blocklist.match(exe, on_late_match=on_late_match)
+        return bool(rule) and block(rule)
+    
+    def _block(self, proc, proc_name, rule, detected_at, message, new_process=True):
+        """Queue proc for termination at the next flush of the termination engine
         
+        Returns False if it is already being terminated (seen again by a later
+        event or sweep before it exited).
+        """
+        on_done = lambda result: self._record_block(result, message, proc_name, new_process)
+        return get_termination_engine().submit(proc, rule, 'folder_blocker', detected_at, on_done)
+    
+    def _record_block(self, result, message, proc_name, new_process=True):
+        """Count the block, feed the block statistics and speed up the process sweep
+        
+        Called by the termination engine once the process is gone (or survived
+        kill()). new_process=False
+        when the process is long-running (explorer.exe) and its start time says
+        nothing about detection latency.
+        """
+        if result.survived:
+            # No new event will report it again - the window loop resubmits it after the engine's cooldown
+            with self._lock:
+                self.survivors[result.pid] = (result.started_at, proc_name, result.rule, message, new_process)
+            return
+        started_at = result.started_at if new_process else None
+        get_block_stats().record('folder_blocker', result.rule, result.pid, proc_name, started_at,
+                                 result.detected_at, result.killed_at)
+        with self._lock:
+            self.survivors.pop(result.pid, None)
+            self.blocked_count += 1
+            blocked_count = self.blocked_count
+        logger.info(message)
+        get_sweep_service().note_block()  # Sweep faster for a while - users tend to retry
+        
+        # Log summary periodically
+        if blocked_count % 5 == 0:
+            logger.info(f"🛡️  Gaming session protected - {blocked_count} access attempts blocked")
+    
+    def _monitor_windows(self):
+        """Check explorer.exe processes for folder windows at the adaptive sweep interval"""
+        last_prune = time.monotonic()
         while self.enabled:
             try:
-                for proc in psutil.process_iter(['pid', 'name', 'exe']):
+                if self.explorer_pids:
+                    self.window_snapshot.refresh(max_age=WINDOW_SNAPSHOT_MAX_AGE)
+                for pid in list(self.explorer_pids):
                     if not self.enabled:
                         break
-                        
-                    try:
-                        proc_name = proc.info['name'].lower()
-                        
-                        # Skip allowed processes
-                        if any(allowed in proc_name for allowed in self.allowed_games):
-                            continue
-                        
-                        # Check if process should be blocked
-                        if any(blocked in proc_name for blocked in self.blocked_processes):
-                            # Don't kill the main Windows explorer (shell)
-                            if proc_name == 'explorer.exe':
-                                # Check if it's a folder window (not the desktop shell)
-                                if self._is_folder_explorer_window(proc.info['pid']):
-                                    proc.terminate()
-                                    blocked_count += 1
-                                    logger.info(f"🚫 Blocked folder access: {proc_name} (PID: {proc.info['pid']})")
-                            else:
-                                proc.terminate()
-                                blocked_count += 1
-                                logger.info(f"🚫 Blocked system tool: {proc_name} (PID: {proc.info['pid']})")
-                        
-                        # Block new folder windows by checking window titles
-                        elif proc_name == 'explorer.exe':
-                            if self._check_explorer_windows():
-                                blocked_count += 1
-                    
-                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                        continue
-                
-                # Log summary periodically
-                if blocked_count > 0 and blocked_count % 5 == 0:
-                    logger.info(f"🛡️  Gaming session protected - {blocked_count} access attempts blocked")
-                
-                # Check every 2 seconds
-                for _ in range(20):
-                    if not self.enabled:
-                        break
-                    threading.Event().wait(0.1)
-                        
+                    if self._is_folder_explorer_window(pid, refresh=False):
+                        try:
+                            detected_at = time.time()
+                            proc = psutil.Process(pid)
+                            self._block(proc, 'explorer.exe', 'folder window', detected_at,
+                                        f"🚫 Blocked folder access: explorer.exe (PID: {pid})", new_process=False)
+                        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                            self.explorer_pids.discard(pid)
+                self._retry_survivors()
+                get_termination_engine().flush()
             except Exception as e:
                 logger.error(f"Folder blocker error: {e}")
-                threading.Event().wait(1)
+            
+            self._stop_event.wait(get_sweep_service().interval)
+            
+            # Exits the event source missed would otherwise keep nodes in the tree
+            if time.monotonic() - last_prune > PROCESS_TREE_PRUNE_INTERVAL:
+                self.process_tree.prune()
+                last_prune = time.monotonic()
     
-    def _is_folder_explorer_window(self, pid):
-        """Check if explorer.exe process is a folder window"""
+    def _retry_survivors(self):
+        """Submit again the processes that survived terminate() and kill()
+        
+        The engine refuses them until its retry_after cooldown has passed.
+        """
+        with self._lock:
+            survivors = list(self.survivors.items())
+        for pid, (started_at, proc_name, rule, message, new_process) in survivors:
+            try:
+                proc = psutil.Process(pid)
+                if started_at is not None and proc.create_time() != started_at:
+                    raise psutil.NoSuchProcess(pid)  # the pid was reused
+                self._block(proc, proc_name, rule, time.time(), message, new_process)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                with self._lock:
+                    self.survivors.pop(pid, None)
+            except psutil.AccessDenied:
+                continue
+    
+    def _is_folder_explorer_window(self, pid, refresh=True):
+        """Check if explorer.exe process is a folder window
+        
+        Looks the pid up in the shared window snapshot; refresh=False when the
+        caller already refreshed it for this sweep.
+        """
         try:
-            # Get windows for this process
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if window_pid == pid:
-                        window_title = win32gui.GetWindowText(hwnd)
-                        class_name = win32gui.GetClassName(hwnd)
-                        windows.append((hwnd, window_title, class_name))
-                return True
+            if refresh:
+                self.window_snapshot.refresh(max_age=WINDOW_SNAPSHOT_MAX_AGE)
             
-            windows = []
-            win32gui.EnumWindows(enum_windows_callback, windows)
-            
-            for hwnd, title, class_name in windows:
+            for window in self.window_snapshot.for_pid(pid):
                 # Check for typical folder window indicators
-                if (class_name == 'CabinetWClass' or  # Standard folder window
-                    'Explorer' in class_name or
-                    any(folder_indicator in title.lower() for folder_indicator in 
+                if (window.class_name == 'CabinetWClass' or  # Standard folder window
+                    'Explorer' in window.class_name or
+                    any(folder_indicator in window.title.lower() for folder_indicator in 
                         ['documents', 'downloads', 'desktop', 'pictures', 'music', 'videos', 
                          'program files', 'windows', 'users', 'local disk', 'drive'])):
                     return True
@@ -637,35 +822,6 @@ class FolderBlocker:
             return False
         except Exception:
             return False
-    
-    def _check_explorer_windows(self):
-        """Check for and close unauthorized explorer windows"""
-        try:
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    window_title = win32gui.GetWindowText(hwnd)
-                    class_name = win32gui.GetClassName(hwnd)
-                    
-                    # Check for folder windows
-                    if (class_name == 'CabinetWClass' or
-                        any(folder_indicator in window_title.lower() for folder_indicator in 
-                            ['documents', 'downloads', 'desktop', 'pictures', 'music', 'videos', 
-                             'program files', 'windows', 'users', 'local disk', 'drive', 'folder'])):
-                        try:
-                            win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
-                            logger.info(f"🚫 Closed folder window: {window_title}")
-                            windows.append(hwnd)
-                        except Exception:
-                            pass
-                return True
-            
-            windows = []
-            win32gui.EnumWindows(enum_windows_callback, windows)
-            return len(windows) > 0
-            
-        except Exception as e:
-            logger.debug(f"Window check error: {e}")
-            return False
 
 class NetCafeClient:
     def __init__(self):
@@ -675,12 +831,19 @@ class NetCafeClient:
         
         # Load configuration
         self.config = self._load_config()
+        get_sweep_service().configure(self.config.get('performance', {}))
         
         # Components
         self.timer_overlay = TimerOverlay()
         self.lock_screen = LockScreen()
-        self.keyboard_blocker = KeyboardBlocker()
-        self.folder_blocker = FolderBlocker()  # Add folder blocker
+        self.keyboard_blocker = KeyboardBlocker(self.config.get('security', {}).get('keyboard_hook_probe_idle'))
+        # Folder blocking runs in the enforcement worker when performance.enforcement_worker is on
+        self.enforcement = create_enforcement_supervisor(self.config.get('performance', {}))
+        self.folder_blocker = self.enforcement.monitor('folder_blocker') if self.enforcement else FolderBlocker()
+        try:
+            self.folder_blocker.set_policy(compile_process_policy(self.config.get('security', {})))
+        except ValueError as e:
+            logger.error(f"❌ Invalid process profile, renamed-tool detection stays off: {e}")
         
         # State
         self.session_active = False
@@ -692,9 +855,11 @@ class NetCafeClient:
         self.server_hosts = [self.config['server']['host']] + self.config['server'].get('fallback_hosts', [])
         self.server_port = self.config['server']['port']
         self.current_host_index = 0
+        # All hosts are raced on every connect; the next one starts after this delay or a failure
+        self.connect_stagger = self.config['server'].get('connect_stagger_ms', 250) / 1000
         
-        # Network
-        self.session = None
+        # Network - one pooled HTTP session for status, login, logout, stats and the WebSocket
+        self.http = HttpSessionManager(self.config['server'].get('http'))
         self.ws = None
         self.ws_task = None
         self.reconnect_attempts = 0
@@ -705,6 +870,12 @@ class NetCafeClient:
         self.session_timer.timeout.connect(self._tick)
         self.reconnect_timer = QTimer()
         self.reconnect_timer.timeout.connect(self._try_reconnect)
+        self.stats_upload_timer = QTimer()
+        self.stats_upload_timer.timeout.connect(self._upload_block_stats)
+        self.stats_upload_timer.start(BLOCK_STATS_UPLOAD_INTERVAL)
+        self.hook_health_timer = QTimer()
+        self.hook_health_timer.timeout.connect(self.keyboard_blocker.check_health)
+        self.hook_health_timer.start(HOOK_HEALTH_INTERVAL)
         
         # Notifications
         self._notified_5min = False
@@ -791,6 +962,10 @@ class NetCafeClient:
             reconnect_action.triggered.connect(self._manual_reconnect)
             menu.addAction(reconnect_action)
             
+            stats_action = QAction('📊 Block Statistics')
+            stats_action.triggered.connect(self._show_block_stats)
+            menu.addAction(stats_action)
+            
             menu.addSeparator()
             
             exit_action = QAction('❌ Exit')
@@ -815,10 +990,16 @@ class NetCafeClient:
     def _show_lock_screen(self):
         self.lock_screen.show_lock()
         self.keyboard_blocker.install(lock_mode=True)  # Strict blocking on lock screen
+        get_sweep_service().set_locked(True)
+        if self.enforcement:
+            self.enforcement.set_locked(True)
     
     def _hide_lock_screen(self):
+        # The keyboard hook stays installed - start_session already switched it to the session table
         self.lock_screen.hide_lock()
-        self.keyboard_blocker.uninstall()
+        get_sweep_service().set_locked(False)
+        if self.enforcement:
+            self.enforcement.set_locked(False)
     
     def _show_overlay(self):
         if self.session_active:
@@ -849,8 +1030,12 @@ class NetCafeClient:
         try:
             self.session_timer.stop()
             self.reconnect_timer.stop()
+            self.stats_upload_timer.stop()
+            self.hook_health_timer.stop()
             self.keyboard_blocker.uninstall()
             self.folder_blocker.uninstall()
+            if self.enforcement:
+                self.enforcement.stop()
             
             # Improved async resource cleanup
             try:
@@ -871,23 +1056,9 @@ class NetCafeClient:
                         except (asyncio.TimeoutError, asyncio.CancelledError):
                             pass  # Expected for cancelled tasks
                     
-                    # Close session gracefully
-                    if self.session and not self.session.closed:
-                        try:
-                            # Create a task to close the session
-                            close_task = self.loop.create_task(self.session.close())
-                            # Don't wait for it to complete to avoid blocking
-                        except Exception as e:
-                            logger.debug(f"Session close task creation failed: {e}")
-                else:
-                    # Event loop not running, force cleanup
-                    if self.session and not self.session.closed:
-                        try:
-                            # Try to close synchronously if possible
-                            self.session._connector_owner = False
-                            self.session._connector = None
-                        except Exception:
-                            pass
+                    # Close the pooled session; run() also awaits this before the loop closes
+                    if not self.http.closed:
+                        self.loop.create_task(self.http.close())
             except Exception as e:
                 logger.debug(f"Async cleanup handled: {e}")
             
@@ -902,27 +1073,17 @@ class NetCafeClient:
             return
         
         try:
-            server_url = self._get_current_server_url()
-            logger.info(f"Connecting to server: {server_url}")
+            hosts = ordered_hosts(self.server_hosts, self.current_host_index)
+            logger.info(f"Connecting to server: racing {', '.join(hosts)} on port {self.server_port}")
             self.set_status('Connecting to server...', False)
             
-            if self.session:
-                await self.session.close()
-            
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
-            
-            # Test connection
-            async with self.session.get(f'{server_url}/api/status') as response:
-                if response.status == 200:
-                    logger.info("Server is reachable")
-                else:
-                    raise Exception(f"Server status: {response.status}")
-            
-            # Connect WebSocket
-            host = self.server_hosts[self.current_host_index]
-            ws_url = f"ws://{host}:{self.server_port}/ws?computer_id={self.computer_id}"
-            self.ws = await self.session.ws_connect(ws_url)
-            logger.info("WebSocket connected")
+            # Status check + WebSocket handshake with every host, staggered; the first to finish wins
+            result = await race_hosts(self.http, hosts, self.server_port, self.computer_id,
+                                      stagger=self.connect_stagger,
+                                      ws_path=self.config['server'].get('websocket_endpoint', '/ws'))
+            self.current_host_index = self.server_hosts.index(result.host)
+            self.ws = result.ws
+            logger.info(f"WebSocket connected to {result.url}")
             
             # Start WebSocket message handler with proper task management
             self.ws_task = asyncio.create_task(self._handle_ws_messages())
@@ -934,22 +1095,12 @@ class NetCafeClient:
             await self.show_login()
             
         except Exception as e:
+            # HostRaceError lists what went wrong with every host
             logger.error(f"Connection error: {e}")
             self.reconnect_attempts += 1
             
-            # Try next host if available
-            if self.current_host_index < len(self.server_hosts) - 1:
-                self.current_host_index += 1
-                logger.info(f"Trying next host: {self.server_hosts[self.current_host_index]}")
-            else:
-                self.current_host_index = 0  # Reset to first host
-            
             self.set_status(f'Connection failed (attempt {self.reconnect_attempts})', False)
             
-            if self.session:
-                await self.session.close()
-                self.session = None
-            
             self._start_reconnect_timer()
     
     async def show_login(self):
@@ -974,7 +1125,7 @@ class NetCafeClient:
             logger.info(f"Authenticating user: {username}")
             
             server_url = self._get_current_server_url()
-            async with self.session.post(f'{server_url}/api/login', json=login_data) as response:
+            async with self.http.post(f'{server_url}/api/login', json=login_data) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get('success'):
@@ -1006,10 +1157,10 @@ class NetCafeClient:
             self._notified_5min = False
             self._notified_1min = False
             
-            self._hide_lock_screen()
-            
-            # Gaming session: Only minimal keyboard blocking + folder blocking
+            # Gaming session: Only minimal keyboard blocking + folder blocking.
+            # Table switch first, on the hook that is already running - no gap without a hook
             self.keyboard_blocker.install(lock_mode=False)  # Minimal blocking during gaming
+            self._hide_lock_screen()
             self.folder_blocker.install()  # Block folder access during session
             
             self._show_overlay()
@@ -1040,7 +1191,7 @@ class NetCafeClient:
                 
                 try:
                     server_url = self._get_current_server_url()
-                    async with self.session.post(f'{server_url}/api/logout', json=logout_data) as response:
+                    async with self.http.post(f'{server_url}/api/logout', json=logout_data) as response:
                         if response.status == 200:
                             logger.info("Logout successful")
                         else:
@@ -1053,15 +1204,15 @@ class NetCafeClient:
             self.session_timer.stop()
             self.timer_overlay.hide()
             
-            # Uninstall session protections
-            self.keyboard_blocker.uninstall()
+            # Back to the lock table right away; the hook itself is never removed
+            self.keyboard_blocker.install(lock_mode=True)
             self.folder_blocker.uninstall()
             
             # Cancel WebSocket task if running
             if self.ws_task and not self.ws_task.done():
                 self.ws_task.cancel()
             
-            self._show_lock_screen()  # This will install strict lock-mode keyboard blocker
+            self._show_lock_screen()  # Lock screen + strict lock-mode keyboard table
             
             self.set_status('Session ended', False)
             
@@ -1202,6 +1353,22 @@ class NetCafeClient:
             minutes = data.get('minutes', 0)
             if minutes > 0 and not self.session_active:
                 await self.start_session(minutes)
+        
+        elif msg_type == 'request_security_stats':
+            self._upload_block_stats()
+    
+    def _show_block_stats(self):
+        text = (f"{get_block_stats().format_summary()}\n{self.keyboard_blocker.health.format_summary()}\n"
+                f"{self.http.format_summary()}")
+        self.tray.showMessage('📊 Block Statistics', text, QSystemTrayIcon.Information, 5000)
+    
+    def _upload_block_stats(self):
+        """Send block events the server has not seen yet (retried on the next tick if it fails)"""
+        if self.ws is not None and not self.ws.closed:
+            asyncio.create_task(upload_block_stats(
+                self.http, self._get_current_server_url(), self.computer_id, get_block_stats(),
+                extra={'keyboard_hook': self.keyboard_blocker.health.stats(), 'http_pool': self.http.pool_stats()}
+            ))
     
     def _start_reconnect_timer(self):
         if not self.reconnect_timer.isActive() and self.reconnect_attempts < self.max_reconnect_attempts:
@@ -1226,7 +1393,11 @@ class NetCafeClient:
         try:
             with self.loop:
                 self.loop.create_task(self.connect_to_server())
-                self.loop.run_forever()
+                try:
+                    self.loop.run_forever()
+                finally:
+                    # Pooled keep-alive connections are closed while the loop can still run it
+                    self.loop.run_until_complete(self.http.close())
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
         except Exception as e:
@@ -25,10 +25,14 @@ import qasync
 
 # Network imports
 import aiohttp
-import websockets
 
 # Security imports
 from enhanced_security import SecurityManager
+from security_notifications import get_notification_queue
+from enforcement_worker import create_enforcement_supervisor
+from block_stats import get_block_stats, upload_block_stats
+from http_session import HttpSessionManager
+from host_racing import race_hosts, ordered_hosts
 
 # Logging setup
 logging.basicConfig(
@@ -546,8 +550,12 @@ class EnhancedNetCafeClient:
         # Load configuration
         self.config = self._load_config()
         
-        # Security manager
-        self.security_manager = SecurityManager()
+        # Security manager (process monitoring optionally in the enforcement worker)
+        self.enforcement = create_enforcement_supervisor(self.config.get('performance', {}))
+        self.security_manager = SecurityManager(enforcement=self.enforcement)
+        self.performance = self.config.get('performance', {})
+        self.security_manager.apply_performance_settings(self.performance)
+        self.security_manager.apply_policies(self.config.get('security', {}))
         
         # UI Components
         self.timer_overlay = TimerOverlay()
@@ -564,9 +572,11 @@ class EnhancedNetCafeClient:
         self.server_hosts = [self.config['server']['host']] + self.config['server'].get('fallback_hosts', [])
         self.server_port = self.config['server']['port']
         self.current_host_index = 0
+        # Всички хостове се състезават при свързване; следващият тръгва след това забавяне или при грешка
+        self.connect_stagger = self.config['server'].get('connect_stagger_ms', 250) / 1000
         
-        # Network
-        self.session = None
+        # Мрежа - една pooled HTTP сесия за status, login, logout, статистики и WebSocket
+        self.http = HttpSessionManager(self.config['server'].get('http'))
         self.ws = None
         self.ws_task = None
         self.reconnect_attempts = 0
@@ -580,6 +590,17 @@ class EnhancedNetCafeClient:
         self.security_update_timer = QTimer()
         self.security_update_timer.timeout.connect(self._update_security_status)
         
+        # Security warnings are posted by the monitor threads and shown from here
+        alerts = self.config.get('security', {}).get('security_alerts', {})
+        self.show_process_warnings = alerts.get('show_process_warnings', True)
+        self.alert_duration = alerts.get('alert_duration', 5000)
+        self.notifications = get_notification_queue()
+        self.notifications.configure(min_interval=self.alert_duration / 1000)
+        self.notification_timer = QTimer()
+        self.notification_timer.timeout.connect(self._show_pending_notifications)
+        self.stats_upload_timer = QTimer()
+        self.stats_upload_timer.timeout.connect(self._upload_block_stats)
+        
         # Notifications
         self._notified_5min = False
         self._notified_1min = False
@@ -595,13 +616,17 @@ class EnhancedNetCafeClient:
         self.set_status('🔒 Security Active - Initializing...', False)
         
         # Start security status updates
-        self.security_update_timer.start(5000)  # Update every 5 seconds
+        self.security_update_timer.start(int(self.performance.get('status_update_interval', 5) * 1000))
+        self.notification_timer.start(250)
+        self.stats_upload_timer.start(60000)  # Block events -> server every minute
     
     def _load_config(self):
-        """Зарежда конфигурацията"""
+        """Зарежда конфигурацията (config.json, допълнена от config_enhanced.json)"""
         try:
             with open('config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
+                config = json.load(f)
+            self._merge_enhanced_config(config)
+            return config
         except Exception as e:
             logger.warning(f"Failed to load config.json: {e}, using defaults")
             return {
@@ -620,6 +645,24 @@ class EnhancedNetCafeClient:
                 }
             }
     
+    def _merge_enhanced_config(self, config):
+        """Добавя липсващите секции/ключове от config_enhanced.json (config.json има предимство)"""
+        try:
+            with open('config_enhanced.json', 'r', encoding='utf-8') as f:
+                enhanced = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Failed to load config_enhanced.json: {e}")
+            return
+        
+        for section, values in enhanced.items():
+            if section not in config:
+                config[section] = values
+            elif isinstance(values, dict) and isinstance(config[section], dict):
+                for key, value in values.items():
+                    config[section].setdefault(key, value)
+    
     def _get_computer_id(self):
         """Генерира уникален computer ID"""
         try:
@@ -693,6 +736,10 @@ class EnhancedNetCafeClient:
             show_security_action.triggered.connect(self._toggle_security_widget)
             menu.addAction(show_security_action)
             
+            stats_action = QAction('📊 Block Statistics')
+            stats_action.triggered.connect(self._show_block_stats)
+            menu.addAction(stats_action)
+            
             reconnect_action = QAction('🔄 Reconnect')
             reconnect_action.triggered.connect(self._manual_reconnect)
             menu.addAction(reconnect_action)
@@ -711,6 +758,40 @@ class EnhancedNetCafeClient:
         except Exception as e:
             logger.error(f"Failed to initialize tray: {e}")
     
+    def _show_pending_notifications(self):
+        """Shows the next queued security warning as a tray toast (Qt thread)"""
+        try:
+            notice = self.notifications.next_notice()
+            if notice and self.show_process_warnings:
+                self.tray.showMessage(notice.title, notice.text, QSystemTrayIcon.Warning, self.alert_duration)
+        except Exception as e:
+            logger.error(f"Failed to show security notification: {e}")
+    
+    def _show_block_stats(self):
+        """Показва броя блокирания и латентностите за откриване/спиране"""
+        self.tray.showMessage('📊 Block Statistics',
+                              f"{get_block_stats().format_summary()}\n{self.http.format_summary()}",
+                              QSystemTrayIcon.Information, 5000)
+    
+    def _upload_block_stats(self):
+        """Изпраща неизпратените block събития към сървъра"""
+        if self.ws is not None and not self.ws.closed:
+            asyncio.create_task(upload_block_stats(
+                self.http, self._get_current_server_url(), self.computer_id, get_block_stats(),
+                extra={'http_pool': self.http.pool_stats()}
+            ))
+    
+    def _reload_config(self):
+        """Презарежда конфигурацията; политиките за процеси и клавиатура се сменят
+        без рестарт на мониторинга и без преинсталиране на hook-а"""
+        config = self._load_config()
+        security = config.get('security', {})
+        if self.security_manager.apply_policies(security):
+            self.config = config
+            self.performance = config.get('performance', {})
+            self.security_manager.apply_performance_settings(self.performance)
+            logger.info("🔄 Configuration reloaded")
+    
     def _toggle_security_widget(self):
         """Показва/скрива security status widget"""
         if self.security_widget.isVisible():
@@ -749,10 +830,12 @@ class EnhancedNetCafeClient:
         self.lock_screen.show_lock()
         if not self.security_manager.security_active:
             self._activate_security_mode()
+        self.security_manager.set_lock_screen(True)
     
     def _hide_lock_screen(self):
         """Скрива заключващия екран"""
         self.lock_screen.hide_lock()
+        self.security_manager.set_lock_screen(False)
     
     def _show_overlay(self):
         """Показва timer overlay и security widget"""
@@ -794,9 +877,13 @@ class EnhancedNetCafeClient:
             self.session_timer.stop()
             self.reconnect_timer.stop()
             self.security_update_timer.stop()
+            self.notification_timer.stop()
+            self.stats_upload_timer.stop()
             
             # Деактивиране на сигурността
             self._deactivate_security_mode()
+            if self.enforcement:
+                self.enforcement.stop()
             
             # Async cleanup
             try:
@@ -805,8 +892,8 @@ class EnhancedNetCafeClient:
                     if self.ws_task and not self.ws_task.done():
                         self.ws_task.cancel()
                     
-                    if self.session and not self.session.closed:
-                        loop.create_task(self.session.close())
+                    if not self.http.closed:
+                        loop.create_task(self.http.close())
             except RuntimeError:
                 logger.info("Event loop not running, skipping async cleanup")
             
@@ -818,25 +905,22 @@ class EnhancedNetCafeClient:
     async def connect_to_server(self):
         """Свързване към сървъра"""
         try:
-            server_url = self._get_current_server_url()
-            logger.info(f"Connecting to server: {server_url}")
+            hosts = ordered_hosts(self.server_hosts, self.current_host_index)
+            logger.info(f"Connecting to server: racing {', '.join(hosts)} on port {self.server_port}")
             self.set_status('🔄 Connecting to server...', False)
             
-            # Create session if needed
-            if not self.session or self.session.closed:
-                self.session = aiohttp.ClientSession()
+            # Status + WebSocket handshake към всички хостове, разместени във времето; първият печели
+            result = await race_hosts(self.http, hosts, self.server_port, self.computer_id,
+                                      stagger=self.connect_stagger,
+                                      ws_path=self.config['server'].get('websocket_endpoint', '/ws'))
+            self.current_host_index = self.server_hosts.index(result.host)
+            self.ws = result.ws
+            self.ws_task = asyncio.create_task(self._handle_ws_messages())
             
-            # Test connection
-            async with self.session.get(f"{server_url}/api/status") as resp:
-                if resp.status == 200:
-                    logger.info("✅ Server connection established")
-                    self.set_status('🟢 Connected to server', True)
-                    
-                    # Connect WebSocket
-                    await self._connect_websocket()
-                    return True
-                else:
-                    raise aiohttp.ClientError(f"Server returned status {resp.status}")
+            logger.info(f"✅ Server connection established: {result.url}")
+            self.set_status('🟢 Connected to server', True)
+            self.reconnect_attempts = 0
+            return True
         
         except Exception as e:
             logger.error(f"Connection error: {e}")
@@ -851,27 +935,14 @@ class EnhancedNetCafeClient:
             
             return False
     
-    async def _connect_websocket(self):
-        """Свързване на WebSocket"""
-        try:
-            server_url = self._get_current_server_url()
-            ws_url = server_url.replace('http', 'ws') + f"/ws?computer_id={self.computer_id}"
-            
-            self.ws = await websockets.connect(ws_url)
-            self.ws_task = asyncio.create_task(self._handle_ws_messages())
-            
-            logger.info("✅ WebSocket connected")
-            self.reconnect_attempts = 0
-            
-        except Exception as e:
-            logger.error(f"WebSocket connection error: {e}")
-    
     async def _handle_ws_messages(self):
         """Обработва WebSocket съобщения"""
         try:
             async for message in self.ws:
-                data = json.loads(message)
-                await self._process_ws_message(data)
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    await self._process_ws_message(json.loads(message.data))
+                elif message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.ERROR):
+                    break
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
             if not self.ws.closed:
@@ -892,6 +963,12 @@ class EnhancedNetCafeClient:
             elif msg_type == 'security_alert':
                 self._handle_security_alert(data.get('message', 'Security alert'))
             
+            elif msg_type == 'request_security_stats':
+                self._upload_block_stats()
+            
+            elif msg_type == 'config_updated':
+                self._reload_config()
+            
         except Exception as e:
             logger.error(f"Error processing WebSocket message: {e}")
     
@@ -933,7 +1010,7 @@ class EnhancedNetCafeClient:
                 'computer_id': self.computer_id
             }
             
-            async with self.session.post(f"{server_url}/api/login", json=auth_data) as resp:
+            async with self.http.post(f"{server_url}/api/login", json=auth_data) as resp:
                 if resp.status == 200:
                     result = await resp.json()
                     
@@ -998,9 +1075,9 @@ class EnhancedNetCafeClient:
             self._show_lock_screen()
             
             # Notify server
-            if self.session and not self.session.closed:
-                server_url = self._get_current_server_url()
-                await self.session.post(f"{server_url}/api/logout", json={'computer_id': self.computer_id})
+            server_url = self._get_current_server_url()
+            async with self.http.post(f"{server_url}/api/logout", json={'computer_id': self.computer_id}):
+                pass
             
             self.set_status('🔒 Session Ended - Security Active', False)
             logger.info("✅ Gaming session ended successfully")
@@ -1111,7 +1188,7 @@ class EnhancedNetCafeClient:
             # Show login when connected
             async def show_login_when_ready():
                 # Wait for connection
-                while not hasattr(self, 'session') or not self.session or self.session.closed:
+                while self.http.closed:
                     await asyncio.sleep(1)
                 
                 # Show login dialog
@@ -1124,7 +1201,11 @@ class EnhancedNetCafeClient:
             
             # Run the Qt event loop
             with self.loop:
-                self.loop.run_forever()
+                try:
+                    self.loop.run_forever()
+                finally:
+                    # Затваря pooled връзките, докато loop-ът още може да го изпълни
+                    self.loop.run_until_complete(self.http.close())
                 
         except Exception as e:
             logger.error(f"Application error: {e}")
@@ -9,6 +9,7 @@ import uuid
 import traceback
 import ctypes
 import threading
+import time
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QSystemTrayIcon, 
@@ -18,9 +19,18 @@ from PySide6.QtCore import Qt, QTimer, Signal, Slot
 from PySide6.QtGui import QIcon, QAction, QPixmap, QPainter
 import qasync
 import aiohttp
-import win32con
 import win32api
-import win32gui
+
+from process_matcher import NameMatcher
+from process_sweep import get_sweep_service
+from process_snapshot import fetch_attrs
+from window_snapshot import get_window_snapshot
+from enforcement_worker import create_enforcement_supervisor
+from block_stats import get_block_stats
+from process_terminator import get_termination_engine
+from window_events import (
+    WindowWatcher, create_window_event_source, classify_window, FOLDER_WINDOW_CLASSES, DIALOG_CLASS
+)
 
 # Configure logging
 logging.basicConfig(
@@ -176,7 +186,11 @@ class AntiTaskManagerBlocker:
         ]
         self.monitoring = False
         self.monitor_thread = None
+        self.sweep_service = None
+        self.blocked_matcher = None
         self.explorer_windows = set()  # Track File Explorer windows
+        self.window_snapshot = get_window_snapshot()
+        self.window_watcher = None
         
     def start_monitoring(self):
         """Start monitoring for blocked processes"""
@@ -185,73 +199,102 @@ class AntiTaskManagerBlocker:
             
         logger.info("🛡️ Starting anti-Task Manager monitoring + File Explorer blocking")
         self.monitoring = True
+        self.blocked_matcher = NameMatcher(self.blocked_processes)
+        
+        # Process checks ride on the shared sweep (no extra process walk or thread)
+        self.sweep_service = get_sweep_service()
+        # Only names are read for every process; cmdline only for explorer.exe (fetch_attrs)
+        self.sweep_service.subscribe('anti_task_manager', self._on_sweep, attrs=['name'])
+        
+        # Windows are closed as soon as they are shown; windows already open are handled once.
+        # If the hooks cannot be set, the source falls back to enumerating at the sweep interval
+        source = create_window_event_source(self.sweep_service.interval, self.window_snapshot.backend)
+        if source:
+            self.window_watcher = WindowWatcher(source, self.window_snapshot.backend, on_close=self._on_window_closed)
+            self.window_watcher.start()
+            self._close_explorer_windows()
+            return
         
-        def monitor_processes():
-            import psutil
+        def monitor_windows():
             import time
             while self.monitoring:
-                try:
-                    # Monitor blocked processes
-                    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                        try:
-                            proc_name = proc.info['name'].lower()
-                            
-                            # Block standard system utilities
-                            if proc_name in self.blocked_processes:
-                                logger.warning(f"🚫 Terminating blocked process: {proc.info['name']}")
-                                proc.terminate()
-                                continue
-                            
-                            # Special handling for File Explorer windows
-                            if proc_name == 'explorer.exe':
-                                cmdline = proc.info.get('cmdline', [])
-                                if cmdline and len(cmdline) > 1:
-                                    # This is a File Explorer window, not the desktop shell
-                                    # Desktop shell usually has no command line arguments
-                                    if any(arg for arg in cmdline[1:] if arg and not arg.startswith('/desktop')):
-                                        logger.warning(f"🚫 Terminating File Explorer window: PID {proc.info['pid']}")
-                                        proc.terminate()
-                                        
-                        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                            continue
-                        except Exception as e:
-                            logger.debug(f"Process check error: {e}")
-                            continue
-                    
-                    # Also close File Explorer windows by window title
-                    self._close_explorer_windows()
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error in process monitoring: {e}")
+                # Close File Explorer windows by window title
+                self._close_explorer_windows()
                 
-                # Check every 1 second for faster response
-                time.sleep(1)
+                # Same adaptive interval as the process sweep (fast after a block)
+                time.sleep(self.sweep_service.interval)
         
-        self.monitor_thread = threading.Thread(target=monitor_processes, daemon=True)
+        self.monitor_thread = threading.Thread(target=monitor_windows, daemon=True)
         self.monitor_thread.start()
     
+    def _on_window_closed(self, window, reason, latency):
+        """Called by the window watcher after it closed a blocked window"""
+        logger.debug(f"🚫 Closed {reason}: {window.title}")
+        get_block_stats().record('window_watcher', reason, window.pid, window.title, kill_ms=latency * 1000)
+        self.sweep_service.note_block()
+    
+    def _on_sweep(self, result):
+        """Check the processes that appeared since the last shared sweep"""
+        import psutil
+        if not self.monitoring:
+            return
+        
+        engine = get_termination_engine()
+        for entry in result.new:
+            proc, info = entry.proc, entry.info
+            try:
+                proc_name = (info.get('name') or '').lower()
+                detected_at = time.time()
+                on_done = lambda outcome, proc_name=proc_name: self._record_block(outcome, proc_name)
+                
+                # Block standard system utilities
+                rule = self.blocked_matcher.match(proc_name)
+                if rule:
+                    if engine.submit(proc, rule, 'anti_task_manager', detected_at, on_done):
+                        logger.warning(f"🚫 Terminating blocked process: {info['name']}")
+                    continue
+                
+                # Special handling for File Explorer windows
+                if proc_name == 'explorer.exe':
+                    cmdline = fetch_attrs(entry, 'cmdline').get('cmdline') or []
+                    if cmdline and len(cmdline) > 1:
+                        # This is a File Explorer window, not the desktop shell
+                        # Desktop shell usually has no command line arguments
+                        if any(arg for arg in cmdline[1:] if arg and not arg.startswith('/desktop')):
+                            if engine.submit(proc, 'explorer.exe window', 'anti_task_manager', detected_at, on_done):
+                                logger.warning(f"🚫 Terminating File Explorer window: PID {info['pid']}")
+                            
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            except Exception as e:
+                logger.debug(f"Process check error: {e}")
+                continue
+        
+        # Every kill from this sweep is issued at once; the engine waits for them off this thread
+        engine.flush()
+    
+    def _record_block(self, result, proc_name):
+        """Called by the termination engine once a blocked process is gone (or survived kill)"""
+        if result.survived:
+            # The sweep hands it back until it exits; the engine retries after its cooldown
+            self.sweep_service.recheck(result.pid)
+            return
+        get_block_stats().record('anti_task_manager', result.rule, result.pid, proc_name, result.started_at,
+                                 result.detected_at, result.killed_at)
+        self.sweep_service.note_block()
+    
     def _close_explorer_windows(self):
         """Close File Explorer windows by finding and closing them"""
         try:
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    window_title = win32gui.GetWindowText(hwnd)
-                    class_name = win32gui.GetClassName(hwnd)
-                    
-                    # File Explorer windows have class name "CabinetWClass" or "ExploreWClass"
-                    if class_name in ['CabinetWClass', 'ExploreWClass']:
-                        logger.debug(f"🚫 Closing File Explorer window: {window_title}")
-                        win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
-                    
-                    # Also close "Open" and "Save As" dialogs
-                    elif class_name == '#32770':  # Dialog box class
-                        if any(keyword in window_title.lower() for keyword in ['open', 'save', 'browse', 'select']):
-                            logger.debug(f"🚫 Closing file dialog: {window_title}")
-                            win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
-                
-                return True
+            # One enumeration per cycle; the class index avoids scanning every window
+            self.window_snapshot.refresh(max_age=0.5)
             
-            win32gui.EnumWindows(enum_windows_callback, None)
+            # File Explorer windows ("CabinetWClass"/"ExploreWClass") and Open/Save dialogs ("#32770")
+            for window in self.window_snapshot.of_class(*FOLDER_WINDOW_CLASSES, DIALOG_CLASS):
+                reason = classify_window(window)
+                if reason:
+                    logger.debug(f"🚫 Closing {reason}: {window.title}")
+                    self.window_snapshot.close(window)
             
         except Exception as e:
             logger.debug(f"Error closing explorer windows: {e}")
@@ -259,6 +302,11 @@ class AntiTaskManagerBlocker:
     def stop_monitoring(self):
         """Stop process monitoring"""
         self.monitoring = False
+        if self.window_watcher:
+            self.window_watcher.stop()
+            self.window_watcher = None
+        if self.sweep_service:
+            self.sweep_service.unsubscribe('anti_task_manager')
         logger.info("🔓 Stopped anti-Task Manager monitoring")
 
 class TimerOverlay(QWidget):
@@ -627,9 +675,18 @@ class NetCafeSecureClient:
         self.app = QApplication.instance() or QApplication(sys.argv)
         self.app.setQuitOnLastWindowClosed(False)
         
+        # Configuration (needed to decide where the monitors run)
+        self.config = self._load_config()
+        get_sweep_service().configure(self.config.get('performance', {}))
+        
         # Security components
         self.keyboard_blocker = SecureKeyboardBlocker()
-        self.task_manager_blocker = AntiTaskManagerBlocker()
+        # Process/window monitoring runs in the enforcement worker when performance.enforcement_worker is on
+        self.enforcement = create_enforcement_supervisor(self.config.get('performance', {}))
+        if self.enforcement:
+            self.task_manager_blocker = self.enforcement.monitor('anti_task_manager')
+        else:
+            self.task_manager_blocker = AntiTaskManagerBlocker()
         
         # UI components
         self.lock_screen = LockScreen()
@@ -637,7 +694,6 @@ class NetCafeSecureClient:
         self.tray_icon = None
         
         # Session data
-        self.config = self._load_config()
         self.computer_id = self._get_computer_id()
         self.session = None
         self.ws_session = None
@@ -745,10 +801,16 @@ class NetCafeSecureClient:
         self.lock_screen.show_lock()
         self.lock_screen.raise_()
         self.lock_screen.activateWindow()
+        get_sweep_service().set_locked(True)
+        if self.enforcement:
+            self.enforcement.set_locked(True)
     
     def _hide_lock_screen(self):
         """Hide the lock screen"""
         self.lock_screen.hide_lock()
+        get_sweep_service().set_locked(False)
+        if self.enforcement:
+            self.enforcement.set_locked(False)
     
     def _show_overlay(self):
         """Show the timer overlay"""
@@ -808,6 +870,8 @@ class NetCafeSecureClient:
             # Disable security restrictions
             self.keyboard_blocker.uninstall()
             self.task_manager_blocker.stop_monitoring()
+            if self.enforcement:
+                self.enforcement.stop()
             
             # Close sessions
             if self.session_timer:
@@ -0,0 +1,337 @@
+"""
+Process start/exit event sources for the NetCafe blockers.
+
+Blockers register a callback and get a ProcessEvent as soon as the OS reports
+a new process, instead of walking the whole process table on a timer.
+
+Backends (best first):
+  - WmiProcessSource: Win32_ProcessStartTrace / Win32_ProcessStopTrace (ETW
+    kernel trace, needs admin) - used in production
+  - ProcConnectorSource: Linux netlink proc connector (needs root) - used on
+    development and test boxes
+  - PollingProcessSource: psutil polling fallback (shared sweep service),
+    works everywhere
+
+A native source whose worker dies while running (no admin rights, WMI
+service down, netlink receive error such as ENOBUFS in a spawn storm)
+fails over to polling on its own, so a blocker is never left without
+process events. The polling subscription's first sweep reports every live
+process, which covers whatever started while the native source was down.
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import logging
+import threading
+from collections import namedtuple
+
+from process_sweep import get_sweep_service
+
+logger = logging.getLogger(__name__)
+
+# kind is 'start' or 'exit'; ppid and name are None when the backend does
+# not report them; timestamp is time.monotonic() when the event was received
+ProcessEvent = namedtuple('ProcessEvent', ['kind', 'pid', 'ppid', 'name', 'timestamp'])
+
+
+class ProcessEventSource:
+    """Base class for process event backends
+
+    Backends with a worker thread implement _run(); it is started by
+    start() and calls _fail_over() if the backend dies.
+    """
+
+    name = 'base'
+
+    def __init__(self, poll_interval=2.0):
+        self.running = False
+        self.thread = None
+        self.callback = None
+        self.poll_interval = poll_interval  # used if the backend fails over to polling
+        self.fallback = None
+        self._fallback_lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        """Return True if this backend can run on the current machine"""
+        return False
+
+    def start(self, callback):
+        """Start delivering ProcessEvent objects to callback (on a worker thread)"""
+        if self.running:
+            return
+        self.callback = callback
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"📡 Process event source started ({self.name})")
+
+    def stop(self):
+        """Stop delivering events"""
+        self.running = False
+        with self._fallback_lock:
+            fallback, self.fallback = self.fallback, None
+        if fallback:
+            fallback.stop()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        logger.info(f"📡 Process event source stopped ({self.name})")
+
+    @property
+    def failed(self):
+        """True once the backend died and events come from the polling fallback"""
+        return self.fallback is not None
+
+    def _fail_over(self, error):
+        """Called by a worker thread whose backend died: deliver events by polling from now on"""
+        with self._fallback_lock:
+            if not self.running or self.fallback is not None:
+                return
+            logger.error(f"📡 Process event source {self.name} failed ({error}) - falling back to polling")
+            self.fallback = PollingProcessSource(interval=self.poll_interval)
+            self.fallback.start(self.callback)
+
+    def _emit(self, kind, pid, ppid=None, name=None):
+        try:
+            self.callback(ProcessEvent(kind, pid, ppid, name, time.monotonic()))
+        except Exception as e:
+            logger.error(f"Process event callback error: {e}")
+
+
+class PollingProcessSource(ProcessEventSource):
+    """Fallback backend: diffs the shared process sweep every `interval` seconds"""
+
+    name = 'polling'
+
+    def __init__(self, interval=2.0, service=None):
+        super().__init__(interval)
+        self.interval = interval
+        self.service = service
+        self.subscription = f'polling_events_{id(self)}'
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def start(self, callback):
+        # No thread of our own - piggyback on the shared sweep service
+        if self.running:
+            return
+        self.callback = callback
+        self.running = True
+        if self.service is None:
+            self.service = get_sweep_service()
+        self.service.subscribe(self.subscription, self._on_sweep,
+                               attrs=['ppid', 'name'], interval=self.interval)
+        logger.info(f"📡 Process event source started ({self.name})")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.service.unsubscribe(self.subscription)
+        logger.info(f"📡 Process event source stopped ({self.name})")
+
+    def _on_sweep(self, result):
+        if not self.running:
+            return
+        for entry in result.new:
+            self._emit('start', entry.info['pid'], entry.info.get('ppid'), entry.info.get('name'))
+        for entry in result.exited:
+            self._emit('exit', entry.info['pid'], entry.info.get('ppid'), entry.info.get('name'))
+
+
+class ProcConnectorSource(ProcessEventSource):
+    """Linux backend: kernel proc connector over NETLINK_CONNECTOR (root only)"""
+
+    name = 'proc_connector'
+
+    NETLINK_CONNECTOR = 11
+    CN_IDX_PROC = 1
+    CN_VAL_PROC = 1
+    PROC_CN_MCAST_LISTEN = 1
+    PROC_CN_MCAST_IGNORE = 2
+    NLMSG_DONE = 3
+
+    PROC_EVENT_FORK = 0x00000001
+    PROC_EVENT_EXEC = 0x00000002
+    PROC_EVENT_EXIT = 0x80000000
+
+    # struct nlmsghdr + struct cn_msg, then struct proc_event
+    NLMSG_HEADER = struct.Struct('=IHHII')
+    CN_MSG_HEADER = struct.Struct('=IIIIHH')
+    PROC_EVENT_HEADER = struct.Struct('=IIQ')
+    PIDS = struct.Struct('=II')
+    FORK_PIDS = struct.Struct('=IIII')
+
+    def __init__(self, poll_interval=2.0):
+        super().__init__(poll_interval)
+        self.sock = None
+
+    @classmethod
+    def available(cls):
+        if not sys.platform.startswith('linux') or not hasattr(socket, 'AF_NETLINK'):
+            return False
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, cls.NETLINK_CONNECTOR)
+            try:
+                sock.bind((0, cls.CN_IDX_PROC))
+            finally:
+                sock.close()
+            return True
+        except OSError:
+            return False
+
+    def start(self, callback):
+        if self.running:
+            return
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self.NETLINK_CONNECTOR)
+        self.sock.bind((0, self.CN_IDX_PROC))
+        # Wake up recv() regularly so stop() is honoured without a busy loop
+        self.sock.settimeout(0.5)
+        self._send_control(self.PROC_CN_MCAST_LISTEN)
+        super().start(callback)
+
+    def stop(self):
+        self.running = False
+        if self.sock:
+            try:
+                self._send_control(self.PROC_CN_MCAST_IGNORE)
+            except OSError:
+                pass
+        super().stop()
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def _send_control(self, op):
+        payload = struct.pack('=I', op)
+        cn_msg = self.CN_MSG_HEADER.pack(self.CN_IDX_PROC, self.CN_VAL_PROC, 0, 0, len(payload), 0)
+        length = self.NLMSG_HEADER.size + len(cn_msg) + len(payload)
+        header = self.NLMSG_HEADER.pack(length, self.NLMSG_DONE, 0, 0, os.getpid())
+        self.sock.send(header + cn_msg + payload)
+
+    def _run(self):
+        offset = self.NLMSG_HEADER.size + self.CN_MSG_HEADER.size
+        body = offset + self.PROC_EVENT_HEADER.size
+        parents = {}
+
+        while self.running:
+            try:
+                data = self.sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                # ENOBUFS means events were dropped - the socket can't tell which, polling can
+                if self.running:
+                    self._fail_over(f"receive error: {e}")
+                break
+
+            if len(data) < body:
+                continue
+
+            what, _cpu, _ts = self.PROC_EVENT_HEADER.unpack_from(data, offset)
+
+            if what == self.PROC_EVENT_EXEC:
+                # A process is reported once it has loaded its image, which
+                # is when its name becomes meaningful for the blockers
+                pid, tgid = self.PIDS.unpack_from(data, body)
+                if pid == tgid:
+                    self._emit('start', pid, parents.get(pid))
+            elif what == self.PROC_EVENT_FORK:
+                # Threads are reported as forks too - only track new processes
+                _parent_pid, parent_tgid, child_pid, child_tgid = self.FORK_PIDS.unpack_from(data, body)
+                if child_pid == child_tgid:
+                    parents[child_tgid] = parent_tgid
+            elif what == self.PROC_EVENT_EXIT:
+                pid, tgid = self.PIDS.unpack_from(data, body)
+                if pid == tgid:
+                    self._emit('exit', pid, parents.pop(pid, None))
+
+
+class WmiProcessSource(ProcessEventSource):
+    """Windows backend: WMI process start/stop traces (ETW backed, admin only)"""
+
+    name = 'wmi'
+
+    @classmethod
+    def available(cls):
+        if sys.platform != 'win32':
+            return False
+        try:
+            import wmi  # noqa: F401
+            import pythoncom  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def start(self, callback):
+        if self.running:
+            return
+        super().start(callback)
+        # Stop traces get their own watcher thread so starts are never delayed
+        self.exit_thread = threading.Thread(target=self._run_exits, daemon=True)
+        self.exit_thread.start()
+
+    def stop(self):
+        super().stop()
+        exit_thread = getattr(self, 'exit_thread', None)
+        if exit_thread:
+            exit_thread.join(timeout=2)
+            self.exit_thread = None
+
+    def _watch(self, wql, kind):
+        import pythoncom
+        import wmi
+
+        pythoncom.CoInitialize()
+        try:
+            watcher = wmi.WMI().watch_for(raw_wql=wql)
+            while self.running and not self.failed:
+                try:
+                    event = watcher(timeout_ms=500)
+                except wmi.x_wmi_timed_out:
+                    continue
+                self._emit(kind, int(event.ProcessID), int(event.ParentProcessID), event.ProcessName)
+        except Exception as e:
+            # No admin rights, WMI service stopped or restarted: both watchers hand over to polling
+            self._fail_over(f"{kind} watcher: {e}")
+        finally:
+            pythoncom.CoUninitialize()
+
+    def _run(self):
+        self._watch('SELECT * FROM Win32_ProcessStartTrace', 'start')
+
+    def _run_exits(self):
+        self._watch('SELECT * FROM Win32_ProcessStopTrace', 'exit')
+
+
+BACKENDS = {
+    'wmi': WmiProcessSource,
+    'proc_connector': ProcConnectorSource,
+    'polling': PollingProcessSource,
+}
+
+
+def create_process_event_source(preferred=None, poll_interval=2.0):
+    """Return the best available process event source
+
+    preferred: backend name from BACKENDS to try first ('polling' forces the fallback)
+    poll_interval: sweep interval used if we fall back to polling
+    """
+    order = ['wmi', 'proc_connector']
+    if preferred:
+        order = [preferred] + [name for name in order if name != preferred]
+
+    for name in order:
+        backend = BACKENDS.get(name)
+        if backend is None or backend is PollingProcessSource:
+            break
+        if backend.available():
+            return backend(poll_interval=poll_interval)
+
+    return PollingProcessSource(interval=poll_interval)
@@ -0,0 +1,107 @@
+"""
+Compiled process-name matcher shared by the NetCafe blockers.
+
+Patterns are compiled once into:
+  - a hashed set of exact names        ('taskmgr.exe')
+  - a reversed trie of suffixes         ('*helper.exe')
+  - a trie of the literal prefixes of other globs ('vmware*.exe',
+    'procexp??.exe'), so only globs whose prefix the name starts with are
+    tried, plus one combined regex for globs that start with a wildcard
+
+so a lookup costs O(len(name)) no matter how many patterns there are.
+Matching is case-insensitive and whole-name: 'agent.exe' no longer matches
+'useragent.exe' like the old substring checks did.
+"""
+
+import re
+import fnmatch
+
+GLOB_CHARS = '*?['
+
+
+class NameMatcher:
+    """Matches process names against exact, suffix and glob patterns"""
+
+    def __init__(self, patterns=()):
+        self.patterns = []
+        self.exact = {}
+        self.suffixes = {}  # reversed trie: char -> node, node[None] = pattern
+        self.glob_prefixes = {}  # trie of literal prefixes: node[None] = [(pattern, regex)]
+        self.glob_patterns = []  # globs starting with a wildcard
+        self.glob_regex = None
+
+        for pattern in patterns:
+            self._add(pattern)
+
+        if self.glob_patterns:
+            alternatives = [f'(?P<g{i}>{fnmatch.translate(p)})' for i, p in enumerate(self.glob_patterns)]
+            self.glob_regex = re.compile('|'.join(alternatives))
+
+    def _add(self, pattern):
+        pattern = pattern.lower()
+        self.patterns.append(pattern)
+
+        rest = pattern[1:]
+        if not any(c in pattern for c in GLOB_CHARS):
+            self.exact[pattern] = pattern
+        elif pattern.startswith('*') and not any(c in rest for c in GLOB_CHARS):
+            node = self.suffixes
+            for char in reversed(rest):
+                node = node.setdefault(char, {})
+            node[None] = pattern
+        elif pattern[0] in GLOB_CHARS:
+            self.glob_patterns.append(pattern)
+        else:
+            node = self.glob_prefixes
+            for char in pattern:
+                if char in GLOB_CHARS:
+                    break
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append((pattern, re.compile(fnmatch.translate(pattern))))
+
+    def match(self, name):
+        """Return the pattern that matches name, or None"""
+        if not name:
+            return None
+        name = name.lower()
+
+        pattern = self.exact.get(name)
+        if pattern is not None:
+            return pattern
+
+        if self.suffixes:
+            # Walk the name backwards, remembering the longest suffix that ends here;
+            # the root holds '*' (empty suffix), which matches every name
+            node = self.suffixes
+            pattern = node.get(None)
+            for char in reversed(name):
+                node = node.get(char)
+                if node is None:
+                    break
+                if None in node:
+                    pattern = node[None]
+            if pattern is not None:
+                return pattern
+
+        if self.glob_prefixes:
+            node = self.glob_prefixes
+            for char in name:
+                node = node.get(char)
+                if node is None:
+                    break
+                for pattern, regex in node.get(None, ()):
+                    if regex.match(name):
+                        return pattern
+
+        if self.glob_regex is not None:
+            m = self.glob_regex.fullmatch(name)
+            if m:
+                return self.glob_patterns[int(m.lastgroup[1:])]
+
+        return None
+
+    def __contains__(self, name):
+        return self.match(name) is not None
+
+    def __len__(self):
+        return len(self.patterns)
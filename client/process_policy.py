@@ -0,0 +1,204 @@
+"""
+Declarative process policy for the NetCafe blockers.
+
+The `security` section of the config decides what gets blocked:
+
+  - `process_restrictions` flags switch whole categories on and off
+    (block_task_manager, block_powershell, block_browsers_admin, ...)
+  - `process_profiles[<process_profile>]` adds per-profile lists:
+    `block` / `allow` name patterns and `block_hashes` (sha256 -> rule);
+    `detect_renamed_tools: true` also hashes the exact-named system tools
+    so renamed copies are caught - off by default, since it needs the exe
+    path of every process that no name rule blocks
+
+compile_process_policy() turns that into an immutable ProcessPolicy: the
+block and allow patterns are compiled into NameMatchers (exact-name dict,
+reversed suffix trie, one glob regex) and the hashes into a frozen
+mapping. A reload compiles a new policy and the monitor swaps its
+reference in one assignment - the sweep thread keeps running and every
+sweep sees either the old tables or the new ones, never a mix.
+"""
+
+import re
+import time
+import logging
+import itertools
+from types import MappingProxyType
+
+from process_matcher import NameMatcher
+
+logger = logging.getLogger(__name__)
+
+# flag -> (default, {process name: label})
+CATEGORIES = {
+    'block_task_manager': (True, {
+        'taskmgr.exe': 'Task Manager',
+        'procexp.exe': 'Process Explorer',
+        'procexp64.exe': 'Process Explorer',
+        'procmon.exe': 'Process Monitor',
+        'msconfig.exe': 'System Configuration',
+        'services.msc': 'Services',
+    }),
+    'block_registry_editor': (True, {
+        'regedit.exe': 'Registry Editor',
+        'regedt32.exe': 'Registry Editor',
+        'gpedit.msc': 'Group Policy Editor',
+    }),
+    'block_command_prompt': (True, {
+        'cmd.exe': 'Command Prompt',
+        'wsl.exe': 'Windows Subsystem for Linux',
+    }),
+    'block_powershell': (True, {
+        'powershell.exe': 'PowerShell',
+        'powershell_ise.exe': 'PowerShell ISE',
+        'pwsh.exe': 'PowerShell',
+    }),
+    'block_control_panel': (True, {
+        'control.exe': 'Control Panel',
+        'appwiz.cpl': 'Programs and Features',
+        'ncpa.cpl': 'Network Connections',
+        'firewall.cpl': 'Windows Firewall',
+    }),
+    'block_dev_tools': (True, {
+        'devenv.exe': 'Visual Studio',
+        'code.exe': 'Visual Studio Code',
+        'notepad++.exe': 'Notepad++',
+        'sublime_text.exe': 'Sublime Text',
+    }),
+    'block_file_explorer': (False, {
+        'explorer.exe': 'File Explorer',
+    }),
+    'block_browsers_admin': (False, {
+        'chrome.exe': 'Chrome',
+        'firefox.exe': 'Firefox',
+        'msedge.exe': 'Edge',
+    }),
+    'block_virtual_machines': (True, {
+        'vmware.exe': 'VMware',
+        'vmplayer.exe': 'VMware Player',
+        'virtualbox.exe': 'VirtualBox',
+    }),
+    'block_hacking_tools': (True, {
+        'wireshark.exe': 'Wireshark',
+        'nmap.exe': 'Nmap',
+        'metasploit.exe': 'Metasploit',
+        'burpsuite.exe': 'Burp Suite',
+    }),
+}
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+_versions = itertools.count(1)
+
+
+class ProcessPolicy:
+    """Compiled, read-only block/allow tables; never modified after compile"""
+
+    __slots__ = ('version', 'profile', 'blocked', 'allowed', 'labels', 'hash_rules',
+                 'system_tools', 'detect_renamed_tools', 'compile_ms', 'source')
+
+    def __init__(self, version, profile, blocked, allowed, labels, hash_rules, system_tools, compile_ms, source,
+                 detect_renamed_tools=False):
+        self.version = version
+        self.profile = profile
+        self.blocked = blocked
+        self.allowed = allowed
+        self.labels = labels
+        self.hash_rules = hash_rules
+        self.system_tools = system_tools
+        self.detect_renamed_tools = detect_renamed_tools  # the profile's opt-in, also read by FolderBlocker
+        self.compile_ms = compile_ms
+        self.source = source  # the `security` section it was compiled from (for the enforcement worker)
+
+    def match(self, name):
+        """Return the block rule for a process name, or None (allow lists win)"""
+        if not name or self.allowed.match(name):
+            return None
+        return self.blocked.match(name)
+
+    def label(self, rule):
+        """Human-readable name for a rule, e.g. 'taskmgr.exe' -> 'Task Manager'"""
+        return self.labels.get(rule, rule)
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'profile': self.profile,
+            'blocked': len(self.blocked),
+            'allowed': len(self.allowed),
+            'hashes': len(self.hash_rules),
+            'compile_ms': round(self.compile_ms, 3),
+        }
+
+
+def _name_list(profile_name, profile, key):
+    names = profile.get(key, [])
+    if not isinstance(names, list) or not all(isinstance(name, str) and name for name in names):
+        raise ValueError(f"process_profiles.{profile_name}.{key} must be a list of process names")
+    return [name.lower() for name in names]
+
+
+def compile_process_policy(security=None):
+    """Compile the `security` config section into a ProcessPolicy
+
+    Raises ValueError on a malformed section, so a bad reload can keep the
+    current policy instead of blocking nothing.
+    """
+    started = time.perf_counter()
+    security = security or {}
+    restrictions = security.get('process_restrictions', {})
+    profiles = security.get('process_profiles', {})
+    profile_name = security.get('process_profile', 'default')
+    if not isinstance(restrictions, dict) or not isinstance(profiles, dict):
+        raise ValueError("process_restrictions and process_profiles must be objects")
+    if profile_name not in profiles and profile_name != 'default':
+        raise ValueError(f"Unknown process profile: {profile_name}")
+    profile = profiles.get(profile_name, {})
+
+    for flag in restrictions:
+        if flag not in CATEGORIES:
+            logger.warning(f"⚠️ Unknown process restriction ignored: {flag}")
+
+    labels = {}
+    for flag, (default, names) in CATEGORIES.items():
+        if restrictions.get(flag, default):
+            labels.update(names)
+
+    for name in _name_list(profile_name, profile, 'block'):
+        labels.setdefault(name, name)
+    allow = _name_list(profile_name, profile, 'allow')
+
+    hashes = profile.get('block_hashes', {})
+    if not isinstance(hashes, dict):
+        raise ValueError(f"process_profiles.{profile_name}.block_hashes must map sha256 -> rule")
+    hash_rules = {}
+    for digest, rule in hashes.items():
+        digest = digest.lower()
+        if not SHA256_RE.match(digest):
+            raise ValueError(f"process_profiles.{profile_name}.block_hashes: bad sha256 {digest!r}")
+        hash_rules[digest] = rule
+        labels.setdefault(rule, rule)
+
+    try:
+        blocked, allowed = NameMatcher(labels), NameMatcher(allow)
+    except Exception as e:  # re.error from a broken glob
+        raise ValueError(f"Invalid process pattern: {e}")
+
+    # Renamed copies of exact-named system tools are caught by content hash (opt-in)
+    detect_renamed = profile.get('detect_renamed_tools', False)
+    if not isinstance(detect_renamed, bool):
+        raise ValueError(f"process_profiles.{profile_name}.detect_renamed_tools must be true or false")
+    system_tools = tuple(name for name in blocked.exact if not allowed.match(name)) if detect_renamed else ()
+
+    return ProcessPolicy(
+        version=next(_versions),
+        profile=profile_name,
+        blocked=blocked,
+        allowed=allowed,
+        labels=MappingProxyType(labels),
+        hash_rules=MappingProxyType(hash_rules),
+        system_tools=system_tools,
+        detect_renamed_tools=detect_renamed,
+        compile_ms=(time.perf_counter() - started) * 1000,
+        source=security,
+    )
@@ -0,0 +1,242 @@
+"""
+Incremental process-table snapshot for the NetCafe process monitors.
+
+A sweep lists the running PIDs and only inspects (name, exe, cmdline, ...)
+processes it has not classified before. Processes are remembered by
+(pid, start time) so a reused PID is treated as a new process. Start
+times come from one NtQuerySystemInformation call per sweep on Windows
+and from /proc/<pid>/stat on Linux, so a process that was seen before
+costs no psutil.Process and no handle.
+
+Sweeps read only the cheap attributes (name); expensive ones (cmdline reads
+the target's PEB or /proc/<pid>/cmdline, exe resolves the image path) are
+read with fetch_attrs() for the few processes whose name matched a rule
+that needs them.
+
+A blocker whose termination failed (access denied, survived kill) calls
+recheck(pid): the process is then reported in `new` again on every sweep
+until it exits, so blockers that only look at new processes keep retrying
+it like the old full sweeps did.
+"""
+
+import sys
+import ctypes
+import logging
+import threading
+from collections import namedtuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+if sys.platform.startswith('linux'):
+    def start_time(pid):
+        """Process start time in clock ticks, read straight from /proc/<pid>/stat
+
+        This is what psutil derives create_time() from, without building a
+        psutil.Process for every PID on every sweep.
+        """
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise psutil.NoSuchProcess(pid)
+        # Fields after the ')' closing the process name start at field 3 (state);
+        # starttime is field 22
+        return int(data[data.rindex(b')') + 2:].split(None, 20)[19])
+
+    def start_times():
+        """pid -> start time of every running process"""
+        times = {}
+        for pid in psutil.pids():
+            try:
+                times[pid] = start_time(pid)
+            except psutil.NoSuchProcess:
+                continue
+        return times
+else:
+    def start_time(pid):
+        """Process create time as reported by psutil"""
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.AccessDenied:
+            return None
+
+    def start_times():
+        """pid -> start time of every running process"""
+        times = {}
+        for pid in psutil.pids():
+            try:
+                times[pid] = start_time(pid)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+        return times
+
+if sys.platform == 'win32':
+    class _UNICODE_STRING(ctypes.Structure):
+        _fields_ = [('Length', ctypes.c_ushort), ('MaximumLength', ctypes.c_ushort), ('Buffer', ctypes.c_void_p)]
+
+    class _SYSTEM_PROCESS_INFORMATION(ctypes.Structure):
+        """Leading fields of SYSTEM_PROCESS_INFORMATION (winternl.h); entries are variable length"""
+        _fields_ = [
+            ('NextEntryOffset', ctypes.c_ulong),
+            ('NumberOfThreads', ctypes.c_ulong),
+            ('WorkingSetPrivateSize', ctypes.c_longlong),
+            ('HardFaultCount', ctypes.c_ulong),
+            ('NumberOfThreadsHighWatermark', ctypes.c_ulong),
+            ('CycleTime', ctypes.c_ulonglong),
+            ('CreateTime', ctypes.c_longlong),
+            ('UserTime', ctypes.c_longlong),
+            ('KernelTime', ctypes.c_longlong),
+            ('ImageName', _UNICODE_STRING),
+            ('BasePriority', ctypes.c_long),
+            ('UniqueProcessId', ctypes.c_void_p),
+        ]
+
+    _SYSTEM_PROCESS_INFORMATION_CLASS = 5
+    _STATUS_INFO_LENGTH_MISMATCH = -0x3FFFFFFC  # 0xC0000004 as NTSTATUS
+    _EPOCH_AS_FILETIME = 116444736000000000
+    _process_table_size = 256 * 1024
+
+    def start_times():
+        """pid -> create time of every running process from one NtQuerySystemInformation call
+
+        The same data psutil reads per process, for all of them at once
+        (seconds since the epoch, like create_time()).
+        """
+        global _process_table_size
+        ntdll = ctypes.windll.ntdll
+        needed = ctypes.c_ulong()
+        while True:
+            buffer = ctypes.create_string_buffer(_process_table_size)
+            status = ntdll.NtQuerySystemInformation(_SYSTEM_PROCESS_INFORMATION_CLASS, buffer,
+                                                    _process_table_size, ctypes.byref(needed))
+            if status != _STATUS_INFO_LENGTH_MISMATCH:
+                break
+            # The table grows between the calls while processes start - leave headroom
+            _process_table_size = max(_process_table_size * 2, needed.value + 64 * 1024)
+        if status != 0:
+            raise OSError(f"NtQuerySystemInformation failed: 0x{status & 0xFFFFFFFF:08X}")
+
+        times = {}
+        offset = 0
+        while True:
+            info = _SYSTEM_PROCESS_INFORMATION.from_buffer(buffer, offset)
+            times[info.UniqueProcessId or 0] = (info.CreateTime - _EPOCH_AS_FILETIME) / 10000000
+            if not info.NextEntryOffset:
+                return times
+            offset += info.NextEntryOffset
+
+
+# key is (pid, start_time); info is the psutil as_dict() of the requested
+# attrs; verdict is whatever the classify callback returned for info
+SnapshotEntry = namedtuple('SnapshotEntry', ['key', 'proc', 'info', 'verdict'])
+# new also holds processes passed to recheck() that are still alive
+SweepResult = namedtuple('SweepResult', ['new', 'exited'])
+
+# Attributes that cost a syscall per process beyond the stat read
+EXPENSIVE_ATTRS = frozenset({'cmdline', 'exe', 'environ', 'cwd', 'open_files', 'connections', 'username'})
+
+
+def fetch_attrs(entry, *attrs):
+    """Read attrs of an entry's process on demand and cache them in entry.info
+
+    Returns entry.info. Attributes already read (by the sweep or an earlier
+    fetch) are not read again; AccessDenied values become None. Raises
+    psutil.NoSuchProcess if the process is gone.
+    """
+    missing = [attr for attr in attrs if attr not in entry.info]
+    if missing:
+        entry.info.update(entry.proc.as_dict(attrs=missing, ad_value=None))
+    return entry.info
+
+
+class ProcessSnapshot:
+    """Remembers already-classified processes between sweeps"""
+
+    def __init__(self, attrs=('name',), classify=None):
+        self.attrs = list(attrs)
+        self.classify = classify or (lambda info: None)
+        self.entries = {}  # pid -> SnapshotEntry
+        self.held = {}  # pid -> key of a blocked process that is still alive (see recheck)
+        self._held_lock = threading.Lock()
+
+    def sweep(self):
+        """Diff the live process table against the previous sweep
+
+        Returns SweepResult(new, exited) with lists of SnapshotEntry. Only the
+        new processes had their attributes read and classify called; held
+        processes are reported in new again with the entry they already had.
+        """
+        new = []
+        current = {}
+        with self._held_lock:
+            held = dict(self.held)
+
+        for pid, started in start_times().items():
+            try:
+                key = (pid, started)
+
+                entry = self.entries.get(pid)
+                if entry is None or entry.key != key:
+                    proc = psutil.Process(pid)
+                    info = proc.as_dict(attrs=self.attrs, ad_value=None)
+                    info['pid'] = pid
+                    entry = SnapshotEntry(key, proc, info, self.classify(info))
+                    new.append(entry)
+                elif held.get(pid) == key:
+                    new.append(entry)  # still alive after a failed termination - hand it back
+
+                current[pid] = entry
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except Exception as e:
+                logger.debug(f"Snapshot error for PID {pid}: {e}")
+                continue
+
+        exited = [entry for pid, entry in self.entries.items()
+                  if current.get(pid) is not entry]
+        self.entries = current
+        with self._held_lock:
+            for pid, key in held.items():
+                entry = current.get(pid)
+                if (entry is None or entry.key != key) and self.held.get(pid) == key:
+                    del self.held[pid]
+        return SweepResult(new, exited)
+
+    def recheck(self, pid):
+        """Report pid in `new` on every sweep until it exits (its termination failed)
+
+        Returns False if the snapshot does not know the process (not swept
+        yet, or already gone).
+        """
+        entry = self.entries.get(pid)
+        if entry is None:
+            return False
+        with self._held_lock:
+            self.held[pid] = entry.key
+        return True
+
+    def carry_over(self, other):
+        """Start from the known processes (and held pids) of another snapshot
+
+        Carried entries keep the attributes they were read with; callers
+        fill in newer ones with fetch_attrs() where they need them.
+        """
+        self.entries = dict(other.entries)
+        with other._held_lock:
+            held = dict(other.held)
+        with self._held_lock:
+            self.held.update(held)
+
+    def forget(self, pid):
+        """Drop a process so the next sweep inspects it again"""
+        self.entries.pop(pid, None)
+
+    def clear(self):
+        self.entries = {}
+        with self._held_lock:
+            self.held = {}
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,312 @@
+"""
+Shared process-sweep service for the NetCafe blockers.
+
+One thread enumerates the process table once per cycle (through an
+incremental ProcessSnapshot) and hands the result to every registered
+subscriber. A new blocker costs one more callback with a name lookup, not
+another full enumeration and another thread competing for the GIL with the
+keyboard hook.
+
+How often the service sweeps is decided by a SweepScheduler fed from the
+`performance` section of config_enhanced.json: fast right after a block and
+on the lock screen, relaxing toward a ceiling while a session stays quiet.
+"""
+
+import gc
+import time
+import logging
+import threading
+
+import psutil
+
+from process_snapshot import ProcessSnapshot, SweepResult, fetch_attrs
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscription:
+    def __init__(self, callback, attrs, interval):
+        self.callback = callback
+        self.attrs = set(attrs)
+        self.interval = interval
+        self.catch_up = True  # first delivery contains every live process
+
+
+class SweepScheduler:
+    """Picks the wait before the next sweep from recent activity
+
+    base: normal interval (performance.security_check_interval)
+    fast: interval after a block event and while the lock screen is shown
+    ceiling: longest interval a quiet gaming session backs off to
+    """
+
+    def __init__(self, base=2.0, fast=None, ceiling=None, backoff=1.5, fast_sweeps=5):
+        self.base = base
+        self.fast = min(fast, base) if fast else base
+        self.ceiling = max(ceiling, base) if ceiling else base
+        self.backoff = backoff
+        self.fast_sweeps = fast_sweeps
+        self.locked = False
+        self.fast_left = 0
+        self.current = base
+
+    def note_block(self):
+        """Something was just blocked - expect the user to try again soon"""
+        self.fast_left = self.fast_sweeps
+        self.current = self.fast
+
+    def set_locked(self, locked):
+        self.locked = locked
+        self.current = self.fast if locked else self.base
+
+    @property
+    def mode(self):
+        if self.locked:
+            return 'lock_screen'
+        if self.fast_left:
+            return 'after_block'
+        return 'quiet' if self.current > self.base else 'normal'
+
+    def next_interval(self):
+        """Interval to wait after the sweep that just finished"""
+        if self.locked:
+            self.current = self.fast
+        elif self.fast_left:
+            self.fast_left -= 1
+            self.current = self.fast
+        elif self.current < self.base:
+            self.current = self.base
+        else:
+            self.current = min(self.current * self.backoff, self.ceiling)
+        return self.current
+
+
+class ProcessSweepService:
+    """Enumerates processes once per cycle and fans the diff out to subscribers
+
+    Subscribers are called on the service thread with a SweepResult. Their
+    first call lists every live process as new so they can catch up with
+    processes started before they subscribed.
+    """
+
+    def __init__(self, interval=2.0, scheduler=None):
+        self.scheduler = scheduler or SweepScheduler(base=interval)
+        self.interval = self.scheduler.current
+        self.max_interval = None  # tightest limit requested by a subscriber
+        self.cleanup_interval = None
+        self._last_cleanup = time.monotonic()
+        self.subscribers = {}  # name -> _Subscription
+        self.attrs = {'name'}
+        self.snapshot = ProcessSnapshot(attrs=sorted(self.attrs))
+        self.sweep_count = 0
+        self.last_sweep_ms = 0.0
+        self.last_sweep_cpu_ms = 0.0
+        self.total_sweep_cpu_ms = 0.0
+        self.running = False
+        self.thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def configure(self, performance):
+        """Apply the `performance` section of the client config
+
+        security_check_interval is the normal sweep interval;
+        security_check_interval_min/_max bound how far the scheduler may
+        tighten or relax it; memory_cleanup_interval is how often the sweep
+        thread runs a garbage collection pass.
+        """
+        base = float(performance.get('security_check_interval', self.scheduler.base))
+        scheduler = SweepScheduler(
+            base=base,
+            fast=float(performance.get('security_check_interval_min', base / 4)),
+            ceiling=float(performance.get('security_check_interval_max', base * 5)),
+        )
+        with self._lock:
+            scheduler.set_locked(self.scheduler.locked)
+            self.scheduler = scheduler
+            self.cleanup_interval = performance.get('memory_cleanup_interval')
+            self._update_settings()
+        logger.info(f"🔁 Process sweep every {scheduler.base}s "
+                    f"(fast {scheduler.fast}s, quiet up to {scheduler.ceiling}s)")
+        self._wake.set()
+
+    def note_block(self):
+        """Called by subscribers after they blocked something"""
+        with self._lock:
+            self.scheduler.note_block()
+            self._update_interval()
+        self._wake.set()
+
+    def set_locked(self, locked):
+        """Sweep at the fast interval while the lock screen is shown"""
+        with self._lock:
+            self.scheduler.set_locked(locked)
+            self._update_interval()
+        self._wake.set()
+
+    def stats(self):
+        """Effective interval and cost of the sweeps so far"""
+        sweeps = self.sweep_count
+        return {
+            'interval': round(self.interval, 3),
+            'mode': self.scheduler.mode,
+            'sweeps': sweeps,
+            'subscribers': len(self.subscribers),
+            'last_sweep_ms': round(self.last_sweep_ms, 3),
+            'last_sweep_cpu_ms': round(self.last_sweep_cpu_ms, 3),
+            'avg_sweep_cpu_ms': round(self.total_sweep_cpu_ms / sweeps, 3) if sweeps else 0.0,
+        }
+
+    def recheck(self, pid):
+        """Hand pid to the subscribers as new on every sweep until it exits
+
+        For blocked processes whose termination failed (access denied,
+        survived kill) - subscribers only look at new processes.
+        """
+        with self._lock:
+            snapshot = self.snapshot
+        return snapshot.recheck(pid)
+
+    def subscribe(self, name, callback, attrs=('name',), interval=None):
+        """Register callback(SweepResult) under name
+
+        attrs: psutil attributes the subscriber needs in entry.info for every
+               new process; keep expensive ones (EXPENSIVE_ATTRS) out and
+               read them with fetch_attrs() only for processes that need them
+        interval: longest acceptable time between sweeps for this subscriber
+                  (caps the scheduler; leave None to follow the config)
+        """
+        with self._lock:
+            self.subscribers[name] = _Subscription(callback, attrs, interval)
+            self._update_settings()
+        logger.info(f"🔁 Process sweep subscriber added: {name}")
+        self.start()
+        self._wake.set()  # give the new subscriber its catch-up sweep right away
+
+    def unsubscribe(self, name):
+        with self._lock:
+            if self.subscribers.pop(name, None) is None:
+                return
+            self._update_settings()
+            empty = not self.subscribers
+        logger.info(f"🔁 Process sweep subscriber removed: {name}")
+        if empty:
+            self.stop()
+
+    def _update_settings(self):
+        """Recompute attrs and interval from the subscribers (lock held)"""
+        attrs = {'name'}
+        for sub in self.subscribers.values():
+            attrs |= sub.attrs
+        if not attrs <= self.attrs:
+            # New processes get the new attributes; known ones stay known (no burst of
+            # "new" processes) and get them read only for a catch-up delivery
+            self.attrs = attrs
+            snapshot = ProcessSnapshot(attrs=sorted(attrs))
+            snapshot.carry_over(self.snapshot)
+            self.snapshot = snapshot
+
+        intervals = [sub.interval for sub in self.subscribers.values() if sub.interval]
+        self.max_interval = min(intervals) if intervals else None
+        self._update_interval()
+
+    def _update_interval(self, interval=None):
+        """Effective interval: the scheduler's choice capped by subscribers (lock held)"""
+        interval = self.scheduler.current if interval is None else interval
+        if self.max_interval is not None:
+            interval = min(interval, self.max_interval)
+        self.interval = interval
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._wake.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info("🔁 Process sweep service started")
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        logger.info("🔁 Process sweep service stopped")
+
+    def _run(self):
+        while self.running:
+            # Cleared before the sweep: a wake() from here on (lock screen, new
+            # subscriber) ends the wait below instead of being lost
+            self._wake.clear()
+            try:
+                self.sweep_once()
+                self._cleanup_memory()
+            except Exception as e:
+                logger.error(f"Process sweep error: {e}")
+            with self._lock:
+                self._update_interval(self.scheduler.next_interval())
+            self._wake.wait(self.interval)
+
+    def sweep_once(self):
+        """Enumerate once and deliver the result to every subscriber"""
+        with self._lock:
+            snapshot = self.snapshot
+            subscribers = list(self.subscribers.items())
+        if not subscribers:
+            return None
+
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        result = snapshot.sweep()
+        self.last_sweep_cpu_ms = (time.thread_time() - cpu_started) * 1000
+        self.last_sweep_ms = (time.perf_counter() - started) * 1000
+        self.total_sweep_cpu_ms += self.last_sweep_cpu_ms
+        self.sweep_count += 1
+
+        for name, sub in subscribers:
+            delivery = result
+            if sub.catch_up:
+                delivery = SweepResult(self._catch_up_entries(snapshot, sub.attrs), [])
+                sub.catch_up = False
+            try:
+                sub.callback(delivery)
+            except Exception as e:
+                logger.error(f"Process sweep subscriber {name} error: {e}")
+        return result
+
+    def _catch_up_entries(self, snapshot, attrs):
+        """Every live process, with attrs read for entries carried over from an older snapshot"""
+        entries = []
+        for entry in snapshot.entries.values():
+            if not attrs <= entry.info.keys():
+                try:
+                    fetch_attrs(entry, *attrs)
+                except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                    continue
+            entries.append(entry)
+        return entries
+
+    def _cleanup_memory(self):
+        """Periodic gc pass (performance.memory_cleanup_interval)"""
+        if not self.cleanup_interval:
+            return
+        now = time.monotonic()
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        collected = gc.collect()
+        logger.debug(f"🧹 Memory cleanup collected {collected} objects")
+
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+
+def get_sweep_service():
+    """Return the process-wide ProcessSweepService"""
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is None:
+            _shared_service = ProcessSweepService()
+        return _shared_service
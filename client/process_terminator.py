@@ -0,0 +1,245 @@
+"""
+Batched process termination for the NetCafe blockers.
+
+Blockers submit the processes they want gone while they look at a sweep
+(or an event) and flush once at the end. flush() issues every terminate()
+together on the calling thread - a non-blocking signal/TerminateProcess -
+and hands the batch to one background waiter, so the sweep thread never
+blocks on a slow target. The waiter:
+
+  - waits for the whole batch with a single psutil.wait_procs() call,
+  - escalates the stragglers still alive after `grace` to kill(),
+  - waits once more up to `kill_deadline` and reports each target with
+    its kill latency (terminate issued -> process gone).
+
+A target that is already being terminated is not terminated again on the
+next cycle, and one that survived kill() is left alone for `retry_after`
+seconds instead of being hammered every sweep: submit() refuses it until
+then. Its on_done gets survived=True, and the blocker is responsible for
+submitting it again - the sweep-based blockers ask the sweep service to
+hand it back (ProcessSweepService.recheck), FolderBlocker keeps its own
+list of survivors.
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+
+import psutil
+
+from block_stats import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# started_at/detected_at/killed_at are time.time() values (killed_at: process gone, None if it survived);
+# kill_ms is terminate issued -> process gone; escalated means kill() was needed
+TerminationResult = namedtuple('TerminationResult', [
+    'pid', 'rule', 'source', 'started_at', 'detected_at', 'killed_at', 'kill_ms', 'escalated', 'survived'
+])
+
+
+class _Target:
+    __slots__ = ('proc', 'key', 'rule', 'source', 'detected_at', 'on_done', 'issued_at', 'issued_wall', 'gone_at',
+                 'escalated')
+
+    def __init__(self, proc, key, rule, source, detected_at, on_done):
+        self.proc = proc
+        self.key = key
+        self.rule = rule
+        self.source = source
+        self.detected_at = detected_at
+        self.on_done = on_done
+        self.issued_at = None
+        self.issued_wall = None
+        self.gone_at = None
+        self.escalated = False
+
+
+def _process_key(proc):
+    try:
+        return proc.pid, proc.create_time()
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except psutil.AccessDenied:
+        return proc.pid, None
+
+
+class TerminationEngine:
+    """Collects kills per sweep, issues them together and awaits them off-thread"""
+
+    def __init__(self, grace=1.0, kill_deadline=1.0, retry_after=30.0):
+        self.grace = grace
+        self.kill_deadline = kill_deadline
+        self.retry_after = retry_after
+        self.latency = LatencyHistogram()
+        self.terminated = 0
+        self.escalated = 0
+        self.survived = 0
+        self.in_flight = {}  # (pid, create_time) -> _Target submitted or being awaited
+        self.cooldown = {}  # (pid, create_time) -> monotonic time until which a survivor is skipped
+        self._batch = threading.local()  # per-thread list of targets submitted since the last flush
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, proc, rule, source, detected_at=None, on_done=None):
+        """Queue proc for termination at the next flush() on this thread
+
+        Returns False (and does nothing) if proc is already being terminated
+        or survived a kill recently. on_done(TerminationResult) is called from
+        the waiter thread once the outcome is known.
+        """
+        key = _process_key(proc)
+        if key is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if key in self.in_flight or self.cooldown.get(key, 0) > now:
+                return False
+            target = _Target(proc, key, rule, source, detected_at or time.time(), on_done)
+            self.in_flight[key] = target
+        pending = getattr(self._batch, 'targets', None)
+        if pending is None:
+            pending = self._batch.targets = []
+        pending.append(target)
+        return True
+
+    def flush(self):
+        """Issue terminate() for everything this thread submitted and hand it to the waiter"""
+        targets = getattr(self._batch, 'targets', None)
+        if not targets:
+            return 0
+        self._batch.targets = []
+        issued = []
+        for target in targets:
+            target.issued_at = time.monotonic()
+            target.issued_wall = time.time()
+            try:
+                target.proc.terminate()
+                issued.append(target)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                target.gone_at = target.issued_at
+                self._finish(target)
+            except psutil.AccessDenied:
+                logger.warning(f"⚠️ Access denied terminating PID {target.proc.pid} ({target.rule})")
+                self._finish(target, survived=True)
+        if issued:
+            self._ensure_thread()
+            self._queue.put(issued)
+        return len(targets)
+
+    def terminate(self, proc, rule, source, detected_at=None, on_done=None):
+        """submit() + flush() for a single process outside of a sweep"""
+        submitted = self.submit(proc, rule, source, detected_at, on_done)
+        self.flush()
+        return submitted
+
+    def stats(self):
+        with self._lock:
+            return {
+                'terminated': self.terminated,
+                'escalated': self.escalated,
+                'survived': self.survived,
+                'in_flight': len(self.in_flight),
+                'kill_latency': self.latency.summary(),
+            }
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True, name='termination-waiter')
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            # Batches flushed while we were waiting are awaited together
+            while True:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._await(batch)
+            except Exception as e:
+                logger.error(f"Termination waiter error: {e}")
+
+    def _wait(self, targets, timeout):
+        """One wait_procs() over targets; returns the ones still alive"""
+        by_proc = {id(target.proc): target for target in targets}
+
+        def on_gone(proc):
+            by_proc[id(proc)].gone_at = time.monotonic()
+
+        _gone, alive = psutil.wait_procs([target.proc for target in targets], timeout=timeout, callback=on_gone)
+        still_alive = []
+        for proc in alive:
+            target = by_proc[id(proc)]
+            try:
+                if proc.status() == psutil.STATUS_ZOMBIE:
+                    target.gone_at = time.monotonic()  # dead, just not reaped by its parent yet
+                    continue
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+            still_alive.append(target)
+        return still_alive
+
+    def _await(self, batch):
+        stragglers = self._wait(batch, self.grace)
+        for target in stragglers:
+            target.escalated = True
+            try:
+                target.proc.kill()
+            except psutil.NoSuchProcess:
+                target.gone_at = time.monotonic()
+            except psutil.AccessDenied:
+                pass
+        survivors = self._wait([t for t in stragglers if t.gone_at is None], self.kill_deadline) if stragglers else []
+        survivor_ids = {id(target) for target in survivors}
+        for target in batch:
+            self._finish(target, survived=id(target) in survivor_ids)
+
+    def _finish(self, target, survived=False):
+        kill_ms = killed_at = None
+        if not survived and target.gone_at is not None:
+            kill_ms = max(0.0, (target.gone_at - target.issued_at) * 1000)
+            killed_at = target.issued_wall + kill_ms / 1000
+        with self._lock:
+            self.in_flight.pop(target.key, None)
+            if survived:
+                self.survived += 1
+                self.cooldown[target.key] = time.monotonic() + self.retry_after
+                if len(self.cooldown) > 256:
+                    now = time.monotonic()
+                    self.cooldown = {key: until for key, until in self.cooldown.items() if until > now}
+            else:
+                self.terminated += 1
+                if kill_ms is not None:
+                    self.latency.record(kill_ms)
+            if target.escalated:
+                self.escalated += 1
+        if survived:
+            logger.warning(f"⚠️ PID {target.proc.pid} ({target.rule}) survived terminate and kill")
+
+        if target.on_done:
+            result = TerminationResult(target.proc.pid, target.rule, target.source, target.key[1],
+                                       target.detected_at, killed_at, kill_ms, target.escalated, survived)
+            try:
+                target.on_done(result)
+            except Exception as e:
+                logger.error(f"Termination callback error: {e}")
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+
+def get_termination_engine():
+    """Return the process-wide TerminationEngine"""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = TerminationEngine()
+        return _shared_engine
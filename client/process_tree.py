@@ -0,0 +1,182 @@
+"""
+Incremental parent/child process tree for the NetCafe blockers.
+
+The tree is seeded once from psutil and then kept up to date from the
+process event source (spawn -> add, exit -> remove), so nothing is rebuilt
+per sweep. Each node links to its parent, which makes "is this process
+running under steam.exe?" an O(depth) walk up the tree.
+
+Exited processes stay in the tree as long as they have live descendants:
+a game keeps counting as "under Steam" even if the launcher stub that
+started it has already exited (Windows never reparents). A parent is only
+linked if it started before the child, so a reused PID can't adopt
+processes that are older than it.
+"""
+
+import logging
+import threading
+from collections import deque
+
+import psutil
+
+from process_snapshot import start_time
+
+logger = logging.getLogger(__name__)
+
+
+class TreeNode:
+    __slots__ = ('pid', 'ppid', 'name', 'created', 'parent', 'children', 'alive')
+
+    def __init__(self, pid, ppid, name, created):
+        self.pid = pid
+        self.ppid = ppid
+        self.name = name
+        self.created = created
+        self.parent = None
+        self.children = set()
+        self.alive = True
+
+    def __repr__(self):
+        return f"TreeNode({self.pid}, {self.name!r}, ppid={self.ppid}, alive={self.alive})"
+
+
+class ProcessTree:
+    """Parent/child index of the running processes, updated from process events"""
+
+    MAX_DEPTH = 64  # guards ancestor walks against a corrupt (cyclic) parent chain
+
+    def __init__(self):
+        self.nodes = {}  # pid -> TreeNode (live, or exited with live descendants)
+        self._lock = threading.Lock()
+
+    def seed(self):
+        """Add every running process (call once, before or right after the event source starts)"""
+        procs = []
+        for proc in psutil.process_iter(['pid', 'ppid', 'name']):
+            try:
+                procs.append((proc.info['pid'], proc.info['ppid'], proc.info['name'], start_time(proc.info['pid'])))
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+        # Oldest first so parents exist when their children are linked
+        procs.sort(key=lambda item: (item[3] is None, item[3] or 0))
+        for pid, ppid, name, created in procs:
+            self.add(pid, ppid, name, created)
+
+    def add(self, pid, ppid=None, name=None, created=None):
+        """Add (or refresh) a process; missing ppid/name/start time are read from the OS"""
+        try:
+            if created is None:
+                created = start_time(pid)
+            if ppid is None or name is None:
+                proc = psutil.Process(pid)
+                ppid = proc.ppid() if ppid is None else ppid
+                name = proc.name() if name is None else name
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+        except psutil.AccessDenied:
+            pass
+        name = name.lower() if name else None
+
+        with self._lock:
+            node = self.nodes.get(pid)
+            if node is not None and node.alive and node.created == created:
+                # Same process seen again (exec of a new image) - keep its place in the tree
+                if name:
+                    node.name = name
+                return node
+            if node is not None:
+                # PID reused: the old process is gone. Its node leaves the index but
+                # stays linked while its descendants (which still point at it) live
+                node.alive = False
+                del self.nodes[pid]
+                self._drop_if_unused(node)
+
+            node = TreeNode(pid, ppid, name, created)
+            parent = self.nodes.get(ppid) if ppid else None
+            if parent is not None and parent is not node and self._started_before(parent, node):
+                node.parent = parent
+                parent.children.add(node)
+            self.nodes[pid] = node
+            return node
+
+    def remove(self, pid):
+        """Mark a process as exited; it is dropped once it has no live descendants"""
+        with self._lock:
+            node = self.nodes.get(pid)
+            if node is not None:
+                node.alive = False
+                self._drop_if_unused(node)
+
+    def on_event(self, event):
+        """Apply a ProcessEvent from process_events"""
+        if event.kind == 'start':
+            self.add(event.pid, event.ppid, event.name)
+        elif event.kind == 'exit':
+            self.remove(event.pid)
+
+    def prune(self, live_pids=None):
+        """Drop processes whose exit event was missed; returns how many were dropped"""
+        live_pids = set(psutil.pids() if live_pids is None else live_pids)
+        with self._lock:
+            gone = [node for pid, node in self.nodes.items() if node.alive and pid not in live_pids]
+            for node in gone:
+                node.alive = False
+                self._drop_if_unused(node)
+        return len(gone)
+
+    def ancestors(self, pid):
+        """Nodes above pid, nearest parent first - O(depth)"""
+        with self._lock:
+            node = self.nodes.get(pid)
+            chain = []
+            while node is not None and node.parent is not None and len(chain) < self.MAX_DEPTH:
+                node = node.parent
+                chain.append(node)
+            return chain
+
+    def find_ancestor(self, pid, matcher):
+        """First ancestor whose name the NameMatcher matches, as (node, rule), or None"""
+        for node in self.ancestors(pid):
+            rule = matcher.match(node.name)
+            if rule:
+                return node, rule
+        return None
+
+    def is_descendant(self, pid, ancestor_pid):
+        """True if ancestor_pid is somewhere above pid - O(depth)"""
+        return any(node.pid == ancestor_pid for node in self.ancestors(pid))
+
+    def descendants(self, pid):
+        """Every process below pid (live or not), breadth first"""
+        with self._lock:
+            node = self.nodes.get(pid)
+            if node is None:
+                return []
+            found, queue = [], deque(node.children)
+            while queue:
+                child = queue.popleft()
+                found.append(child)
+                queue.extend(child.children)
+            return found
+
+    def _started_before(self, parent, child):
+        if parent.created is None or child.created is None:
+            return True
+        return parent.created <= child.created
+
+    def _drop_if_unused(self, node):
+        """Forget exited nodes without descendants, walking up the chain (lock held)"""
+        while node is not None and not node.alive and not node.children:
+            parent = node.parent
+            if parent is not None:
+                parent.children.discard(node)
+            if self.nodes.get(node.pid) is node:
+                del self.nodes[node.pid]
+            node = parent
+
+    def __contains__(self, pid):
+        node = self.nodes.get(pid)
+        return node is not None and node.alive
+
+    def __len__(self):
+        return len(self.nodes)
@@ -0,0 +1,131 @@
+"""
+Security notification queue for the NetCafe clients.
+
+Blockers post warnings from their worker threads and return immediately;
+the Qt main thread drains the queue on a timer and shows them as tray
+toasts. The queue is bounded, coalesces repeated identical warnings into
+one notice with a count, shows the same warning at most once per coalesce
+window, and spaces toasts by a minimum interval - so enforcement never
+waits on the user and spamming a blocked tool cannot flood the screen.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SecurityNotice:
+    """One pending warning; count is how many identical warnings it stands for"""
+
+    def __init__(self, key, title, message, not_before):
+        self.key = key
+        self.title = title
+        self.message = message
+        self.count = 1
+        self.not_before = not_before
+
+    @property
+    def text(self):
+        if self.count > 1:
+            return f"{self.message}\n(×{self.count})"
+        return self.message
+
+
+class NotificationQueue:
+    """Bounded, coalescing, rate-limited queue of security notices"""
+
+    def __init__(self, max_pending=32, coalesce_window=10.0, min_interval=2.0, clock=time.monotonic):
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self.clock = clock
+        self.pending = OrderedDict()  # key -> SecurityNotice, oldest first
+        self.last_shown = {}  # key -> time the key was last handed out
+        self.last_toast = None
+        self.posted_count = 0
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        self._lock = threading.Lock()
+
+    def configure(self, min_interval=None, coalesce_window=None):
+        with self._lock:
+            if min_interval is not None:
+                self.min_interval = min_interval
+            if coalesce_window is not None:
+                self.coalesce_window = coalesce_window
+
+    def post(self, title, message, key=None):
+        """Queue a warning without blocking; returns False if it was dropped
+
+        Warnings with the same key (default: title + message) that are still
+        pending, or arrive within coalesce_window of the last one shown, are
+        folded into a single notice.
+        """
+        key = key or (title, message)
+        now = self.clock()
+        with self._lock:
+            self.posted_count += 1
+            notice = self.pending.get(key)
+            if notice is not None:
+                notice.count += 1
+                self.coalesced_count += 1
+                return True
+
+            if len(self.pending) >= self.max_pending:
+                self.dropped_count += 1
+                return False
+
+            shown = self.last_shown.get(key)
+            not_before = now if shown is None else max(now, shown + self.coalesce_window)
+            if not_before > now:
+                self.coalesced_count += 1
+            self.pending[key] = SecurityNotice(key, title, message, not_before)
+            return True
+
+    def next_notice(self):
+        """Return the next notice that may be shown now, or None (call from the UI thread)"""
+        now = self.clock()
+        with self._lock:
+            if self.last_toast is not None and now - self.last_toast < self.min_interval:
+                return None
+            for key, notice in self.pending.items():
+                if notice.not_before <= now:
+                    del self.pending[key]
+                    self.last_shown[key] = now
+                    self.last_toast = now
+                    self._prune_shown(now)
+                    return notice
+            return None
+
+    def _prune_shown(self, now):
+        """Forget keys whose coalesce window has passed (lock held)"""
+        if len(self.last_shown) > 256:
+            self.last_shown = {key: shown for key, shown in self.last_shown.items()
+                               if now - shown < self.coalesce_window}
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'posted': self.posted_count,
+            'coalesced': self.coalesced_count,
+            'dropped': self.dropped_count,
+        }
+
+    def __len__(self):
+        return len(self.pending)
+
+
+_shared_queue = None
+_shared_lock = threading.Lock()
+
+
+def get_notification_queue():
+    """Return the process-wide NotificationQueue"""
+    global _shared_queue
+    with _shared_lock:
+        if _shared_queue is None:
+            _shared_queue = NotificationQueue()
+        return _shared_queue
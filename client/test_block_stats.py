@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Block Statistics Test
+Tests the block-event ring buffer, latency histograms and the upload to a
+local stand-in server. Runs without the GUI on Linux/Windows.
+"""
+
+import sys
+import time
+import random
+import asyncio
+import traceback
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from block_stats import BlockStats, LatencyHistogram, upload_block_stats
+
+
+def test_histogram_percentiles():
+    """Percentiles stay within the histogram's ~6% resolution"""
+    rng = random.Random(7)
+    values = sorted(rng.expovariate(1 / 20) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for p in (50, 90, 99):
+        exact = values[int(len(values) * p / 100) - 1]
+        measured = histogram.percentile(p)
+        assert abs(measured - exact) <= exact * 0.07 + 0.002, f"p{p}: {measured} vs {exact}"
+    assert histogram.summary()['max_ms'] == round(int(values[-1] * 1000) / 1000, 3)
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_ring_buffer_keeps_latest_events():
+    """The buffer has a fixed size; counters keep counting past it"""
+    stats = BlockStats(capacity=8)
+    for i in range(20):
+        stats.record('folder_blocker', 'cmd.exe', pid=i, process='cmd.exe',
+                     started_at=100.0, detected_at=100.05, killed_at=100.051)
+
+    assert stats.total == 20 and len(stats.log) == 8
+    assert [event.pid for event in stats.recent(3)] == [17, 18, 19]
+    event = stats.recent(1)[0]
+    assert abs(event.detect_ms - 50) < 0.01 and abs(event.kill_ms - 1) < 0.01
+    summary = stats.summary()
+    assert summary['by_rule'] == {'cmd.exe': 20}
+    assert summary['kill_latency']['count'] == 20
+    assert '20 blocks' in stats.format_summary()
+
+
+def test_upload_payload_tracks_what_was_sent():
+    """Only unsent events are uploaded; overwritten ones are reported as lost"""
+    stats = BlockStats(capacity=4)
+    for i in range(6):
+        stats.record('process_monitor', 'taskmgr.exe', pid=i)
+
+    payload = stats.upload_payload()
+    assert [event['pid'] for event in payload['events']] == [2, 3, 4, 5]
+    assert payload['lost'] == 2
+
+    stats.mark_uploaded(payload['next_seq'])
+    stats.record('process_monitor', 'regedit.exe', pid=6)
+    payload = stats.upload_payload()
+    assert [event['pid'] for event in payload['events']] == [6] and payload['lost'] == 0
+
+
+def test_upload_to_server():
+    """upload_block_stats posts to /api/security_stats and marks events as sent"""
+    received = []
+
+    async def handler(request):
+        received.append(await request.json())
+        return web.json_response({'ok': True})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post('/api/security_stats', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        stats = BlockStats()
+        stats.record('window_watcher', 'file dialog', pid=42, process='Save As', kill_ms=0.3)
+        try:
+            async with aiohttp.ClientSession() as session:
+                assert await upload_block_stats(session, f'http://127.0.0.1:{port}', 'PC_1', stats)
+                assert await upload_block_stats(session, f'http://127.0.0.1:{port}', 'PC_1', stats)
+                # Health data rides along and is sent even without new events
+                assert await upload_block_stats(session, f'http://127.0.0.1:{port}', 'PC_1', stats,
+                                                extra={'keyboard_hook': {'reinstalls': 1}})
+        finally:
+            await runner.cleanup()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert len(received) == 2, "nothing new should not be uploaded again"
+    assert received[0]['computer_id'] == 'PC_1'
+    assert received[0]['events'][0]['rule'] == 'file dialog'
+    assert received[1]['keyboard_hook'] == {'reinstalls': 1} and not received[1]['events']
+    assert stats.uploaded_seq == 1
+
+
+def test_record_is_cheap():
+    """Recording a block costs microseconds"""
+    stats = BlockStats()
+    started = time.perf_counter()
+    for i in range(10000):
+        stats.record('folder_blocker', 'cmd.exe', pid=i, started_at=1.0, detected_at=1.01, killed_at=1.011)
+    per_record_us = (time.perf_counter() - started) / 10000 * 1e6
+    print(f"✅ record(): {per_record_us:.2f} us")
+    assert per_record_us < 200
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Block Statistics Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Histogram percentiles", test_histogram_percentiles),
+        ("Ring buffer", test_ring_buffer_keeps_latest_events),
+        ("Upload payload", test_upload_payload_tracks_what_was_sent),
+        ("Upload to server", test_upload_to_server),
+        ("Record cost", test_record_is_cheap),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All block statistics tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
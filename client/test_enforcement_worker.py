@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Enforcement Worker Test
+Tests running the monitors in the supervised enforcement process: notices
+and block events reach the UI process, and a killed or hung worker is
+restarted with its monitors. Runs without the GUI on Linux/Windows.
+"""
+
+import os
+import sys
+import time
+import signal
+import tempfile
+import traceback
+from datetime import datetime
+
+from block_stats import get_block_stats
+from security_notifications import get_notification_queue
+from enforcement_worker import EnforcementSupervisor
+
+RECORDING_SPEC = ('test_enforcement_worker', 'RecordingMonitor', 'start_monitoring', 'stop_monitoring')
+HANGING_SPEC = ('test_enforcement_worker', 'HangingMonitor', 'start_monitoring', 'stop_monitoring')
+POLICY_SPEC = ('test_enforcement_worker', 'PolicyMonitor', 'start_monitoring', 'stop_monitoring')
+# The workers log here instead of appending to the client's client.log
+LOG_FILE = os.path.join(tempfile.gettempdir(), 'netcafe_enforcement_test.log')
+
+
+class RecordingMonitor:
+    """Runs inside the worker: blocks one 'tool' and warns about it when started"""
+
+    def start_monitoring(self):
+        get_block_stats().record('test_monitor', 'taskmgr.exe', pid=os.getpid(), process='taskmgr.exe',
+                                 detect_ms=1.5, kill_ms=0.5)
+        get_notification_queue().post("🔒 NetCafe Security", "Task Manager blocked", key='taskmgr.exe')
+
+    def stop_monitoring(self):
+        pass
+
+
+class PolicyMonitor:
+    """Runs inside the worker: reports which process profile it was started with"""
+
+    def __init__(self):
+        self.policy = None
+
+    def set_policy(self, policy):
+        self.policy = policy
+
+    def start_monitoring(self):
+        profile = self.policy.profile if self.policy else None
+        get_notification_queue().post("policy", f"started with {profile}", key=f'policy-{profile}')
+
+    def stop_monitoring(self):
+        pass
+
+
+class HangingMonitor:
+    """Runs inside the worker: wedges the worker's main loop"""
+
+    def start_monitoring(self):
+        time.sleep(3600)
+
+    def stop_monitoring(self):
+        pass
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_worker_forwards_blocks_and_notices():
+    """Blocks and warnings raised in the worker show up in the UI process"""
+    stats = get_block_stats()
+    before = stats.total
+    posted = get_notification_queue().stats()['posted']
+    supervisor = EnforcementSupervisor(heartbeat_interval=0.2, log_file=LOG_FILE)
+    try:
+        supervisor.start()
+        supervisor.monitor('recorder', RECORDING_SPEC).start_monitoring()
+        assert wait_until(lambda: stats.total > before), "block event never reached the UI process"
+
+        event = stats.recent(1)[0]
+        assert event.source == 'test_monitor' and event.rule == 'taskmgr.exe'
+        assert event.pid == supervisor.process.pid and event.detect_ms == 1.5
+        assert wait_until(lambda: get_notification_queue().stats()['posted'] > posted), "warning never reached the UI"
+        assert wait_until(lambda: supervisor.worker_monitors == ['recorder'])
+        assert supervisor.stats()['sweep'] is not None
+    finally:
+        supervisor.stop()
+    assert not supervisor.process.is_alive()
+
+
+def test_worker_is_restarted_with_its_monitors():
+    """A killed worker is restarted and its monitors started again"""
+    stats = get_block_stats()
+    supervisor = EnforcementSupervisor(heartbeat_interval=0.2, heartbeat_timeout=2.0, restart_backoff=0.1, log_file=LOG_FILE)
+    try:
+        supervisor.start()
+        supervisor.monitor('recorder', RECORDING_SPEC).start_monitoring()
+        assert wait_until(lambda: supervisor.worker_monitors == ['recorder'])
+        first_pid = supervisor.process.pid
+        before = stats.total
+
+        os.kill(first_pid, signal.SIGKILL if hasattr(signal, 'SIGKILL') else signal.SIGTERM)
+        assert wait_until(lambda: supervisor.restarts == 1 and supervisor.process.pid != first_pid)
+        assert wait_until(lambda: stats.total > before), "monitor was not started in the new worker"
+        assert wait_until(lambda: supervisor.worker_monitors == ['recorder'])
+    finally:
+        supervisor.stop()
+
+
+def test_policy_sent_before_start_is_applied():
+    """The clients apply the policies before they start the monitors - the worker must keep it"""
+    security = {'process_profile': 'kids', 'process_profiles': {'kids': {'block': ['*cheat.exe']}}}
+    queue = get_notification_queue()
+    seen = []
+
+    def started_with_kids():
+        notice = queue.next_notice()
+        while notice is not None:
+            seen.append(notice.text)
+            notice = queue.next_notice()
+        return 'started with kids' in seen
+
+    supervisor = EnforcementSupervisor(heartbeat_interval=0.2, log_file=LOG_FILE)
+    try:
+        supervisor.start()
+        supervisor.apply_policy('policy_probe', security)
+        supervisor.monitor('policy_probe', POLICY_SPEC).start_monitoring()
+        assert wait_until(started_with_kids), f"monitor started without the policy: {seen}"
+    finally:
+        supervisor.stop()
+
+
+def test_hung_worker_is_restarted():
+    """A worker that stops sending heartbeats is killed and replaced"""
+    supervisor = EnforcementSupervisor(heartbeat_interval=0.2, heartbeat_timeout=1.0, restart_backoff=0.1, log_file=LOG_FILE)
+    try:
+        supervisor.start()
+        hanging = supervisor.monitor('hanging', HANGING_SPEC)
+        hanging.start_monitoring()
+        first_pid = supervisor.process.pid
+        hanging.stop_monitoring()  # so the replacement worker comes up healthy
+        assert wait_until(lambda: supervisor.restarts >= 1 and supervisor.process.pid != first_pid)
+        assert wait_until(lambda: supervisor.stats()['heartbeat_age'] < 1.0)
+    finally:
+        supervisor.stop()
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Enforcement Worker Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Blocks and notices forwarded", test_worker_forwards_blocks_and_notices),
+        ("Restart after crash", test_worker_is_restarted_with_its_monitors),
+        ("Policy before start", test_policy_sent_before_start_is_applied),
+        ("Restart after hang", test_hung_worker_is_restarted),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All enforcement worker tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Host Racing Test
+Tests racing the configured server hosts: stand-in servers on 127.0.0.x
+(same port, like the real server_hosts) with injected delays, refusals,
+bad status codes and a missing WebSocket endpoint. Runs on Linux; on
+Windows only 127.0.0.1 is bound by default, so it may need the extra
+loopback addresses.
+"""
+
+import sys
+import time
+import socket
+import asyncio
+import traceback
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from http_session import HttpSessionManager
+from host_racing import race_hosts, ordered_hosts, HostRaceError
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class StandInServer:
+    """NetCafe server stand-in on one loopback address"""
+
+    def __init__(self, host, status_delay=0, ws_delay=0, status=200, websocket=True):
+        self.host = host
+        self.status_delay = status_delay
+        self.ws_delay = ws_delay
+        self.status = status
+        self.websocket = websocket
+        self.ws_opened = 0
+        self.ws_closed = 0
+        self.runner = None
+
+    async def _status(self, request):
+        await asyncio.sleep(self.status_delay)
+        return web.json_response({'status': 'ok'}, status=self.status)
+
+    async def _ws(self, request):
+        await asyncio.sleep(self.ws_delay)
+        socket_ = web.WebSocketResponse()
+        try:
+            await socket_.prepare(request)
+        except ConnectionResetError:
+            return socket_  # the client cancelled this attempt during the delay
+        self.ws_opened += 1
+        async for message in socket_:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                await socket_.send_str(message.data)
+        self.ws_closed += 1
+        return socket_
+
+    async def start(self, port):
+        app = web.Application()
+        app.router.add_get('/api/status', self._status)
+        if self.websocket:
+            app.router.add_get('/ws', self._ws)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, port).start()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def _race(servers, hosts, stagger=0.1):
+    """Start the servers, race hosts against them: (result or HostRaceError, seconds)"""
+    async def scenario():
+        port = _free_port()
+        for server in servers:
+            await server.start(port)
+        http = HttpSessionManager({'timeouts': {'status': 2, 'ws_connect': 2}})
+        started = time.perf_counter()
+        try:
+            try:
+                result = await race_hosts(http, hosts, port, 'PC_1', stagger=stagger)
+            except HostRaceError as e:
+                return e, time.perf_counter() - started
+            elapsed = time.perf_counter() - started
+            await result.ws.send_str('ping')
+            assert await result.ws.receive_str() == 'ping'
+            await result.ws.close()
+            await asyncio.sleep(0.05)  # let the servers see the closes
+            return result, elapsed
+        finally:
+            await http.close()
+            for server in servers:
+                await server.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_refused_primary_falls_through_at_once():
+    """A refused host starts the next attempt immediately, without waiting for the stagger"""
+    live = StandInServer('127.0.0.3')
+    result, elapsed = _race([live], ['127.0.0.2', '127.0.0.3'], stagger=1.0)
+    assert result.host == '127.0.0.3', result
+    assert isinstance(result.errors['127.0.0.2'], aiohttp.ClientConnectionError)
+    assert elapsed < 0.5, f"waited {elapsed:.2f}s for a refused host"
+    assert live.ws_opened == 1
+
+
+def test_slow_primary_loses_to_fast_fallback():
+    """A slow primary costs one stagger; the loser is cancelled and its late WebSocket closed"""
+    slow = StandInServer('127.0.0.2', ws_delay=0.4)
+    fast = StandInServer('127.0.0.3')
+    result, elapsed = _race([slow, fast], ['127.0.0.2', '127.0.0.3'], stagger=0.1)
+    assert result.host == '127.0.0.3'
+    assert 0.1 <= elapsed < 0.35, f"{elapsed:.2f}s"
+    assert fast.ws_opened == 1
+    assert slow.ws_opened == slow.ws_closed, "a late WebSocket must not stay open"
+
+
+def test_first_complete_host_wins_not_first_status():
+    """Answering /api/status first is not enough - the WebSocket handshake has to finish too"""
+    no_ws = StandInServer('127.0.0.2', websocket=False)
+    bad_status = StandInServer('127.0.0.3', status=503)
+    slow = StandInServer('127.0.0.4', status_delay=0.2)
+    result, elapsed = _race([no_ws, bad_status, slow], ['127.0.0.2', '127.0.0.3', '127.0.0.4'], stagger=0.05)
+    assert result.host == '127.0.0.4'
+    assert set(result.errors) == {'127.0.0.2', '127.0.0.3'}
+    assert 'Server status: 503' in str(result.errors['127.0.0.3'])
+
+
+def test_primary_wins_a_tie():
+    """Hosts are preferred in order: a healthy primary wins before the stagger starts the others"""
+    primary = StandInServer('127.0.0.2')
+    fallback = StandInServer('127.0.0.3')
+    result, elapsed = _race([primary, fallback], ['127.0.0.2', '127.0.0.3'], stagger=0.5)
+    assert result.host == '127.0.0.2' and not result.errors
+    assert fallback.ws_opened == 0
+    assert elapsed < 0.5
+
+
+def test_all_hosts_fail():
+    """Every host refused or broken: HostRaceError lists each one"""
+    no_ws = StandInServer('127.0.0.3', websocket=False)
+    error, elapsed = _race([no_ws], ['127.0.0.2', '127.0.0.3', '127.0.0.4'])
+    assert isinstance(error, HostRaceError)
+    assert set(error.errors) == {'127.0.0.2', '127.0.0.3', '127.0.0.4'}
+    assert '127.0.0.3' in str(error)
+    assert elapsed < 1.0
+
+
+def test_host_order_and_arguments():
+    """The last host that worked goes first; duplicates are raced once"""
+    hosts = ['192.168.7.2', 'localhost', '127.0.0.1', 'localhost']
+    assert ordered_hosts(hosts) == ['192.168.7.2', 'localhost', '127.0.0.1']
+    assert ordered_hosts(hosts, 2) == ['127.0.0.1', 'localhost', '192.168.7.2']
+
+    for hosts, stagger in (([], 0.1), (['127.0.0.1'], -1)):
+        try:
+            asyncio.run(race_hosts(HttpSessionManager(), hosts, 8080, 'PC_1', stagger=stagger))
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted hosts={hosts} stagger={stagger}")
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Host Racing Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Refused primary", test_refused_primary_falls_through_at_once),
+        ("Slow primary", test_slow_primary_loses_to_fast_fallback),
+        ("Status and WebSocket", test_first_complete_host_wins_not_first_status),
+        ("Primary preferred", test_primary_wins_a_tie),
+        ("All hosts fail", test_all_hosts_fail),
+        ("Host order", test_host_order_and_arguments),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All host racing tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
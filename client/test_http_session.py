@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - HTTP Session Test
+Tests the pooled HTTP session the clients share between status, login,
+logout, block statistics and the WebSocket: connection reuse, the timeout
+per operation and the pool statistics, against a local stand-in server.
+Runs without the GUI on Linux/Windows.
+"""
+
+import sys
+import asyncio
+import traceback
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from block_stats import BlockStats, upload_block_stats
+from http_session import HttpSessionManager
+
+
+async def _start_server(login_delay=0):
+    """Stand-in NetCafe server on a free port: (runner, base url)"""
+    async def status(request):
+        return web.json_response({'status': 'ok'})
+
+    async def login(request):
+        await asyncio.sleep(login_delay)
+        return web.json_response({'success': True, 'user': {'minutes': 60}})
+
+    async def logout(request):
+        return web.json_response({'success': True})
+
+    async def security_stats(request):
+        await request.json()
+        return web.json_response({'ok': True})
+
+    async def ws(request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        await socket.send_json({'type': 'session_update', 'remaining_time': 60})
+        async for message in socket:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                await socket.send_str(message.data)
+        return socket
+
+    app = web.Application()
+    app.router.add_get('/api/status', status)
+    app.router.add_post('/api/login', login)
+    app.router.add_post('/api/logout', logout)
+    app.router.add_post('/api/security_stats', security_stats)
+    app.router.add_get('/ws', ws)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+def test_connections_are_reused():
+    """status, login and logout share one session and its keep-alive connection"""
+    async def scenario():
+        runner, url = await _start_server()
+        http = HttpSessionManager()
+        try:
+            for _ in range(3):
+                async with http.get(f'{url}/api/status') as response:
+                    assert response.status == 200
+            async with http.post(f'{url}/api/login', json={'username': 'u'}) as response:
+                assert (await response.json())['success']
+            async with http.post(f'{url}/api/logout', json={}) as response:
+                assert response.status == 200
+            return http.pool_stats()
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+    stats = asyncio.run(scenario())
+    assert stats['sessions_created'] == 1
+    assert stats['connections_created'] == 1, stats
+    assert stats['connections_reused'] == 4
+    assert stats['idle_connections'] == 1 and stats['in_use_connections'] == 0
+    assert set(stats['operations']) == {'status', 'login', 'logout'}
+    assert stats['operations']['status']['requests'] == 3
+    assert stats['operations']['login']['timeout_s'] == 15
+
+
+def test_timeout_per_operation():
+    """A slow login hits the login timeout; status keeps its own"""
+    async def scenario():
+        runner, url = await _start_server(login_delay=1.0)
+        http = HttpSessionManager({'timeouts': {'login': 0.2}})
+        try:
+            try:
+                async with http.post(f'{url}/api/login', json={}):
+                    pass
+            except asyncio.TimeoutError:
+                pass
+            else:
+                raise AssertionError("login should have timed out")
+            async with http.get(f'{url}/api/status') as response:
+                assert response.status == 200
+            return http.pool_stats()
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+    stats = asyncio.run(scenario())
+    assert stats['operations']['login']['errors'] == 1
+    assert stats['operations']['status'] == dict(stats['operations']['status'], requests=1, errors=0, timeout_s=5)
+
+
+def test_stats_upload_and_websocket_share_the_pool():
+    """upload_block_stats takes the manager as its session; ws_connect is its own operation"""
+    async def scenario():
+        runner, url = await _start_server()
+        http = HttpSessionManager()
+        try:
+            stats = BlockStats()
+            stats.record('process_monitor', 'taskmgr.exe', pid=1)
+            assert await upload_block_stats(http, url, 'PC_1', stats, extra={'http_pool': http.pool_stats()})
+
+            ws = await http.ws_connect(f"{url.replace('http', 'ws')}/ws?computer_id=PC_1")
+            first = await ws.receive_json()
+            await ws.send_str('ping')
+            echo = await ws.receive_str()
+            await ws.close()
+            assert first['type'] == 'session_update' and echo == 'ping'
+            return http.pool_stats()
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+    stats = asyncio.run(scenario())
+    assert stats['operations']['stats']['requests'] == 1
+    assert stats['operations']['ws_connect']['requests'] == 1
+    assert stats['sessions_created'] == 1
+
+
+def test_config_and_close():
+    """Bad server.http values raise ValueError; a closed manager refuses new requests"""
+    for http in ([], {'limit': 0}, {'timeouts': {'login': -1}}, {'timeouts': 5}, {'keepalive_timeout': 'long'}):
+        try:
+            HttpSessionManager(http)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted invalid config: {http}")
+
+    http = HttpSessionManager({'timeouts': {'status': 2}})
+    assert http.timeouts['status'].total == 2 and http.timeouts['logout'].total == 10
+    assert http.operation('http://pc/api/security_stats') == 'stats'
+    assert http.operation('http://pc/api/other') == 'default'
+    assert http.operation('http://pc/api/other', op='login') == 'login'
+    assert http.closed and 'HTTP pool: 0 requests' in http.format_summary()
+
+    asyncio.run(http.close())
+    try:
+        http.session
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("a closed manager must not open a new session")
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - HTTP Session Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Connection reuse", test_connections_are_reused),
+        ("Timeout per operation", test_timeout_per_operation),
+        ("Stats upload and WebSocket", test_stats_upload_and_websocket_share_the_pool),
+        ("Config and close", test_config_and_close),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All HTTP session tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
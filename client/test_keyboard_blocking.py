@@ -2,6 +2,9 @@
 """
 🔐 NetCafe Pro 2.0 - Keyboard Blocking Test
 Test script to verify keyboard blocking functionality
+
+--record <file> also saves every key event as a trace for
+benchmark_keyboard_replay.py (see key_trace.py)
 """
 
 import sys
@@ -11,6 +14,9 @@ import threading
 import logging
 from ctypes import wintypes
 
+from hook_health import KBDLLHOOKSTRUCT
+from key_trace import TraceRecorder
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +31,7 @@ class KeyboardBlockingTest:
         self.pointer = None
         self.thread = None
         self.blocked_keys = []
+        self.recorder = None  # TraceRecorder when run with --record
     
     def install_test_hook(self):
         """Install keyboard hook for testing"""
@@ -48,6 +55,9 @@ class KeyboardBlockingTest:
                     return user32.CallNextHookExW(self.hooked, nCode, wParam, lParam)
                 
                 if nCode == 0:  # HC_ACTION
+                    if self.recorder:
+                        self.recorder.on_hook(wParam, ctypes.cast(lParam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents)
+                    
                     # Get virtual key code from lParam structure
                     vk_code = ctypes.cast(lParam, ctypes.POINTER(wintypes.DWORD))[0]
                     
@@ -207,6 +217,9 @@ def main():
     
     # Initialize test
     test = KeyboardBlockingTest()
+    record_path = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv[1:-1] else None
+    if record_path:
+        test.recorder = TraceRecorder()
     
     if not test.install_test_hook():
         print("❌ Failed to install keyboard hook!")
@@ -243,6 +256,9 @@ def main():
     
     finally:
         test.uninstall()
+        if record_path:
+            test.recorder.save(record_path, "Recorded with test_keyboard_blocking.py")
+            print(f"⌨️  {len(test.recorder.events)} key events saved to {record_path}")
         print("✅ Test completed successfully!")
         input("\nPress Enter to exit...")
 
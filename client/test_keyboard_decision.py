@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Keyboard Decision Test
+Tests the table-driven key decisions of the keyboard hooks (modifier
+tracking from key events, the lock/session tables), the hook log that
+keeps logging out of the hook callback, the hook health watchdog and the
+recorded key traces replayed against their golden decisions.
+Pure Python - runs on Linux/Windows without installing a hook.
+"""
+
+import os
+import sys
+import time
+import logging
+import traceback
+from datetime import datetime
+
+from keyboard_decision import (
+    KeyDecisionEngine, KeyTable, KeyRule, EnhancedKeyDecision, MOD_ALT, MOD_CTRL, MOD_SHIFT,
+    WM_KEYDOWN, WM_KEYUP, WM_SYSKEYDOWN, WM_SYSKEYUP, VK_TAB, VK_ESCAPE, VK_F4, VK_LWIN,
+)
+from hook_log import HookChannel, HookLog
+from hook_health import HookHealth, HookWatchdog, KBDLLHOOKSTRUCT, PROBE_VK, PROBE_EXTRA_INFO
+from key_trace import (
+    KeyEvent, KeyState, TraceError, TraceRecorder, REPLAY_TARGETS, LLKHF_INJECTED,
+    parse_trace, format_event, decide_trace, replay, find_traces, load_trace, load_golden, diff_decisions,
+)
+
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+
+VK_LSHIFT, VK_RSHIFT, VK_LCONTROL, VK_LMENU = 0xA0, 0xA1, 0xA2, 0xA4
+
+
+def press(engine, *vks):
+    """Key-down every vk in order; returns the decision for the last one"""
+    decision = None
+    for vk in vks:
+        decision = engine.on_key(vk, True)
+    return decision
+
+
+def release(engine, *vks):
+    for vk in vks:
+        engine.on_key(vk, False)
+
+
+def test_lock_table_blocks_escape_combinations():
+    """Lock mode blocks Alt+Tab, Alt+F4, Windows keys and the Ctrl+Esc family"""
+    engine = KeyDecisionEngine(mode='lock')
+    assert press(engine, VK_LMENU, VK_TAB) == 'Alt+Tab'
+    assert press(engine, VK_F4) == 'Alt+F4'
+    release(engine, VK_LMENU)
+    assert press(engine, VK_TAB) is None and press(engine, VK_F4) is None
+
+    assert press(engine, VK_LCONTROL, VK_ESCAPE) == 'Ctrl+Esc'
+    assert press(engine, VK_LSHIFT, VK_ESCAPE) == 'Ctrl+Shift+Esc'
+    release(engine, VK_LCONTROL, VK_LSHIFT)
+
+    assert press(engine, VK_LWIN) == 'Windows key'
+    assert press(engine, ord('L')) == 'Windows+L'  # Win is tracked even though its key-down was blocked
+    release(engine, VK_LWIN)
+    assert press(engine, ord('L')) is None
+
+
+def test_session_table_only_blocks_task_manager():
+    """Gaming session: Alt+Tab & co. pass, Ctrl+Shift+Esc does not"""
+    engine = KeyDecisionEngine(mode='session')
+    assert press(engine, VK_LMENU, VK_TAB) is None
+    release(engine, VK_LMENU)
+    assert press(engine, VK_LWIN) is None
+    release(engine, VK_LWIN)
+    assert press(engine, VK_LCONTROL, VK_ESCAPE) is None
+    assert press(engine, VK_RSHIFT, VK_ESCAPE) == 'Ctrl+Shift+Esc'
+
+    engine.set_mode('lock')
+    release(engine, VK_LCONTROL, VK_RSHIFT)
+    assert press(engine, VK_LMENU, VK_TAB) == 'Alt+Tab'
+
+
+def test_modifier_state_tracks_both_sides():
+    """Releasing one Shift keeps the other held; key-ups are never blocked"""
+    engine = KeyDecisionEngine(mode='session')
+    press(engine, VK_LCONTROL, VK_LSHIFT, VK_RSHIFT)
+    release(engine, VK_LSHIFT)
+    assert engine.modifiers == MOD_CTRL | MOD_SHIFT
+    assert press(engine, VK_ESCAPE) == 'Ctrl+Shift+Esc'
+    assert engine.on_key(VK_ESCAPE, False) is None
+    release(engine, VK_RSHIFT)
+    assert engine.modifiers == MOD_CTRL
+
+    engine.reset()
+    assert engine.modifiers == 0 and engine.held == 0
+
+
+def test_hook_messages_decode():
+    """Raw WM_*KEY* wParams drive the same state machine"""
+    engine = KeyDecisionEngine(mode='lock')
+    assert engine.on_message(WM_SYSKEYDOWN, VK_LMENU) is None
+    assert engine.on_message(WM_SYSKEYDOWN, VK_TAB) == 'Alt+Tab'
+    assert engine.on_message(WM_SYSKEYUP, VK_TAB) is None
+    assert engine.on_message(WM_KEYUP, VK_LMENU) is None
+    assert engine.on_message(WM_KEYDOWN, VK_TAB) is None
+    assert engine.on_message(0x0200, VK_TAB) is None  # not a key message
+
+
+def test_mode_switch_is_gapless():
+    """Switching tables keeps held modifiers and costs microseconds"""
+    engine = KeyDecisionEngine(mode='session')
+    assert press(engine, VK_LMENU, VK_TAB) is None  # Alt+Tab allowed in a session
+
+    started = time.perf_counter()
+    for _ in range(10000):
+        engine.set_mode('lock')
+        engine.set_mode('session')
+    switch_us = (time.perf_counter() - started) / 20000 * 1e6
+    engine.set_mode('lock')
+
+    # Alt is still down from before the switch - the very next Tab is blocked
+    assert press(engine, VK_TAB) == 'Alt+Tab'
+    assert engine.mode == 'lock'
+    assert switch_us < 50, f"mode switch took {switch_us:.1f} us"
+    print(f"✅ mode switch: {switch_us:.2f} us")
+
+
+def test_more_specific_rule_labels_shared_slots():
+    """A rule applies with extra modifiers; the rule with more modifiers wins a slot"""
+    table = KeyTable('custom', [
+        KeyRule(MOD_CTRL | MOD_SHIFT, VK_ESCAPE, 'Task Manager'),
+        KeyRule(MOD_CTRL, VK_ESCAPE, 'Start menu'),
+    ])
+    assert table.lookup(MOD_CTRL, VK_ESCAPE) == 'Start menu'
+    assert table.lookup(MOD_CTRL | MOD_SHIFT, VK_ESCAPE) == 'Task Manager'
+    assert table.lookup(MOD_CTRL | MOD_SHIFT | MOD_ALT, VK_ESCAPE) == 'Task Manager'
+    assert table.lookup(MOD_ALT, VK_ESCAPE) is None
+    assert table.blocked_count() == 8
+
+    try:
+        KeyTable('bad', [KeyRule(0, 300, 'nope')])
+        raise AssertionError("vk out of range accepted")
+    except ValueError:
+        pass
+
+
+class LogCapture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_hook_channel_counts_and_drops():
+    """The ring hands counts to the drainer and overwrites (and counts) what it can't hold"""
+    channel = HookChannel('test', 'Test', capacity=8)
+    for _ in range(3):
+        channel.record('Alt+Tab')
+    channel.record('Alt+F4')
+    assert channel.drain() == ({'Alt+Tab': 3, 'Alt+F4': 1}, 0)
+    assert channel.drain() == ({}, 0)
+
+    for _ in range(20):
+        channel.record('Windows key')
+    counts, dropped = channel.drain()
+    assert counts == {'Windows key': 8} and dropped == 12
+    assert channel.stats() == {'recorded': 24, 'dropped': 12, 'by_label': {'Alt+Tab': 3, 'Alt+F4': 1, 'Windows key': 8}}
+
+    try:
+        HookChannel('bad', 'Bad', capacity=100)
+        raise AssertionError("non power-of-two capacity accepted")
+    except ValueError:
+        pass
+
+
+def test_hook_log_summarises_in_background():
+    """The drainer logs one aggregated line per combination; recording stays O(1)"""
+    capture = LogCapture()
+    hook_logger = logging.getLogger('hook_log')
+    hook_logger.addHandler(capture)
+    previous_level = hook_logger.level
+    hook_logger.setLevel(logging.DEBUG)
+    log = HookLog(interval=0.05)
+    try:
+        channel = log.channel('test_keyboard', "🔒 Lock screen")
+        started = time.perf_counter()
+        for _ in range(100000):
+            channel.record('Alt+Tab')
+        record_ns = (time.perf_counter() - started) / 100000 * 1e9
+        channel.record('Alt+F4')
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and not any('Alt+F4' in m for m in capture.messages):
+            time.sleep(0.02)
+    finally:
+        log.stop()
+        hook_logger.removeHandler(capture)
+        hook_logger.setLevel(previous_level)
+
+    summaries = [m for m in capture.messages if m.startswith("🔒 Lock screen:")]
+    assert any(m.startswith("🔒 Lock screen: Alt+F4 blocked 1×") for m in summaries), summaries
+    assert len(summaries) <= 3, f"one line per combination expected, got {summaries}"
+    assert not log.thread
+    print(f"✅ hook-side record: {record_ns:.0f} ns")
+
+
+def test_hook_health_histogram_and_probe():
+    """Callback durations land in the histogram; only our tagged probe counts as one"""
+    health = HookHealth()
+    for _ in range(50):
+        health.record(time.perf_counter())
+    health.record(time.perf_counter() - 0.5)  # one callback over LowLevelHooksTimeout
+    stats = health.stats()
+    assert stats['callbacks'] == 51 and stats['slow_callbacks'] == 1
+    assert stats['callback_latency']['max_ms'] >= 500 and stats['callback_latency']['p50_ms'] < 1
+    assert 'p99' in health.format_summary()
+
+    assert health.is_probe(KBDLLHOOKSTRUCT(PROBE_VK, 0, 0x10, 0, PROBE_EXTRA_INFO))
+    assert not health.is_probe(KBDLLHOOKSTRUCT(PROBE_VK, 0, 0, 0, 0))
+    assert not health.is_probe(KBDLLHOOKSTRUCT(0x41, 0, 0x10, 0, PROBE_EXTRA_INFO))
+
+
+def test_watchdog_probes_idle_hook_and_reinstalls_lost_one():
+    """An idle hook is probed; a probe that never arrives triggers a reinstall"""
+    health = HookHealth()
+    alive = [True]
+    reinstalled = []
+
+    def send_probe():
+        if alive[0]:
+            health.on_probe()  # what the hook callback does with the probe
+
+    watchdog = HookWatchdog(health, lambda: reinstalled.append(1), send_probe, idle_after=0.05, probe_timeout=0.05)
+    assert watchdog.tick() == 'ok'  # just installed
+    health.record(time.perf_counter())
+    assert watchdog.tick() == 'ok'  # real key events - no probe needed
+
+    time.sleep(0.06)
+    assert watchdog.tick() == 'probing'
+    assert watchdog.tick() == 'ok' and not reinstalled
+
+    alive[0] = False  # Windows removed the hook
+    time.sleep(0.06)
+    assert watchdog.tick() == 'probing'
+    assert watchdog.tick() == 'probing'  # still within probe_timeout
+    time.sleep(0.06)
+    assert watchdog.tick() == 'reinstalled' and reinstalled == [1]
+    assert health.reinstalls == 1 and health.probes_sent == 2 and health.probes_seen == 1
+    assert watchdog.tick() == 'ok'  # the new hook gets a full idle period
+
+    quiet = HookWatchdog(HookHealth(), lambda: reinstalled.append(2), send_probe)
+    time.sleep(0.06)
+    assert quiet.tick() == 'ok' and quiet.health.probes_sent == 0, "the probe must be opt-in"
+
+
+def test_trace_format_and_recorder():
+    """Trace lines parse back to the events they were written from; the recorder reads the hook struct"""
+    events = parse_trace([
+        "# Alt+Tab",
+        "0.000 down 0xA4",
+        "85.120 down 0x09   # blocked",
+        "",
+        "950 up 0x97 injected",
+    ])
+    assert events == [KeyEvent(0.0, 0xA4, True, False), KeyEvent(85.12, 0x09, True, False),
+                      KeyEvent(950.0, 0x97, False, True)], events
+    assert parse_trace(format_event(event) for event in events) == events
+    for bad in ("1.0 press 0x41", "1.0 down 0x141", "1.0 down 0x41 typed", "down 0x41"):
+        try:
+            parse_trace([bad])
+            raise AssertionError(f"{bad!r} should not parse")
+        except TraceError:
+            pass
+
+    recorder = TraceRecorder()
+    recorder.on_hook(WM_SYSKEYDOWN, KBDLLHOOKSTRUCT(vkCode=VK_LMENU, time=5000))
+    recorder.on_hook(WM_KEYUP, KBDLLHOOKSTRUCT(vkCode=PROBE_VK, flags=LLKHF_INJECTED, time=5040))
+    recorder.on_hook(0x0200, KBDLLHOOKSTRUCT(vkCode=0x41, time=5050))  # not a key message
+    assert recorder.events == [KeyEvent(0, VK_LMENU, True, False), KeyEvent(40, PROBE_VK, False, True)], recorder.events
+
+
+def test_legacy_blocker_rules_replay_headless():
+    """EnhancedKeyboardBlocker's rules with emulated async key state"""
+    state = KeyState()
+    state.update(VK_LCONTROL, True)
+    state.update(0xA5, True)  # right Alt also sets VK_MENU
+    assert state(0x12) and state(0x11)
+    state.update(0xA5, False)
+    assert not state(0x12) and state(0x11)
+    state.update(VK_LCONTROL, False)
+
+    decision = EnhancedKeyDecision()
+    assert decision.on_message(WM_KEYDOWN, 0x5B, True, state) == "Windows key"
+    assert decision.on_message(WM_KEYDOWN, 0x41, True, state) == "Windows key"  # anything while Win is held
+    assert decision.on_message(WM_KEYUP, 0x5B, True, state) == "Windows key"  # key-ups are blocked too
+    assert decision.on_message(WM_KEYDOWN, VK_ESCAPE, True, state) is None  # Ctrl is not tracked from state
+    decision.on_message(WM_KEYDOWN, VK_LCONTROL, True, state)
+    state.update(VK_LSHIFT, True)
+    assert decision.on_message(WM_KEYDOWN, VK_ESCAPE, True, state) == "Ctrl+Shift+Esc"
+    assert decision.on_message(WM_KEYDOWN, VK_ESCAPE, False, state) is None  # MINIMAL mode
+
+    # A blocked key-down never reaches the async state (Shift stays up for the next key),
+    # while the engines track the modifier from the hook's own events
+    events = [KeyEvent(0, VK_LWIN, True, False), KeyEvent(1, VK_LSHIFT, True, False),
+              KeyEvent(2, VK_LWIN, False, False), KeyEvent(3, VK_LCONTROL, True, False),
+              KeyEvent(4, VK_ESCAPE, True, False)]
+    assert decide_trace('enhanced_keyboard_blocker/strict', events) == ["Windows key"] * 3 + [None, None]
+    assert decide_trace('keyboard_blocker/lock', events)[-1] == 'Ctrl+Shift+Esc'
+    events = [KeyEvent(0, VK_LWIN, True, False), KeyEvent(1, 0x44, True, False)]
+    assert decide_trace('keyboard_blocker/lock', events) == ['Windows key', 'Windows+D']
+    assert decide_trace('keyboard_blocker/lock', [KeyEvent(0, PROBE_VK, True, True)]) == ['probe']
+
+
+def test_recorded_traces_match_golden():
+    """Every recorded trace replays to its golden decisions on every blocker"""
+    traces = find_traces(TRACE_DIR)
+    assert traces, f"No traces in {TRACE_DIR}"
+    for path in traces:
+        events = load_trace(path)
+        golden = load_golden(path)
+        assert set(golden) == set(REPLAY_TARGETS), f"{path}: golden file covers {sorted(golden)}"
+        for target in REPLAY_TARGETS:
+            result = replay(target, events, rounds=1)
+            lines = diff_decisions(events, golden[target], result.decisions)
+            assert not lines, f"{os.path.basename(path)} {target}: " + "; ".join(lines[:5])
+            assert result.events_per_sec > 0 and result.latency_ns['count'] == len(events)
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Keyboard Decision Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Lock table", test_lock_table_blocks_escape_combinations),
+        ("Session table", test_session_table_only_blocks_task_manager),
+        ("Modifier tracking", test_modifier_state_tracks_both_sides),
+        ("Hook messages", test_hook_messages_decode),
+        ("Gapless mode switch", test_mode_switch_is_gapless),
+        ("Rule specificity", test_more_specific_rule_labels_shared_slots),
+        ("Hook ring buffer", test_hook_channel_counts_and_drops),
+        ("Hook log drainer", test_hook_log_summarises_in_background),
+        ("Hook health", test_hook_health_histogram_and_probe),
+        ("Hook watchdog", test_watchdog_probes_idle_hook_and_reinstalls_lost_one),
+        ("Trace format", test_trace_format_and_recorder),
+        ("Legacy blocker rules", test_legacy_blocker_rules_replay_headless),
+        ("Golden traces", test_recorded_traces_match_golden),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All keyboard decision tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
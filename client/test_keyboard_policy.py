@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Keyboard Policy Test
+Tests compiling security.keyboard_blocking and its per-mode profiles
+(lock screen, gaming, admin) into the key tables AdvancedKeyboardBlocker's
+hook indexes, and swapping them under a running engine. Runs on Linux/Windows.
+"""
+
+import sys
+import json
+import time
+import traceback
+from datetime import datetime
+
+from keyboard_decision import KeyDecisionEngine, MOD_ALT, MOD_CTRL, MOD_SHIFT, MOD_WIN, WM_KEYDOWN, WM_SYSKEYDOWN
+from keyboard_policy import compile_keyboard_policy, parse_combo, KEY_GROUPS
+
+VK_TAB, VK_RETURN, VK_ESCAPE, VK_F4, VK_F5, VK_F12, VK_LMENU = 0x09, 0x0D, 0x1B, 0x73, 0x74, 0x7B, 0xA4
+
+
+def test_config_enhanced_profiles():
+    """The shipped config: everything on the lock screen, games keep their F-keys, admin blocks nothing"""
+    with open('config_enhanced.json', encoding='utf-8') as f:
+        security = json.load(f)['security']
+    policy = compile_keyboard_policy(security)
+
+    assert set(policy.tables) == {'lock', 'gaming', 'admin'}
+    assert policy.lookup('lock', 0, VK_F5) == 'F5'
+    assert policy.lookup('lock', MOD_ALT, VK_TAB) == 'Alt+Tab'
+    assert policy.lookup('lock', MOD_CTRL | MOD_SHIFT, VK_ESCAPE) == 'Ctrl+Shift+Esc'
+    assert policy.lookup('lock', 0, 0x5B) == policy.lookup('lock', 0, 0x5C) == 'Windows'
+    assert policy.lookup('gaming', 0, VK_F5) is None, "F-keys belong to the game"
+    assert policy.lookup('gaming', 0, 0x2C) is None
+    assert policy.lookup('gaming', MOD_ALT, VK_F4) == 'Alt+F4'
+    assert policy.stats()['modes']['admin'] == 0
+    # Bare Tab/Esc are no longer blocked just to catch Alt+Tab/Ctrl+Esc
+    assert policy.lookup('lock', 0, VK_TAB) is None and policy.lookup('lock', 0, VK_ESCAPE) is None
+
+
+def test_flags_and_profile_lists():
+    """Top-level flags apply to every profile; a profile overrides them and adds block/allow combos"""
+    policy = compile_keyboard_policy({'keyboard_blocking': {
+        'block_alt_tab': False,
+        'profiles': {
+            'gaming': {'block_function_keys': True, 'allow': ['F12', 'Alt+F4'], 'block': ['Alt+Enter']},
+            'tournament': {'block_windows_key': False, 'block': ['Ctrl+Alt+0x41']},
+        },
+    }})
+    assert policy.lookup('lock', MOD_ALT, VK_TAB) is None
+    assert policy.lookup('gaming', 0, VK_F5) == 'F5'
+    assert policy.lookup('gaming', 0, VK_F12) is None
+    assert policy.lookup('gaming', MOD_ALT, VK_F4) is None, "allow wins over the F4 rule"
+    assert policy.lookup('gaming', MOD_CTRL, VK_F12) is None
+    assert policy.lookup('gaming', MOD_ALT | MOD_SHIFT, VK_RETURN) == 'Alt+Enter'
+    assert policy.lookup('tournament', MOD_CTRL | MOD_ALT, 0x41) == 'Ctrl+Alt+0x41'
+    assert policy.lookup('tournament', 0, 0x5B) is None
+    assert policy.flags['tournament']['block_function_keys'] is True
+
+    off = compile_keyboard_policy({'keyboard_blocking': {'enabled': False, 'profiles': {'lock': {'block': ['F1']}}}})
+    assert all(table.blocked_count() == 0 for table in off.tables.values())
+
+    assert parse_combo('ctrl + shift + esc')[0][:2] == (MOD_CTRL | MOD_SHIFT, VK_ESCAPE)
+    assert [rule.vk for rule in parse_combo('Win+Windows')] == [0x5B, 0x5C]
+    assert parse_combo('Win+Windows')[0].modifiers == MOD_WIN
+    assert all(flag.startswith('block_') for flag in KEY_GROUPS)
+
+
+def test_invalid_config_is_rejected():
+    """Malformed sections raise ValueError so a reload keeps the current policy"""
+    bad = [
+        {'keyboard_blocking': ['block_alt_tab']},
+        {'keyboard_blocking': {'block_alt_tab': 'yes'}},
+        {'keyboard_blocking': {'profiles': {'gaming': {'block': 'F1'}}}},
+        {'keyboard_blocking': {'profiles': {'gaming': {'block': ['Hyper+F1']}}}},
+        {'keyboard_blocking': {'profiles': {'gaming': {'allow': ['F99']}}}},
+        {'keyboard_blocking': {'profiles': {'gaming': {'block': ['0x1FF']}}}},
+        {'keyboard_blocking': {'profiles': {'gaming': True}}},
+    ]
+    for security in bad:
+        try:
+            compile_keyboard_policy(security)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted invalid config: {security}")
+
+
+def test_reload_swaps_tables_under_running_engine():
+    """A recompiled policy takes effect on the next key; mode and held modifiers carry over"""
+    engine = KeyDecisionEngine(compile_keyboard_policy().tables, mode='gaming')
+    assert engine.on_message(WM_SYSKEYDOWN, VK_LMENU) is None
+    assert engine.on_message(WM_SYSKEYDOWN, VK_TAB) == 'Alt+Tab'
+
+    engine.set_tables(compile_keyboard_policy({'keyboard_blocking': {'block_alt_tab': False}}).tables)
+    assert engine.mode == 'gaming'
+    assert engine.on_message(WM_SYSKEYDOWN, VK_TAB) is None, "Alt is still held after the swap"
+    engine.set_mode('lock')
+    assert engine.on_message(WM_KEYDOWN, VK_F5) == 'F5'
+    engine.set_mode('admin')
+    assert engine.on_message(WM_SYSKEYDOWN, VK_F4) is None
+
+
+def test_compile_is_fast_enough_for_reload():
+    """Compiling every profile takes well under the time of a config reload"""
+    started = time.perf_counter()
+    for _ in range(20):
+        policy = compile_keyboard_policy({'keyboard_blocking': {'profiles': {
+            f'custom{index}': {'block': [f'Ctrl+F{index % 12 + 1}']} for index in range(10)}}})
+    elapsed_ms = (time.perf_counter() - started) * 1000 / 20
+    print(f"✅ {len(policy.tables)} profiles compiled in {elapsed_ms:.2f} ms")
+    assert len(policy.tables) == 13
+    assert elapsed_ms < 500
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Keyboard Policy Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Config profiles", test_config_enhanced_profiles),
+        ("Flags and profile lists", test_flags_and_profile_lists),
+        ("Invalid config", test_invalid_config_is_rejected),
+        ("Live reload", test_reload_swaps_tables_under_running_engine),
+        ("Compile time", test_compile_is_fast_enough_for_reload),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All keyboard policy tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Process Monitoring Test
+Tests the platform independent process monitoring pieces on Linux/Windows
+without starting the GUI. Run directly or with pytest.
+"""
+
+import os
+import sys
+import time
+import errno
+import shutil
+import tempfile
+import threading
+import subprocess
+import traceback
+from datetime import datetime
+
+import psutil
+
+from exe_identity import ExecutableIdentityCache, HashBlocklist
+from process_events import (
+    ProcessEventSource, ProcConnectorSource, PollingProcessSource, create_process_event_source
+)
+from process_matcher import NameMatcher
+from process_snapshot import ProcessSnapshot, fetch_attrs
+from process_sweep import ProcessSweepService, SweepScheduler
+from process_tree import ProcessTree
+from process_terminator import TerminationEngine
+
+
+def _spawn_sleeper(seconds=2):
+    """Start a short-lived child process that the monitors can detect"""
+    return subprocess.Popen([sys.executable, '-c', f'import time; time.sleep({seconds})'])
+
+
+class EventRecorder:
+    """Collects process events by pid so tests can wait for a specific process"""
+
+    def __init__(self):
+        self.events = {}
+        self.condition = threading.Condition()
+
+    def __call__(self, event):
+        with self.condition:
+            self.events.setdefault((event.kind, event.pid), event)
+            self.condition.notify_all()
+
+    def wait_for(self, kind, pid, timeout=3.0):
+        with self.condition:
+            self.condition.wait_for(lambda: (kind, pid) in self.events, timeout)
+            return self.events.get((kind, pid))
+
+
+def test_polling_source_reports_new_process():
+    """The polling fallback reports a newly started process"""
+    source = PollingProcessSource(interval=0.05)
+    recorder = EventRecorder()
+    proc = None
+    try:
+        source.start(recorder)
+        time.sleep(0.2)  # let the first sweep record the existing processes
+        proc = _spawn_sleeper()
+        event = recorder.wait_for('start', proc.pid)
+        assert event, "polling source did not report the new process"
+        assert event.name, "polling source should report the process name"
+    finally:
+        source.stop()
+        if proc:
+            proc.kill()
+            proc.wait()
+
+
+class _OverrunSocket:
+    """Netlink socket stand-in whose receive buffer overran (spawn storm)"""
+
+    def recv(self, size):
+        raise OSError(errno.ENOBUFS, os.strerror(errno.ENOBUFS))
+
+    def send(self, data):
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def test_native_source_fails_over_to_polling():
+    """A native source that dies keeps delivering events through the polling fallback"""
+    source = ProcConnectorSource(poll_interval=0.05)
+    source.sock = _OverrunSocket()
+    recorder = EventRecorder()
+    proc = None
+    try:
+        ProcessEventSource.start(source, recorder)  # skip the netlink subscription (needs root)
+        source.thread.join(timeout=2)
+        assert source.failed and source.running, "receive error did not fail over"
+        time.sleep(0.2)
+        proc = _spawn_sleeper()
+        assert recorder.wait_for('start', proc.pid), "fallback did not report the new process"
+    finally:
+        source.stop()
+        if proc:
+            proc.kill()
+            proc.wait()
+    assert not source.failed
+
+
+def test_proc_connector_kill_latency():
+    """The netlink backend reports a new process quickly enough to kill it within 100 ms"""
+    if not ProcConnectorSource.available():
+        print("⚠️  Proc connector not available (needs Linux + root) - skipped")
+        return
+
+    source = ProcConnectorSource()
+    recorder = EventRecorder()
+    proc = None
+    try:
+        source.start(recorder)
+        time.sleep(0.1)
+        spawned_at = time.monotonic()
+        proc = _spawn_sleeper()
+        event = recorder.wait_for('start', proc.pid)
+        assert event, "proc connector did not report the new process"
+
+        proc.terminate()
+        proc.wait()
+        latency = time.monotonic() - spawned_at
+        print(f"✅ Proc connector detect latency {(event.timestamp - spawned_at) * 1000:.1f} ms, "
+              f"spawn-to-kill {latency * 1000:.1f} ms")
+        assert latency < 0.1, f"kill latency {latency * 1000:.1f} ms is over 100 ms"
+    finally:
+        source.stop()
+        if proc and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def test_snapshot_inspects_only_new_processes():
+    """A snapshot classifies a process once and reports its exit"""
+    classified = []
+    snapshot = ProcessSnapshot(attrs=['name'], classify=lambda info: classified.append(info['pid']))
+    snapshot.sweep()
+
+    proc = _spawn_sleeper()
+    try:
+        result = snapshot.sweep()
+        assert proc.pid in [entry.info['pid'] for entry in result.new], "new process not reported"
+
+        classified.clear()
+        result = snapshot.sweep()
+        assert proc.pid not in classified, "known process was classified again"
+        assert proc.pid in snapshot.entries
+    finally:
+        proc.kill()
+        proc.wait()
+
+    result = snapshot.sweep()
+    assert proc.pid in [entry.info['pid'] for entry in result.exited], "exited process not reported"
+
+
+def test_snapshot_hands_back_rechecked_processes():
+    """A process whose termination failed is reported as new until it exits"""
+    snapshot = ProcessSnapshot(attrs=['name'])
+    proc = _spawn_sleeper()
+    try:
+        snapshot.sweep()
+        assert proc.pid not in [entry.info['pid'] for entry in snapshot.sweep().new]
+        assert snapshot.recheck(proc.pid)
+        for _ in range(2):
+            new = [entry for entry in snapshot.sweep().new if entry.info['pid'] == proc.pid]
+            assert len(new) == 1 and new[0] is snapshot.entries[proc.pid], "held process not handed back"
+    finally:
+        proc.kill()
+        proc.wait()
+
+    snapshot.sweep()
+    assert proc.pid not in snapshot.held, "exited process still held"
+    assert not snapshot.recheck(proc.pid)
+
+
+def test_expensive_attrs_are_fetched_on_demand():
+    """Sweeps read names only; cmdline is read once, when a rule asks for it"""
+    snapshot = ProcessSnapshot(attrs=['name'])
+    proc = _spawn_sleeper()
+    try:
+        entry = next(entry for entry in snapshot.sweep().new if entry.info['pid'] == proc.pid)
+        assert 'cmdline' not in entry.info, "sweep read an expensive attribute"
+
+        info = fetch_attrs(entry, 'cmdline', 'name')
+        assert info['cmdline'] and info['cmdline'][0] == sys.executable
+        entry.info['cmdline'] = ['cached']
+        assert fetch_attrs(entry, 'cmdline')['cmdline'] == ['cached'], "attribute was read twice"
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_process_tree_ancestry():
+    """Launcher ancestry survives the launcher exiting; reused PIDs don't adopt older processes"""
+    tree = ProcessTree()
+    tree.add(100, 1, 'Steam.exe', created=10)
+    tree.add(200, 100, 'game.exe', created=20)
+    tree.add(300, 200, 'cmd.exe', created=30)
+    launchers = NameMatcher(['steam.exe', 'epicgameslauncher.exe'])
+
+    node, rule = tree.find_ancestor(300, launchers)
+    assert node.pid == 100 and rule == 'steam.exe'
+    assert tree.is_descendant(300, 100) and not tree.is_descendant(100, 300)
+    assert [n.pid for n in tree.descendants(100)] == [200, 300]
+
+    tree.remove(100)  # launcher stub exits, the game keeps running
+    assert 100 not in tree and tree.find_ancestor(300, launchers)
+
+    tree.add(100, 1, 'cmd.exe', created=40)  # PID reused by an unrelated process
+    assert tree.find_ancestor(300, launchers), "reuse broke the existing chain"
+    tree.add(400, 100, 'old.exe', created=35)  # claims a parent younger than itself
+    assert tree.ancestors(400) == []
+
+    for pid in (300, 200, 100, 400):
+        tree.remove(pid)
+    assert len(tree) == 0, f"exited processes left behind: {tree.nodes}"
+
+
+def test_process_tree_follows_events():
+    """The tree is seeded once and then kept current from process events"""
+    launcher = [sys.executable, '-c', 'import subprocess, sys; '
+                'subprocess.Popen([sys.executable, "-c", "import time; time.sleep(2)"]).wait()']
+    tree = ProcessTree()
+    tree.seed()
+    assert os.getpid() in tree, "seed missed the running processes"
+
+    source = PollingProcessSource(interval=0.05)
+    proc = None
+    try:
+        source.start(tree.on_event)
+        time.sleep(0.2)
+        proc = subprocess.Popen(launcher)
+        deadline = time.monotonic() + 3
+        grandchild = None
+        while time.monotonic() < deadline and grandchild is None:
+            children = psutil.Process(proc.pid).children()
+            if children and children[0].pid in tree:
+                grandchild = children[0].pid
+            time.sleep(0.05)
+        assert grandchild, "grandchild never reached the tree"
+        assert tree.is_descendant(grandchild, proc.pid) and tree.is_descendant(grandchild, os.getpid())
+
+        started = time.perf_counter()
+        for _ in range(10000):
+            tree.is_descendant(grandchild, 1)
+        print(f"✅ ancestor query: {(time.perf_counter() - started) / 10000 * 1e6:.2f} us")
+    finally:
+        if proc:
+            for child in psutil.Process(proc.pid).children(recursive=True):
+                child.kill()
+            proc.kill()
+            proc.wait()
+        source.stop()
+
+
+def test_termination_engine_batches_and_awaits():
+    """One flush terminates a whole batch; results carry the kill latency"""
+    procs = [_spawn_sleeper(30) for _ in range(5)]
+    engine = TerminationEngine(grace=2.0)
+    results = []
+    done = threading.Event()
+
+    def on_done(result):
+        results.append(result)
+        if len(results) == len(procs):
+            done.set()
+
+    try:
+        for proc in procs:
+            assert engine.submit(psutil.Process(proc.pid), 'sleeper', 'test', on_done=on_done)
+        # A process already in flight is not submitted twice
+        assert not engine.submit(psutil.Process(procs[0].pid), 'sleeper', 'test')
+        started = time.perf_counter()
+        assert engine.flush() == len(procs)
+        flush_ms = (time.perf_counter() - started) * 1000
+        assert done.wait(5), f"only {len(results)} of {len(procs)} results"
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+
+    assert sorted(r.pid for r in results) == sorted(p.pid for p in procs)
+    assert all(not r.survived and not r.escalated and r.kill_ms is not None for r in results)
+    assert all(r.killed_at >= r.detected_at and r.started_at for r in results)
+    stats = engine.stats()
+    assert stats['terminated'] == len(procs) and stats['in_flight'] == 0
+    print(f"✅ flush {flush_ms:.2f} ms, kill latency p50 {stats['kill_latency']['p50_ms']} ms")
+
+
+def test_termination_engine_escalates_stragglers():
+    """A process that ignores terminate() is killed after the grace period"""
+    if sys.platform == 'win32':
+        return  # terminate() is already TerminateProcess there
+    stubborn = subprocess.Popen([sys.executable, '-c', 'import signal, sys, time; '
+                                 'signal.signal(signal.SIGTERM, signal.SIG_IGN); print(flush=True); time.sleep(30)'],
+                                stdout=subprocess.PIPE)
+    stubborn.stdout.readline()  # SIGTERM handler installed
+    engine = TerminationEngine(grace=0.3, kill_deadline=2.0)
+    results = []
+    done = threading.Event()
+    try:
+        engine.terminate(psutil.Process(stubborn.pid), 'stubborn', 'test',
+                         on_done=lambda result: (results.append(result), done.set()))
+        assert done.wait(5), "no result for the stubborn process"
+    finally:
+        stubborn.kill()
+        stubborn.wait()
+
+    result = results[0]
+    assert result.escalated and not result.survived
+    assert result.kill_ms >= 300, f"killed before the grace period: {result.kill_ms} ms"
+    assert engine.stats()['escalated'] == 1
+
+
+def test_sweep_service_fans_out_one_enumeration():
+    """Subscribers share one enumeration per cycle; late subscribers catch up"""
+    service = ProcessSweepService(interval=0.05)
+    seen = {'first': [], 'late': []}
+    try:
+        service.subscribe('first', seen['first'].append)
+        time.sleep(0.3)
+        service.subscribe('late', seen['late'].append)
+        time.sleep(0.3)
+    finally:
+        service.unsubscribe('late')
+        service.unsubscribe('first')
+
+    assert not service.running, "service should stop with its last subscriber"
+    assert len(seen['first']) == service.sweep_count, "one delivery per enumeration"
+
+    catch_up = [entry.info['pid'] for entry in seen['late'][0].new]
+    assert os.getpid() in catch_up, "late subscriber did not get the live processes"
+
+    # After the catch-up both subscribers receive the very same sweep result
+    shared = [id(result) for result in seen['first']]
+    assert all(id(result) in shared for result in seen['late'][1:])
+
+
+def test_sweep_service_keeps_known_processes_when_attrs_grow():
+    """A subscriber asking for more attributes does not make every process new again"""
+    service = ProcessSweepService(interval=0.05)
+    seen = {'names': [], 'parents': []}
+    try:
+        service.subscribe('names', seen['names'].append)
+        time.sleep(0.3)
+        before = len(service.snapshot)
+        service.subscribe('parents', seen['parents'].append, attrs=['ppid'])
+        time.sleep(0.3)
+    finally:
+        service.unsubscribe('parents')
+        service.unsubscribe('names')
+
+    assert 'ppid' in service.attrs
+    # Only processes that really started meanwhile may show up as new
+    burst = max(len(result.new) for result in seen['names'][1:])
+    assert burst < before / 2, f"{burst} of {before} known processes reported as new again"
+    catch_up = {entry.info['pid']: entry.info for entry in seen['parents'][0].new}
+    assert catch_up[os.getpid()]['ppid'] == os.getppid(), "carried entry lacks the new attribute"
+
+
+def test_sweep_scheduler_adapts():
+    """Fast after a block and on the lock screen, backing off to the ceiling when quiet"""
+    scheduler = SweepScheduler(base=2, fast=0.5, ceiling=10, fast_sweeps=2)
+
+    quiet = [scheduler.next_interval() for _ in range(8)]
+    assert quiet[0] == 3 and quiet == sorted(quiet), f"no backoff: {quiet}"
+    assert quiet[-1] == 10, "quiet session should reach the ceiling"
+    assert scheduler.mode == 'quiet'
+
+    scheduler.note_block()
+    assert scheduler.mode == 'after_block'
+    assert [scheduler.next_interval() for _ in range(3)] == [0.5, 0.5, 2], "should return to base after the burst"
+
+    scheduler.set_locked(True)
+    assert [scheduler.next_interval() for _ in range(3)] == [0.5] * 3, "lock screen keeps the fast interval"
+    scheduler.set_locked(False)
+    assert scheduler.next_interval() == 3
+
+
+def test_sweep_service_reports_interval_and_cost():
+    """The service follows the performance config and reports per-sweep CPU cost"""
+    service = ProcessSweepService()
+    service.configure({'security_check_interval': 0.2, 'security_check_interval_min': 0.05,
+                       'security_check_interval_max': 1})
+    try:
+        service.subscribe('stats', lambda result: None)
+        time.sleep(0.3)
+        service.note_block()
+        assert service.interval == 0.05, "a block should switch to the fast interval"
+        time.sleep(0.3)
+        stats = service.stats()
+    finally:
+        service.unsubscribe('stats')
+
+    assert stats['sweeps'] >= 3, stats
+    assert stats['last_sweep_ms'] > 0 and stats['avg_sweep_cpu_ms'] > 0, stats
+    assert stats['mode'] in ('after_block', 'normal', 'quiet'), stats
+    print(f"✅ Sweep stats: {stats}")
+
+
+def test_identity_cache_hashes_once_and_persists():
+    """Executables are hashed once per (path, size, mtime) and the table survives a restart"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        exe = os.path.join(tmpdir, 'tool.exe')
+        with open(exe, 'wb') as f:
+            f.write(b'MZ' + b'\0' * 4096)
+        cache_path = os.path.join(tmpdir, 'cache.json')
+
+        cache = ExecutableIdentityCache(cache_path)
+        assert cache.lookup(exe) is None, "unhashed exe must not block the caller"
+        done = threading.Event()
+        cache.hash_async(exe, lambda digest: done.set())
+        assert done.wait(5), "hash was not computed"
+        digest = cache.lookup(exe)
+        assert digest and cache.hashed_count == 1
+        cache.hash_async(exe)
+        assert cache.hashed_count == 1, "known exe was hashed again"
+
+        cache.save()
+        reloaded = ExecutableIdentityCache(cache_path)
+        assert reloaded.lookup(exe) == digest, "cache did not persist"
+
+        with open(exe, 'ab') as f:
+            f.write(b'patched')
+        assert reloaded.lookup(exe) is None, "changed file must be re-hashed"
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_hash_blocklist_catches_renamed_copy():
+    """A copy of a blocked binary under another name is recognised by content"""
+    tmpdir = tempfile.mkdtemp()
+    proc = None
+    try:
+        blocked = shutil.which('sleep') or sys.executable
+        renamed = os.path.join(tmpdir, 'game.exe')
+        shutil.copy2(blocked, renamed)
+
+        blocklist = HashBlocklist(ExecutableIdentityCache(path=None))
+        blocklist.add_file(blocked, 'sleep')
+        deadline = time.monotonic() + 5
+        while not len(blocklist) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(blocklist) == 1, "blocked binary was not hashed"
+
+        args = [renamed, '5'] if blocked != sys.executable else [renamed, '-c', 'import time; time.sleep(5)']
+        proc = subprocess.Popen(args)
+        exe = psutil.Process(proc.pid).exe()
+
+        matched = threading.Event()
+        assert blocklist.match(exe, on_late_match=lambda rule: matched.set()) is None
+        assert matched.wait(5), "renamed copy was not matched after hashing"
+        assert blocklist.match(exe) == 'sleep', "second lookup should hit the cache"
+    finally:
+        if proc:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(tmpdir)
+
+
+def test_name_matcher():
+    """Exact, suffix and glob patterns match whole names only"""
+    matcher = NameMatcher(['agent.exe', 'TaskMgr.exe', '*webhelper.exe', 'vmware*.exe', 'procexp??.exe'])
+
+    assert matcher.match('agent.exe') == 'agent.exe'
+    assert matcher.match('useragent.exe') is None, "'agent.exe' must not match as a substring"
+    assert matcher.match('TASKMGR.EXE') == 'taskmgr.exe'
+    assert matcher.match('steamwebhelper.exe') == '*webhelper.exe'
+    assert matcher.match('vmware-vmx.exe') == 'vmware*.exe'
+    assert matcher.match('procexp64.exe') == 'procexp??.exe'
+    assert matcher.match('procexp.exe') is None
+    assert matcher.match('') is None
+
+    match_all = NameMatcher(['*', 'taskmgr.exe', '*.exe'])
+    assert match_all.match('abc') == '*'
+    assert match_all.match('abc.exe') == '*.exe', "a longer suffix wins over '*'"
+    assert match_all.match('taskmgr.exe') == 'taskmgr.exe'
+    assert NameMatcher(['*']).match('abc.exe') == '*'
+
+
+def test_event_source_factory():
+    """The factory always returns a working backend and honours 'polling'"""
+    assert isinstance(create_process_event_source('polling'), PollingProcessSource)
+    source = create_process_event_source()
+    assert source.available(), f"factory returned unavailable backend {source.name}"
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Process Monitoring Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Polling event source", test_polling_source_reports_new_process),
+        ("Fail-over to polling", test_native_source_fails_over_to_polling),
+        ("Proc connector latency", test_proc_connector_kill_latency),
+        ("Incremental snapshot", test_snapshot_inspects_only_new_processes),
+        ("Recheck after failed termination", test_snapshot_hands_back_rechecked_processes),
+        ("On-demand attributes", test_expensive_attrs_are_fetched_on_demand),
+        ("Process tree ancestry", test_process_tree_ancestry),
+        ("Process tree from events", test_process_tree_follows_events),
+        ("Batched termination", test_termination_engine_batches_and_awaits),
+        ("Termination escalation", test_termination_engine_escalates_stragglers),
+        ("Shared sweep service", test_sweep_service_fans_out_one_enumeration),
+        ("Attribute growth", test_sweep_service_keeps_known_processes_when_attrs_grow),
+        ("Sweep scheduler", test_sweep_scheduler_adapts),
+        ("Sweep interval and cost", test_sweep_service_reports_interval_and_cost),
+        ("Executable identity cache", test_identity_cache_hashes_once_and_persists),
+        ("Renamed binary detection", test_hash_blocklist_catches_renamed_copy),
+        ("Name matcher", test_name_matcher),
+        ("Event source factory", test_event_source_factory),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All process monitoring tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
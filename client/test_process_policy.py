@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Process Policy Test
+Tests compiling security.process_restrictions and the per-profile lists
+into the immutable tables ProcessMonitor uses. Runs on Linux/Windows.
+"""
+
+import sys
+import json
+import time
+import traceback
+from datetime import datetime
+
+from process_policy import compile_process_policy
+from benchmark_process_policy import make_security
+
+
+def test_flags_from_config_enhanced():
+    """The shipped config blocks system tools but no longer blocks browsers"""
+    with open('config_enhanced.json', encoding='utf-8') as f:
+        security = json.load(f)['security']
+    policy = compile_process_policy(security)
+
+    assert policy.match('TaskMgr.exe') == 'taskmgr.exe'
+    assert policy.label('taskmgr.exe') == 'Task Manager'
+    assert policy.match('powershell.exe') and policy.match('code.exe')
+    for name in ('chrome.exe', 'firefox.exe', 'msedge.exe', 'explorer.exe', 'steam.exe'):
+        assert policy.match(name) is None, f"{name} should not be blocked"
+
+
+def test_flags_switch_categories():
+    """Each flag adds or removes its whole category"""
+    policy = compile_process_policy({'process_restrictions': {'block_browsers_admin': True, 'block_dev_tools': False}})
+    assert policy.match('chrome.exe') == 'chrome.exe'
+    assert policy.match('code.exe') is None and policy.match('devenv.exe') is None
+
+
+def test_profile_lists():
+    """Profile block/allow patterns and hash rules; allow wins over block"""
+    digest = 'ab' * 32
+    policy = compile_process_policy({
+        'process_profile': 'kids',
+        'process_profiles': {'kids': {
+            'block': ['*cheat.exe', 'mine??.exe'],
+            'allow': ['cmd.exe'],
+            'block_hashes': {digest.upper(): 'cheatengine.exe'},
+            'detect_renamed_tools': True,
+        }},
+    })
+    assert policy.profile == 'kids'
+    assert policy.match('aimcheat.exe') == '*cheat.exe'
+    assert policy.match('mine42.exe') == 'mine??.exe'
+    assert policy.match('cmd.exe') is None, "allow list should override the category"
+    assert policy.hash_rules[digest] == 'cheatengine.exe'
+    assert 'cmd.exe' not in policy.system_tools and 'taskmgr.exe' in policy.system_tools
+    assert policy.detect_renamed_tools
+    default = compile_process_policy()
+    assert default.system_tools == () and not default.detect_renamed_tools, "renamed-tool hashing is opt-in"
+
+
+def test_invalid_config_is_rejected():
+    """Malformed sections raise ValueError so a reload keeps the current policy"""
+    bad = [
+        {'process_profile': 'missing'},
+        {'process_profiles': {'default': {'block': 'cmd.exe'}}},
+        {'process_profiles': {'default': {'block_hashes': {'not-a-hash': 'x'}}}},
+        {'process_restrictions': ['block_task_manager']},
+        {'process_profiles': {'default': {'detect_renamed_tools': 'yes'}}},
+    ]
+    for security in bad:
+        try:
+            compile_process_policy(security)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted invalid config: {security}")
+
+
+def test_policies_are_immutable_snapshots():
+    """Every compile is a new versioned policy; tables cannot be changed in place"""
+    first, second = compile_process_policy(), compile_process_policy()
+    assert second.version > first.version
+    try:
+        first.labels['cmd.exe'] = 'changed'
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("labels should be read-only")
+    try:
+        first.extra = 1
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("policy should not grow attributes")
+
+
+def test_compile_10k_rules():
+    """A 10k-rule policy compiles fast enough for a live reload"""
+    security = make_security(10000)
+    started = time.perf_counter()
+    policy = compile_process_policy(security)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"✅ 10k rules compiled in {elapsed_ms:.1f} ms")
+    assert policy.match('tool0.exe') or policy.match('my_helper1.exe') or policy.match('cheat2_v1.exe')
+    assert elapsed_ms < 5000
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Process Policy Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Config flags", test_flags_from_config_enhanced),
+        ("Category flags", test_flags_switch_categories),
+        ("Profile lists", test_profile_lists),
+        ("Invalid config", test_invalid_config_is_rejected),
+        ("Immutable policies", test_policies_are_immutable_snapshots),
+        ("10k-rule compile", test_compile_10k_rules),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All process policy tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Security Notification Test
+Tests the bounded, coalescing notification queue the blockers post their
+warnings to. Uses a fake clock, runs without a GUI on Linux/Windows.
+"""
+
+import sys
+import time
+import traceback
+from datetime import datetime
+
+from security_notifications import NotificationQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_repeated_warnings_are_coalesced():
+    """Spamming the same blocked tool produces one notice with a count"""
+    clock = FakeClock()
+    notifications = NotificationQueue(clock=clock)
+    for _ in range(5):
+        notifications.post("🔒 NetCafe Security", "Task Manager blocked", key='taskmgr.exe')
+
+    notice = notifications.next_notice()
+    assert notice and notice.count == 5, "warnings were not coalesced"
+    assert '×5' in notice.text
+    assert notifications.next_notice() is None
+
+
+def test_toasts_are_rate_limited():
+    """Different warnings are spaced by min_interval"""
+    clock = FakeClock()
+    notifications = NotificationQueue(min_interval=2.0, clock=clock)
+    notifications.post("🔒", "cmd blocked", key='cmd.exe')
+    notifications.post("🔒", "regedit blocked", key='regedit.exe')
+
+    assert notifications.next_notice().key == 'cmd.exe'
+    assert notifications.next_notice() is None, "second toast came too early"
+    clock.advance(2.0)
+    assert notifications.next_notice().key == 'regedit.exe'
+
+
+def test_same_warning_held_for_coalesce_window():
+    """A warning shown recently is held back and folded until its window passes"""
+    clock = FakeClock()
+    notifications = NotificationQueue(min_interval=0, coalesce_window=10.0, clock=clock)
+    notifications.post("🔒", "cmd blocked", key='cmd.exe')
+    assert notifications.next_notice()
+
+    clock.advance(1)
+    notifications.post("🔒", "cmd blocked", key='cmd.exe')
+    notifications.post("🔒", "cmd blocked", key='cmd.exe')
+    assert notifications.next_notice() is None, "same warning shown again inside the window"
+
+    clock.advance(9)
+    notice = notifications.next_notice()
+    assert notice and notice.count == 2
+
+
+def test_queue_is_bounded_and_never_blocks():
+    """Posting is constant time and excess distinct warnings are dropped"""
+    notifications = NotificationQueue(max_pending=3)
+    started = time.perf_counter()
+    for i in range(10000):
+        notifications.post("🔒", f"tool {i % 10} blocked")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    assert len(notifications) == 3
+    assert notifications.stats()['dropped'] > 0
+    print(f"✅ 10000 posts in {elapsed_ms:.1f} ms")
+    assert elapsed_ms < 1000
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Security Notification Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Coalescing", test_repeated_warnings_are_coalesced),
+        ("Rate limiting", test_toasts_are_rate_limited),
+        ("Coalesce window", test_same_warning_held_for_coalesce_window),
+        ("Bounded queue", test_queue_is_bounded_and_never_blocks),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All security notification tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
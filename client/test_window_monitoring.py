@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+🧪 NetCafe Client - Window Monitoring Test
+Tests the window snapshot and the event-driven window watcher used by the
+folder/explorer blockers against the fake window backend, so it runs on
+Linux/Windows without a desktop.
+"""
+
+import sys
+import time
+import traceback
+from datetime import datetime
+
+from window_events import FakeWindowEventSource, WindowEventSource, WindowWatcher, classify_window
+from window_snapshot import FakeWindowBackend, WindowSnapshot, WindowInfo
+
+
+def _desktop(explorer_pids=(100, 101, 102), other_windows=50):
+    """Fake desktop with one folder window per explorer.exe plus unrelated windows"""
+    backend = FakeWindowBackend()
+    backend.add_window(1, 'Program Manager', 'Progman')
+    for pid in explorer_pids:
+        backend.add_window(pid, 'Downloads', 'CabinetWClass')
+    for i in range(other_windows):
+        backend.add_window(1000 + i, f'Game window {i}', 'UnityWndClass')
+    backend.add_window(2000, 'Save As', '#32770')
+    return backend
+
+
+def test_snapshot_indexes_by_pid_and_class():
+    """One enumeration answers per-pid and per-class questions"""
+    backend = _desktop()
+    snapshot = WindowSnapshot(backend)
+    snapshot.refresh()
+
+    assert backend.enum_count == 1
+    assert [w.class_name for w in snapshot.for_pid(101)] == ['CabinetWClass']
+    assert snapshot.for_pid(4242) == []
+    assert len(snapshot.of_class('CabinetWClass', 'ExploreWClass')) == 3
+    assert [w.title for w in snapshot.of_class('#32770')] == ['Save As']
+    assert len(snapshot) == 55
+
+
+def test_snapshot_is_shared_within_max_age():
+    """Checks within max_age of each other reuse one EnumWindows pass"""
+    backend = _desktop()
+    snapshot = WindowSnapshot(backend)
+
+    for pid in (100, 101, 102):
+        snapshot.refresh(max_age=10)
+        snapshot.for_pid(pid)
+    assert backend.enum_count == 1, f"expected one enumeration, got {backend.enum_count}"
+
+    time.sleep(0.02)
+    assert snapshot.refresh(max_age=0.01), "stale snapshot should be refreshed"
+    assert backend.enum_count == 2
+
+
+def test_snapshot_close_updates_indexes():
+    """Closed windows go to the backend and disappear from the indexes"""
+    backend = _desktop()
+    snapshot = WindowSnapshot(backend)
+    snapshot.refresh()
+
+    for window in snapshot.of_class('CabinetWClass'):
+        snapshot.close(window)
+
+    assert len(backend.closed) == 3
+    assert snapshot.of_class('CabinetWClass') == []
+    assert snapshot.for_pid(100) == []
+    snapshot.refresh()
+    assert snapshot.of_class('CabinetWClass') == [], "backend still lists closed windows"
+
+
+def _wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return predicate()
+
+
+def test_classify_window():
+    """Folder windows and file dialogs are blocked, everything else is left alone"""
+    assert classify_window(WindowInfo(1, 1, 'Downloads', 'CabinetWClass'))
+    assert classify_window(WindowInfo(1, 1, '', 'ExploreWClass'))
+    assert classify_window(WindowInfo(1, 1, 'Save As', '#32770'))
+    assert classify_window(WindowInfo(1, 1, 'Error', '#32770')) is None
+    assert classify_window(WindowInfo(1, 1, 'Open world', 'UnityWndClass')) is None
+
+
+def test_watcher_closes_windows_without_enumerating():
+    """New folder windows and dialogs are closed within milliseconds, with no EnumWindows"""
+    backend = FakeWindowBackend()
+    source = FakeWindowEventSource(backend)
+    closed = []
+    watcher = WindowWatcher(source, backend, on_close=lambda window, reason, latency: closed.append(window.hwnd))
+    watcher.start()
+    try:
+        folder = source.show_window(100, 'Documents', 'CabinetWClass')
+        game = source.show_window(200, 'Game', 'UnityWndClass')
+        dialog = source.show_window(200, '', '#32770')  # titled after creation
+        source.rename_window(dialog.hwnd, 'Save As')
+
+        assert _wait_until(lambda: len(closed) == 2), f"closed {closed}"
+        assert set(backend.closed) == {folder.hwnd, dialog.hwnd}
+        assert game.hwnd in backend.windows, "game window must stay open"
+        assert backend.enum_count == 0, "watcher should not enumerate windows"
+
+        worst = max(watcher.latencies) * 1000
+        print(f"✅ Window close latency: worst {worst:.2f} ms")
+        assert worst < 50, f"close latency {worst:.1f} ms"
+    finally:
+        watcher.stop()
+
+
+def test_watcher_closes_each_window_once():
+    """Repeated show events for a closed window do not close it again until destroyed"""
+    backend = FakeWindowBackend()
+    source = FakeWindowEventSource(backend)
+    watcher = WindowWatcher(source, backend)
+    watcher.start()
+    try:
+        window = source.show_window(100, 'Documents', 'CabinetWClass')
+        assert _wait_until(lambda: watcher.closed_count == 1)
+
+        backend.windows[window.hwnd] = window  # ignored WM_CLOSE, window shown again
+        source._emit('show', window.hwnd)
+        source.destroy_window(window.hwnd)
+        assert _wait_until(lambda: window.hwnd not in watcher.closed)
+        assert watcher.closed_count == 1
+    finally:
+        watcher.stop()
+
+
+def test_watcher_retries_windows_that_ignore_close():
+    """A dialog still there after retry_after is closed again; a hidden one waits for its show event"""
+    backend = FakeWindowBackend()
+    source = FakeWindowEventSource(backend)
+    watcher = WindowWatcher(source, backend, retry_after=0.05)
+    watcher.start()
+    try:
+        stubborn = source.show_window(100, 'Unsaved changes', '#32770')
+        backend.ignore_close.add(stubborn.hwnd)
+        assert _wait_until(lambda: backend.closed.count(stubborn.hwnd) >= 3), backend.closed
+        assert watcher.closed_count == 1 and watcher.retried_count >= 2
+
+        backend.ignore_close.discard(stubborn.hwnd)
+        assert _wait_until(lambda: stubborn.hwnd not in watcher.closed), "closed window still retried"
+
+        hidden = source.create_hidden_window(200, 'Open', '#32770')
+        time.sleep(0.1)
+        assert hidden.hwnd not in backend.closed, "a hidden window was closed"
+        source.reveal_window(hidden.hwnd)
+        assert _wait_until(lambda: hidden.hwnd in backend.closed)
+    finally:
+        watcher.stop()
+
+
+class _HooklessSource(WindowEventSource):
+    """A native source whose hooks cannot be set (SetWinEventHook failed)"""
+
+    name = 'hookless'
+
+    def _run(self):
+        self._fail_over(OSError("SetWinEventHook error 5"))
+
+
+def test_failed_hooks_fall_back_to_polling():
+    """Without hooks the windows are still found - by enumerating at poll_interval"""
+    backend = FakeWindowBackend()
+    backend.add_window(1, 'Program Manager', 'Progman')
+    source = _HooklessSource(poll_interval=0.05, backend=backend)
+    closed = []
+    watcher = WindowWatcher(source, backend, on_close=lambda window, reason, latency: closed.append(window.hwnd))
+    watcher.start()
+    try:
+        assert _wait_until(lambda: source.failed), "source did not fail over"
+        folder = backend.add_window(100, 'Documents', 'CabinetWClass')  # no event - only polling sees it
+        assert _wait_until(lambda: closed == [folder.hwnd]), f"closed {closed}"
+        assert 1 not in backend.closed
+    finally:
+        watcher.stop()
+    assert source.fallback is None and not source.failed
+
+
+def main():
+    print("=" * 70)
+    print("🧪 NetCafe Client - Window Monitoring Test")
+    print("=" * 70)
+    print(f"📅 Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🖥️  Python version: {sys.version}")
+    print()
+
+    tests = [
+        ("Snapshot indexes", test_snapshot_indexes_by_pid_and_class),
+        ("Shared snapshot", test_snapshot_is_shared_within_max_age),
+        ("Close updates indexes", test_snapshot_close_updates_indexes),
+        ("Window classification", test_classify_window),
+        ("Event-driven window watcher", test_watcher_closes_windows_without_enumerating),
+        ("Close once per window", test_watcher_closes_each_window_once),
+        ("Retry ignored WM_CLOSE", test_watcher_retries_windows_that_ignore_close),
+        ("Fail-over to polling", test_failed_hooks_fall_back_to_polling),
+    ]
+
+    failures = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_name}")
+        except Exception as e:
+            failures.append(f"❌ {test_name}: {e}")
+            print(f"❌ {test_name}: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} test(s) failed")
+    else:
+        print("🎉 All window monitoring tests passed!")
+
+    return len(failures)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
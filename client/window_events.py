@@ -0,0 +1,429 @@
+"""
+Window show/create event sources for the folder and file-dialog blockers.
+
+Instead of enumerating every window once a second, the blockers subscribe to
+window events and a WindowWatcher classifies each new window from a queue,
+closing File Explorer windows and Open/Save dialogs right after they appear.
+
+Backends:
+  - WinEventHookSource: SetWinEventHook on object create/show/name change
+    (out-of-context, no DLL injection) - used on Windows
+  - PollingWindowSource: enumerates the windows every `interval` seconds and
+    reports the new ones - the fallback when the hooks cannot be set
+  - FakeWindowEventSource: drives a FakeWindowBackend, for tests and the
+    benchmark on any platform
+
+Like the process event sources, a native source whose hooks fail fails over
+to polling on its own, so the blocker is never left without window checks.
+"""
+
+import sys
+import time
+import queue
+import logging
+import threading
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# kind is 'create', 'show', 'namechange' or 'destroy'; timestamp is
+# time.monotonic() when the event was received
+WindowEvent = namedtuple('WindowEvent', ['kind', 'hwnd', 'timestamp'])
+
+FOLDER_WINDOW_CLASSES = ('CabinetWClass', 'ExploreWClass')
+DIALOG_CLASS = '#32770'
+FILE_DIALOG_KEYWORDS = ('open', 'save', 'browse', 'select')
+
+
+def classify_window(window):
+    """Return why a window must be closed, or None to leave it alone"""
+    if window.class_name in FOLDER_WINDOW_CLASSES:
+        return 'File Explorer window'
+    if window.class_name == DIALOG_CLASS:
+        title = window.title.lower()
+        if any(keyword in title for keyword in FILE_DIALOG_KEYWORDS):
+            return 'file dialog'
+    return None
+
+
+class WindowEventSource:
+    """Base class for window event backends
+
+    Backends with a worker thread implement _run(), which start() runs; it
+    calls _fail_over() if the backend cannot deliver events.
+    """
+
+    name = 'base'
+
+    def __init__(self, poll_interval=1.0, backend=None):
+        self.running = False
+        self.thread = None
+        self.callback = None
+        self.poll_interval = poll_interval  # used if the backend fails over to polling
+        self.backend = backend  # window backend the polling fallback enumerates (None = platform default)
+        self.fallback = None
+        self._fallback_lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        return False
+
+    def start(self, callback):
+        """Start delivering WindowEvent objects to callback"""
+        if self.running:
+            return
+        self.callback = callback
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"🪟 Window event source started ({self.name})")
+
+    def stop(self):
+        self.running = False
+        with self._fallback_lock:
+            fallback, self.fallback = self.fallback, None
+        if fallback:
+            fallback.stop()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        logger.info(f"🪟 Window event source stopped ({self.name})")
+
+    @property
+    def failed(self):
+        """True once the backend failed and events come from the polling fallback"""
+        return self.fallback is not None
+
+    def _fail_over(self, error):
+        """Called by a worker thread whose backend failed: deliver events by polling from now on"""
+        with self._fallback_lock:
+            if not self.running or self.fallback is not None:
+                return
+            logger.error(f"🪟 Window event source {self.name} failed ({error}) - falling back to polling")
+            self.fallback = PollingWindowSource(self.backend, interval=self.poll_interval)
+            self.fallback.start(self.callback)
+
+    def _emit(self, kind, hwnd):
+        try:
+            self.callback(WindowEvent(kind, hwnd, time.monotonic()))
+        except Exception as e:
+            logger.error(f"Window event callback error: {e}")
+
+
+# WinEvent constants (winuser.h)
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+GA_ROOT = 2
+WM_QUIT = 0x0012
+
+
+class WinEventHookSource(WindowEventSource):
+    """Windows backend: out-of-context WinEvent hooks serviced by a message loop"""
+
+    name = 'win_event_hook'
+
+    KINDS = {
+        EVENT_OBJECT_CREATE: 'create',
+        EVENT_OBJECT_DESTROY: 'destroy',
+        EVENT_OBJECT_SHOW: 'show',
+        EVENT_OBJECT_NAMECHANGE: 'namechange',
+    }
+
+    def __init__(self, poll_interval=1.0, backend=None):
+        super().__init__(poll_interval, backend)
+        self.thread_id = None
+        self._proc = None  # keep the ctypes callback alive while hooked
+
+    @classmethod
+    def available(cls):
+        return sys.platform == 'win32'
+
+    def stop(self):
+        self.running = False
+        if self.thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+        super().stop()
+        self.thread_id = None
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+            wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+        ]
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        user32.GetAncestor.restype = wintypes.HWND
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+
+        def callback(hook, event, hwnd, id_object, id_child, event_thread, event_time):
+            # Only whole top-level windows; the hook fires for every caret and menu item too
+            if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+                return
+            if event != EVENT_OBJECT_DESTROY and user32.GetAncestor(hwnd, GA_ROOT) != hwnd:
+                return
+            self._emit(self.KINDS[event], hwnd)
+
+        self._proc = WinEventProc(callback)
+        self.thread_id = kernel32.GetCurrentThreadId()
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        hooks = [
+            user32.SetWinEventHook(EVENT_OBJECT_CREATE, EVENT_OBJECT_SHOW, None, self._proc, 0, 0, flags),
+            # Dialogs are often created untitled and named right after
+            user32.SetWinEventHook(EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE, None, self._proc, 0, 0, flags),
+        ]
+        if not all(hooks):
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+            self._proc = None
+            self._fail_over(f"SetWinEventHook error {kernel32.GetLastError()}")
+            return
+
+        try:
+            msg = wintypes.MSG()
+            while self.running and user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+            self._proc = None
+
+
+class PollingWindowSource(WindowEventSource):
+    """Fallback backend: one window enumeration every `interval` seconds
+
+    Reports windows that appeared since the last enumeration as 'show' (the
+    first one reports every window) and the ones that went away as 'destroy'.
+    """
+
+    name = 'polling'
+
+    def __init__(self, backend=None, interval=1.0):
+        super().__init__(interval, backend)
+        self.interval = interval
+        self.known = set()  # hwnds seen in the last enumeration
+        self._wakeup = threading.Event()
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def start(self, callback):
+        if self.backend is None:
+            from window_snapshot import create_window_backend
+            self.backend = create_window_backend()
+        self._wakeup.clear()
+        super().start(callback)
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+        super().stop()
+
+    def _run(self):
+        while self.running:
+            try:
+                current = {window.hwnd for window in self.backend.enum_windows()}
+            except Exception as e:
+                logger.debug(f"Window enumeration error: {e}")
+                current = self.known
+            for hwnd in current - self.known:
+                self._emit('show', hwnd)
+            for hwnd in self.known - current:
+                self._emit('destroy', hwnd)
+            self.known = current
+            self._wakeup.wait(self.interval)
+
+
+class FakeWindowEventSource(WindowEventSource):
+    """Emits events for windows added to a FakeWindowBackend
+
+    Events are delivered synchronously on the caller's thread, the same way a
+    WinEvent hook calls back on its message-loop thread.
+    """
+
+    name = 'fake'
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def start(self, callback):
+        self.callback = callback
+        self.running = True
+        logger.info(f"🪟 Window event source started ({self.name})")
+
+    def stop(self):
+        self.running = False
+        logger.info(f"🪟 Window event source stopped ({self.name})")
+
+    def show_window(self, pid, title, class_name):
+        window = self.backend.add_window(pid, title, class_name)
+        if self.running:
+            self._emit('create', window.hwnd)
+            self._emit('show', window.hwnd)
+        return window
+
+    def create_hidden_window(self, pid, title, class_name):
+        window = self.backend.add_window(pid, title, class_name, visible=False)
+        if self.running:
+            self._emit('create', window.hwnd)
+        return window
+
+    def reveal_window(self, hwnd):
+        self.backend.hidden.discard(hwnd)
+        if self.running:
+            self._emit('show', hwnd)
+
+    def rename_window(self, hwnd, title):
+        window = self.backend.windows[hwnd] = self.backend.windows[hwnd]._replace(title=title)
+        if self.running:
+            self._emit('namechange', hwnd)
+        return window
+
+    def destroy_window(self, hwnd):
+        self.backend.remove_window(hwnd)
+        if self.running:
+            self._emit('destroy', hwnd)
+
+
+def create_window_event_source(poll_interval=1.0, backend=None):
+    """Return the window event source for this platform, or None to keep polling
+
+    poll_interval and backend are what the source falls back to if its
+    hooks cannot be set.
+    """
+    if WinEventHookSource.available():
+        return WinEventHookSource(poll_interval, backend)
+    return None
+
+
+class WindowWatcher:
+    """Classifies windows from a WindowEventSource on a worker thread and closes blocked ones
+
+    The event callback only queues the event, so the hook thread is never
+    held up by cross-process calls for window titles and classes. WM_CLOSE
+    is only a request: a window still there `retry_after` seconds later is
+    closed again, like the old polling loop re-closed it every cycle.
+    """
+
+    def __init__(self, source, backend, classify=classify_window, on_close=None, max_queue=1024, retry_after=1.0):
+        """on_close(window, reason, latency) is called after each close; latency in seconds"""
+        self.source = source
+        self.backend = backend
+        self.classify = classify
+        self.on_close = on_close
+        self.retry_after = retry_after
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = {}  # hwnd -> time.monotonic() of the last WM_CLOSE, until its destroy event
+        self.closed_count = 0
+        self.retried_count = 0
+        self.dropped_events = 0
+        self.latencies = deque(maxlen=1000)  # event received -> WM_CLOSE posted, seconds
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.source.start(self._enqueue)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.source.stop()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def _enqueue(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped_events += 1
+
+    def _run(self):
+        while self.running:
+            try:
+                event = self.queue.get(timeout=self.retry_after if self.closed else None)
+            except queue.Empty:
+                event = False
+            if event is None:
+                break
+            try:
+                if event:
+                    self._process(event)
+                if self.closed:
+                    self._retry_unclosed()
+            except Exception as e:
+                logger.debug(f"Window classification error: {e}")
+
+    def _retry_unclosed(self):
+        """Close again the windows that are still there retry_after seconds after WM_CLOSE"""
+        now = time.monotonic()
+        for hwnd, posted in list(self.closed.items()):
+            if now - posted < self.retry_after:
+                continue
+            window = self.backend.describe(hwnd)
+            if window is None or not self.classify(window):
+                del self.closed[hwnd]  # gone (destroy event missed), hidden or no longer blocked
+                continue
+            self.backend.close(hwnd)
+            self.closed[hwnd] = now
+            self.retried_count += 1
+            logger.debug(f"🪟 Window ignored WM_CLOSE, closing again: {window.title}")
+
+    def _process(self, event):
+        if event.kind == 'destroy':
+            self.closed.pop(event.hwnd, None)
+            return
+        if event.hwnd in self.closed:
+            return
+
+        window = self.backend.describe(event.hwnd)
+        if window is None:
+            return
+        reason = self.classify(window)
+        if not reason:
+            return
+
+        self.backend.close(window.hwnd)
+        if len(self.closed) > 4096:
+            self.closed.clear()  # destroy events were missed; WM_CLOSE twice is harmless
+        self.closed[window.hwnd] = time.monotonic()
+        self.closed_count += 1
+        latency = time.monotonic() - event.timestamp
+        self.latencies.append(latency)
+        if self.on_close:
+            self.on_close(window, reason, latency)